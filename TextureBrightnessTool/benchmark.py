@@ -0,0 +1,375 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+贴图处理流程的性能基准
+用固定随机种子生成合成贴图(_d/_d_low，不同尺寸、有无Alpha、PNG/TGA/JPG/BMP)，
+逐阶段测量吞吐量(百万像素/秒、文件/秒)和峰值内存，用于发现性能退化。
+每个阶段在单独的子进程中运行，峰值内存互不影响(包含该阶段预先加载的图像和它启动的工作进程)。
+
+用法示例:
+    python benchmark.py                                    # 运行全部阶段
+    python benchmark.py --stages load check --repeat 5
+    python benchmark.py --json baseline.json               # 保存结果作为基准
+    python benchmark.py --baseline baseline.json           # 与基准对比，吞吐量下降超过容差时退出码为1
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import contextlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from modules import image_utils
+from modules import image_probe
+from modules.batch_scanner import BatchScanner
+
+# 合成贴图集的格式版本，生成规则变化时递增，旧的贴图集会重新生成
+CORPUS_VERSION = 1
+CORPUS_MANIFEST = "corpus.json"
+
+# 贴图尺寸(最长边)和格式，按随机种子选取
+SIZES = (256, 512, 1024, 2048)
+FORMATS = (".png", ".tga", ".jpg", ".bmp")
+# 每隔几张贴图额外生成一张半尺寸的 _d_low 版本
+LOW_EVERY = 3
+
+THRESHOLD = 0.92
+STAGES = ("load", "check", "process", "save", "scan", "scan_cached", "fix")
+
+# 与基准对比时允许的吞吐量下降比例
+DEFAULT_TOLERANCE = 0.15
+
+
+def synth_texture(rng, width, height, channels, bright):
+    """
+    生成一张类似漫反射贴图的合成图像(BGR或BGRA，uint8)
+    低频明暗变化 + 颜色偏移 + 噪声；bright为True时加入超出阈值的高光区域
+    """
+    y, x = np.mgrid[0:height, 0:width].astype(np.float32)
+    fx, fy = rng.uniform(0.005, 0.05, 2)
+    phase = rng.uniform(0, 2 * np.pi)
+    base = 0.45 + 0.2 * np.sin(x * fx + phase) * np.cos(y * fy)
+    planes = []
+    for tint in rng.uniform(0.6, 1.0, 3):
+        planes.append(base * tint + rng.normal(0, 0.03, (height, width)).astype(np.float32))
+    if bright:
+        cx, cy = rng.uniform(0.2, 0.8) * width, rng.uniform(0.2, 0.8) * height
+        radius = rng.uniform(0.05, 0.2) * min(width, height)
+        highlight = np.exp(-((x - cx) ** 2 + (y - cy) ** 2) / (2 * radius ** 2))
+        planes = [p + highlight * 0.8 for p in planes]
+    if channels == 4:
+        planes.append(0.5 + 0.5 * np.cos(x * fy) * np.sin(y * fx))
+    return (np.clip(np.dstack(planes), 0, 1) * 255).astype(np.uint8)
+
+
+def corpus_spec(count, seed):
+    """
+    贴图集清单：每张贴图的文件名、尺寸、通道数、是否RLE、是否含高光
+    每张贴图使用独立的随机种子，增减数量不影响其他贴图
+    """
+    spec = []
+    for idx in range(count):
+        rng = np.random.default_rng([seed, idx])
+        size = int(rng.choice(SIZES))
+        ext = FORMATS[idx % len(FORMATS)]
+        channels = 3 if ext == ".jpg" or rng.random() < 0.5 else 4
+        item = {
+            "name": f"tex{idx:03d}_d{ext}",
+            "width": size,
+            "height": size // int(rng.choice((1, 2))),
+            "channels": channels,
+            "rle": ext == ".tga" and bool(rng.random() < 0.5),
+            "bright": bool(rng.random() < 0.6),
+            "seed": [seed, idx],
+        }
+        spec.append(item)
+        if idx % LOW_EVERY == 0:
+            spec.append(dict(item, name=f"tex{idx:03d}_d_low{ext}", width=size // 2, height=item["height"] // 2))
+    return spec
+
+
+def read_manifest(folder):
+    """读取贴图集清单，目录不是本工具生成的贴图集时返回None"""
+    try:
+        with open(os.path.join(folder, CORPUS_MANIFEST), "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(manifest, dict) or not {"version", "count", "seed"} <= manifest.keys():
+        return None
+    return manifest
+
+
+def ensure_corpus(folder, count, seed):
+    """
+    生成贴图集；已有相同参数生成的贴图集时直接复用
+    只会删除本工具生成的(带清单的)贴图集，目录中有其他文件时抛出 ValueError，不覆盖用户的文件
+    """
+    manifest = {"version": CORPUS_VERSION, "count": count, "seed": seed}
+    existing = read_manifest(folder)
+    if existing == manifest:
+        return
+    if existing is None and os.path.isdir(folder) and os.listdir(folder):
+        raise ValueError(f"{folder} 不是本工具生成的贴图集且不为空，请指定其他 --corpus 目录")
+
+    print(f"生成合成贴图集: {folder}")
+    if existing is not None:
+        shutil.rmtree(folder)
+    os.makedirs(folder, exist_ok=True)
+    # 先写入未完成的清单标记目录归属，生成中断后再次运行时可以安全地删除重建
+    manifest_path = os.path.join(folder, CORPUS_MANIFEST)
+    with open(manifest_path, "w", encoding="utf-8") as f:
+        json.dump(dict(manifest, version=None), f)
+    for item in corpus_spec(count, seed):
+        rng = np.random.default_rng(item["seed"])
+        img = synth_texture(rng, item["width"], item["height"], item["channels"], item["bright"])
+        options = image_utils.DEFAULT_ENCODE_OPTIONS._replace(tga_rle=item["rle"])
+        image_utils.write_image(os.path.join(folder, item["name"]), img, options)
+    with open(manifest_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+
+
+def peak_rss_mb():
+    """当前进程(及已结束的子进程)的峰值常驻内存(MB)，无法获取时返回None"""
+    try:
+        import resource
+    except ImportError:
+        return _peak_rss_windows_mb()
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    if sys.platform == "darwin":
+        # macOS单位为字节
+        return max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, children) / (1024 * 1024)
+    # Linux下 ru_maxrss 会继承自创建本进程时fork出的父进程副本，改用 /proc 中本进程自己的峰值(KB)
+    try:
+        with open("/proc/self/status", "r") as f:
+            own = next(int(line.split()[1]) for line in f if line.startswith("VmHWM:"))
+    except (OSError, StopIteration, ValueError):
+        own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return max(own, children) / 1024
+
+
+def _peak_rss_windows_mb():
+    """Windows下当前进程的峰值工作集(MB)，不包含子进程"""
+    try:
+        import ctypes
+        from ctypes import wintypes
+
+        class ProcessMemoryCounters(ctypes.Structure):
+            _fields_ = [
+                ("cb", wintypes.DWORD),
+                ("PageFaultCount", wintypes.DWORD),
+                ("PeakWorkingSetSize", ctypes.c_size_t),
+                ("WorkingSetSize", ctypes.c_size_t),
+                ("QuotaPeakPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                ("PagefileUsage", ctypes.c_size_t),
+                ("PeakPagefileUsage", ctypes.c_size_t),
+            ]
+
+        counters = ProcessMemoryCounters()
+        counters.cb = ctypes.sizeof(counters)
+        process = ctypes.windll.kernel32.GetCurrentProcess()
+        if not ctypes.windll.psapi.GetProcessMemoryInfo(process, ctypes.byref(counters), counters.cb):
+            return None
+        return counters.PeakWorkingSetSize / (1024 * 1024)
+    except (AttributeError, OSError):
+        return None
+
+
+def _corpus_files(folder):
+    return sorted(os.path.join(folder, name) for name in os.listdir(folder) if name != CORPUS_MANIFEST)
+
+
+def _megapixels(files):
+    """由文件头得到的总像素数(百万)"""
+    return sum(image_probe.pixel_count(image_probe.probe_image(path)) for path in files) / 1e6
+
+
+def _best_time(func, repeat, setup=None):
+    """重复执行取最短耗时(秒)，setup 的耗时不计入"""
+    best = None
+    for _ in range(repeat):
+        state = setup() if setup is not None else None
+        start = time.perf_counter()
+        func(state)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def run_stage(stage, folder, work_dir, repeat, workers):
+    """
+    在子进程中运行一个阶段
+
+    返回:
+    (耗时秒数, 百万像素数, 文件数, 峰值内存MB或None)
+    """
+    files = _corpus_files(folder)
+    megapixels = _megapixels(files)
+    images = None
+    if stage in ("check", "process", "save"):
+        images = [image_utils.load_image(path) for path in files]
+
+    if stage == "load":
+        seconds = _best_time(lambda _: [image_utils.load_image(path) for path in files], repeat)
+    elif stage == "check":
+        seconds = _best_time(
+            lambda _: [image_utils.check_brightness(img, THRESHOLD, image_utils.DEFAULT_TILE_ROWS) for img in images],
+            repeat,
+        )
+    elif stage == "process":
+        # 复制原图不计入耗时(批量处理时直接在解码结果上原地修改)
+        seconds = _best_time(
+            lambda copies: [
+                image_utils.process_brightness_curve(img, THRESHOLD - 0.02, THRESHOLD, 1.5, inplace=True,
+                                                     stats_threshold=THRESHOLD)
+                for img in copies
+            ],
+            repeat,
+            setup=lambda: [img.copy() for img in images],
+        )
+    elif stage == "save":
+        out_dir = os.path.join(work_dir, "save")
+        os.makedirs(out_dir, exist_ok=True)
+        targets = [os.path.join(out_dir, os.path.basename(path)) for path in files]
+        seconds = _best_time(
+            lambda _: [image_utils.save_image(target, img) for target, img in zip(targets, images)], repeat
+        )
+    else:
+        seconds = _run_scanner_stage(stage, folder, work_dir, repeat, workers)
+
+    return seconds, megapixels, len(files), peak_rss_mb()
+
+
+def _run_scanner_stage(stage, folder, work_dir, repeat, workers):
+    """BatchScanner 的扫描和批量处理阶段(不输出扫描过程信息)"""
+    scanner = BatchScanner(workers=workers)
+    # 合成贴图集包含所有格式，不按文件头跳过
+    scanner.skip_paletted = scanner.skip_grayscale = False
+    out_txt = os.path.join(work_dir, "exceed_brightness.txt")
+    cache_path = os.path.join(work_dir, "brightness_cache.db")
+
+    def remove_cache():
+        if os.path.exists(cache_path):
+            os.remove(cache_path)
+
+    with open(os.devnull, "w", encoding="utf-8") as devnull, contextlib.redirect_stdout(devnull):
+        if stage == "scan":
+            # 冷扫描：每次都没有缓存
+            return _best_time(lambda _: scanner.run_scan(folder, THRESHOLD, out_txt), repeat, setup=remove_cache)
+        if stage == "scan_cached":
+            remove_cache()
+            scanner.run_scan(folder, THRESHOLD, out_txt)
+            return _best_time(lambda _: scanner.run_scan(folder, THRESHOLD, out_txt), repeat)
+
+        # fix：每次在贴图集的新副本上处理，不使用缓存和日志
+        scanner.use_cache = False
+        scanner.use_journal = False
+        fix_dir = os.path.join(work_dir, "fix")
+
+        def fresh_copy():
+            shutil.rmtree(fix_dir, ignore_errors=True)
+            shutil.copytree(folder, fix_dir)
+            # 目录索引按修改时间判断目录是否变化，重新复制后需要重新列出
+            scanner.file_index.clear()
+
+        return _best_time(lambda _: scanner.run_process(fix_dir, THRESHOLD, out_txt=out_txt), repeat,
+                          setup=fresh_copy)
+
+
+def compare(results, baseline, tolerance):
+    """
+    与基准结果对比吞吐量
+
+    返回:
+    吞吐量下降超过容差的阶段列表
+    """
+    regressions = []
+    for stage, result in results.items():
+        base = baseline.get(stage)
+        if base is None:
+            continue
+        change = result["mp_per_s"] / base["mp_per_s"] - 1
+        print(f"{stage:12s} {base['mp_per_s']:9.1f} -> {result['mp_per_s']:9.1f} MP/s ({change:+.1%})")
+        if change < -tolerance:
+            regressions.append(stage)
+    return regressions
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="贴图处理流程的性能基准")
+    parser.add_argument("--corpus", default=os.path.join(os.getcwd(), "benchmark_corpus"),
+                        help="合成贴图集目录(不存在、为空或为之前生成的贴图集)，默认为当前目录下的 benchmark_corpus")
+    parser.add_argument("--count", type=int, default=24, help="_d贴图数量(另有约1/3的_d_low)，默认24")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子，默认0")
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=list(STAGES), help="要运行的阶段，默认全部")
+    parser.add_argument("--repeat", type=int, default=3, help="每个阶段重复次数，取最短耗时，默认3")
+    parser.add_argument("--workers", type=int, help="扫描和批量处理的工作进程数，默认使用全部CPU核心")
+    parser.add_argument("--json", help="将结果保存为JSON文件(可作为之后对比的基准)")
+    parser.add_argument("--baseline", help="与该JSON基准结果对比")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help=f"允许的吞吐量下降比例，默认 {DEFAULT_TOLERANCE}")
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    try:
+        ensure_corpus(args.corpus, args.count, args.seed)
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+    # 各阶段的输出写入本次运行创建的临时目录，结束后整个删除
+    work_dir = tempfile.mkdtemp(prefix="brightness_benchmark_")
+
+    results = {}
+    print(f"{'阶段':10s} {'MP/s':>9s} {'文件/s':>8s} {'耗时(s)':>8s} {'峰值内存(MB)':>12s}")
+    try:
+        for stage in args.stages:
+            # 每个阶段使用新的进程，峰值内存只反映该阶段
+            with ProcessPoolExecutor(1, mp_context=multiprocessing.get_context("spawn")) as executor:
+                seconds, megapixels, files, peak = executor.submit(
+                    run_stage, stage, args.corpus, work_dir, args.repeat, args.workers
+                ).result()
+            results[stage] = {
+                "seconds": seconds,
+                "megapixels": megapixels,
+                "files": files,
+                "mp_per_s": megapixels / seconds,
+                "files_per_s": files / seconds,
+                "peak_rss_mb": peak,
+            }
+            peak_text = f"{peak:12.0f}" if peak is not None else f"{'-':>12s}"
+            print(f"{stage:12s} {megapixels / seconds:9.1f} {files / seconds:8.1f} {seconds:8.3f} {peak_text}")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"count": args.count, "seed": args.seed, "stages": results}, f, ensure_ascii=False, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        if (baseline.get("count"), baseline.get("seed")) != (args.count, args.seed):
+            print("警告: 基准使用的贴图集参数不同，对比结果可能没有意义")
+        regressions = compare(results, baseline["stages"], args.tolerance)
+        if regressions:
+            print(f"性能退化(吞吐量下降超过 {args.tolerance:.0%}): {'、'.join(regressions)}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    sys.exit(main())
@@ -0,0 +1,225 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+贴图亮度工具命令行入口(无界面，不导入Qt)
+用于没有显示器的环境，如资源导入CI
+
+用法示例:
+    python cli.py scan  Textures --material 金属 --format json
+    python cli.py fix   Textures --threshold 0.9 --workers 8 --png-compression 3 --tga-rle
+    python cli.py report Textures --sweep 0.85 0.9 0.95 --format csv
+
+退出码: 0 没有问题；1 存在超出阈值(scan/report)、处理后仍超出或保存失败(fix)的图片；2 参数错误
+"""
+
+import os
+import sys
+import csv
+import json
+import argparse
+import contextlib
+import multiprocessing
+
+from modules.batch_scanner import BatchScanner, report_item
+from modules.image_utils import EncodeOptions, DEFAULT_ENCODE_OPTIONS, PNG_STRATEGIES, PNG_FILTERS
+from modules.material_config import load_material_thresholds
+
+# 未指定阈值和材质时使用的默认阈值
+DEFAULT_THRESHOLD = 0.92
+
+# 各子命令输出的字段(CSV列顺序)
+SCAN_FIELDS = ["path", "status", "max_v", "over_count", "over_fraction", "bbox", "error"]
+FIX_FIELDS = ["path", "status", "error"]
+REPORT_FIELDS = ["path", "max_v", "over_count", "over_fraction", "bbox"]
+SWEEP_FIELDS = ["threshold", "files", "pixels"]
+
+
+def resolve_threshold(parser, args):
+    """由 --threshold 或 --material 确定阈值，--threshold 优先"""
+    if args.threshold is not None:
+        return args.threshold
+    if args.material is None:
+        return DEFAULT_THRESHOLD
+
+    if args.materials_file is not None and not os.path.isfile(args.materials_file):
+        parser.error(f"材质配置文件不存在：{args.materials_file}")
+    try:
+        thresholds = load_material_thresholds(args.materials_file)
+    except (OSError, ValueError) as e:
+        # 指定的配置文件无法读取时报错退出，不使用用户未指定的默认阈值
+        parser.error(f"无法读取材质配置文件：{args.materials_file}，{e}")
+    if not isinstance(thresholds, dict):
+        parser.error(f"材质配置文件格式错误：{args.materials_file}")
+    if args.material not in thresholds:
+        parser.error(f"未知材质：{args.material}（可选：{'、'.join(thresholds)}）")
+    return float(thresholds[args.material])
+
+
+def write_records(records, fields, fmt, output):
+    """按指定格式输出记录列表"""
+    if fmt == "json":
+        json.dump(records, output, ensure_ascii=False, indent=2)
+        output.write("\n")
+        return
+
+    writer = csv.DictWriter(output, fieldnames=fields, extrasaction="ignore", lineterminator="\n")
+    writer.writeheader()
+    for record in records:
+        row = dict(record)
+        if row.get("bbox") is not None:
+            row["bbox"] = " ".join(str(v) for v in row["bbox"])
+        writer.writerow(row)
+
+
+def log_target(args):
+    """扫描模块的打印信息输出位置：默认输出到stderr，保持stdout只包含结果"""
+    if args.quiet:
+        return open(os.devnull, "w", encoding="utf-8")
+    return contextlib.nullcontext(sys.stderr)
+
+
+def scan_records(scanner, args, threshold):
+    """
+    并行扫描并生成超标和出错文件的记录
+
+    返回:
+    记录列表(按遍历顺序)
+    """
+    records = []
+    # 工作进程按文件从大到小处理，输出时恢复遍历顺序
+    file_list = scanner.collect_files(args.folder)
+    walk_order = {path: idx for idx, path in enumerate(file_list)}
+
+    def on_result(path, entry):
+        if entry is not None:
+            record = report_item(path, entry, threshold)
+        else:
+            record = {"path": path, "max_v": None, "over_count": None, "over_fraction": None, "bbox": None}
+        record["status"] = "exceeds"
+        record["error"] = None
+        records.append(record)
+
+    def on_error(path, error):
+        records.append({"path": path, "status": "error", "max_v": None, "over_count": None,
+                        "over_fraction": None, "bbox": None, "error": str(error)})
+
+    scanner.run_scan(args.folder, threshold, args.result_file, on_result=on_result, on_error=on_error,
+                     file_list=file_list)
+    records.sort(key=lambda record: walk_order[record["path"]])
+    return records
+
+
+def cmd_scan(scanner, args, threshold):
+    records = scan_records(scanner, args, threshold)
+    return records, SCAN_FIELDS, any(r["status"] == "exceeds" for r in records)
+
+
+def cmd_fix(scanner, args, threshold):
+    # 先并行扫描找出超标文件，只处理这些文件
+    scanned = scan_records(scanner, args, threshold)
+    hits = [r["path"] for r in scanned if r["status"] == "exceeds"]
+    # 扫描时就无法读取的文件同样列入结果，计入退出码
+    records = [{"path": r["path"], "status": "error", "error": r["error"]} for r in scanned if r["status"] == "error"]
+
+    def on_processed(path, saved, still_exceeds):
+        if not saved:
+            status = "save_failed"
+        elif still_exceeds:
+            status = "still_exceeds"
+        else:
+            status = "fixed"
+        records.append({"path": path, "status": status, "error": None})
+
+    def on_error(path, error):
+        records.append({"path": path, "status": "error", "error": error})
+
+    if hits:
+        scanner.run_process(args.folder, threshold, file_list=hits, on_processed=on_processed, on_error=on_error,
+                            journal_path=args.journal, out_txt=args.result_file)
+    return records, FIX_FIELDS, any(r["status"] != "fixed" for r in records)
+
+
+def cmd_report(scanner, args, threshold):
+    if args.sweep:
+        sweep = scanner.threshold_sweep(args.folder, args.sweep, args.result_file)
+        records = [{"threshold": t, "files": files, "pixels": pixels} for t, (files, pixels) in sweep.items()]
+        return records, SWEEP_FIELDS, any(r["files"] for r in records)
+    records = scanner.triage_report(args.folder, threshold, args.result_file)
+    return records, REPORT_FIELDS, bool(records)
+
+
+COMMANDS = {"scan": cmd_scan, "fix": cmd_fix, "report": cmd_report}
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="贴图亮度检查命令行工具(无界面)")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("folder", help="要检查的文件夹")
+    common.add_argument("--threshold", type=float, help=f"亮度阈值(0~1)，默认 {DEFAULT_THRESHOLD}")
+    common.add_argument("--material", help="使用材质阈值配置中该材质的阈值")
+    common.add_argument("--materials-file", help="材质阈值配置文件，默认为 modules/config/material_thresholds.json")
+    common.add_argument("--result-file", default=os.path.join(os.getcwd(), "exceed_brightness.txt"),
+                        help="扫描结果文件，扫描缓存保存在它旁边，默认为当前目录下的 exceed_brightness.txt")
+    common.add_argument("--format", choices=["json", "csv"], default="json", help="输出格式，默认json")
+    common.add_argument("--output", help="输出文件，默认输出到stdout")
+    common.add_argument("--quiet", action="store_true", help="不输出扫描过程信息(默认输出到stderr)")
+
+    parallel = argparse.ArgumentParser(add_help=False)
+    parallel.add_argument("--workers", type=int, help="并行扫描的工作进程数，默认使用全部CPU核心")
+    parallel.add_argument("--no-cache", action="store_true", help="不使用增量扫描缓存")
+    parallel.add_argument("--min-size", type=int, default=0, help="跳过最长边小于该像素数的图片")
+    parallel.add_argument("--skip-paletted", action="store_true", help="跳过调色板图像")
+    parallel.add_argument("--skip-grayscale", action="store_true", help="跳过灰度(单通道)图像")
+
+    subparsers.add_parser("scan", parents=[common, parallel], help="扫描超出阈值的图片")
+    fix = subparsers.add_parser("fix", parents=[common, parallel], help="扫描并压暗超出阈值的图片(覆盖原图)")
+    fix.add_argument("--journal", help="处理日志文件，中断后重新运行时跳过已完成的文件，"
+                                       "默认为当前目录下的 brightness_journal.jsonl")
+    fix.add_argument("--no-journal", action="store_true", help="不记录处理日志")
+    defaults = DEFAULT_ENCODE_OPTIONS
+    fix.add_argument("--png-compression", type=int, choices=range(10), default=defaults.png_compression,
+                     metavar="0-9", help=f"PNG压缩级别，越大文件越小、保存越慢，默认 {defaults.png_compression}")
+    fix.add_argument("--png-strategy", choices=list(PNG_STRATEGIES), default=defaults.png_strategy,
+                     help=f"PNG的zlib压缩策略，默认 {defaults.png_strategy}")
+    fix.add_argument("--png-filter", choices=list(PNG_FILTERS), help="PNG行过滤方式，默认使用编码器的默认值")
+    fix.add_argument("--tga-rle", action="store_true", help="TGA使用RLE压缩保存")
+    report = subparsers.add_parser("report", parents=[common], help="根据扫描缓存生成报告，不读取像素")
+    report.add_argument("--sweep", type=float, nargs="+", help="统计多个阈值下的超标图片数和像素数")
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    threshold = resolve_threshold(parser, args)
+    if not os.path.isdir(args.folder):
+        parser.error(f"文件夹不存在：{args.folder}")
+
+    scanner = BatchScanner(workers=getattr(args, "workers", None))
+    scanner.use_cache = not getattr(args, "no_cache", False)
+    scanner.use_journal = not getattr(args, "no_journal", False)
+    scanner.min_size = getattr(args, "min_size", 0)
+    scanner.skip_paletted = getattr(args, "skip_paletted", False)
+    scanner.skip_grayscale = getattr(args, "skip_grayscale", False)
+    if args.command == "fix":
+        scanner.encode_options = EncodeOptions(args.png_compression, args.png_strategy, args.png_filter,
+                                               args.tga_rle)
+
+    with log_target(args) as log, contextlib.redirect_stdout(log):
+        records, fields, failed = COMMANDS[args.command](scanner, args, threshold)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8", newline="") as f:
+            write_records(records, fields, args.format, f)
+    else:
+        write_records(records, fields, args.format, sys.stdout)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    # 并行扫描使用多进程，打包为可执行文件时需要
+    multiprocessing.freeze_support()
+    sys.exit(main())
@@ -4,43 +4,122 @@
 """
 贴图亮度工具集合主入口
 包含单张贴图分析和批量贴图扫描功能
+
+界面模块(PyQt5、OpenCV、NumPy)在启动对应工具时才导入；
+第一个参数为 scan/fix/report 时转交命令行工具(cli.py)，不加载Qt。
+加 --profile-startup 参数(或设置环境变量 TEXTURE_TOOL_PROFILE_STARTUP=1)时输出启动各阶段耗时。
 """
 
+import time
+
+# 启动计时起点(解释器本身的启动时间不包含在内)
+_START_TIME = time.perf_counter()
+
+import os
 import sys
-from PyQt5.QtWidgets import QApplication
-from modules import TextureChecker, image_utils, batch_scanner, FindTextureBrightness
+import multiprocessing
+
+# 冷启动时间预算(毫秒)：从执行本文件到主窗口显示后首次进入事件循环
+STARTUP_BUDGET_MS = 500
+
+# 转交命令行工具处理的子命令
+CLI_COMMANDS = ("scan", "fix", "report")
+
+PROFILE_ARG = "--profile-startup"
+PROFILE_ENV = "TEXTURE_TOOL_PROFILE_STARTUP"
+
+
+class StartupProfile:
+    """记录启动各阶段的耗时"""
+
+    def __init__(self, enabled):
+        self.enabled = enabled
+        self.stages = []
+
+    def mark(self, name):
+        """记录到达某个阶段的时间"""
+        if self.enabled:
+            self.stages.append((name, (time.perf_counter() - _START_TIME) * 1000))
+
+    def report(self):
+        """输出各阶段耗时，超出预算时给出警告"""
+        if not self.enabled or not self.stages:
+            return
+        previous = 0.0
+        for name, elapsed in self.stages:
+            print(f"[启动] {name}: +{elapsed - previous:.1f} ms (累计 {elapsed:.1f} ms)")
+            previous = elapsed
+        total = self.stages[-1][1]
+        if total > STARTUP_BUDGET_MS:
+            print(f"[启动] 警告: 启动耗时 {total:.1f} ms 超出预算 {STARTUP_BUDGET_MS} ms")
+        else:
+            print(f"[启动] 启动耗时 {total:.1f} ms (预算 {STARTUP_BUDGET_MS} ms)")
+
 
-def launch_texture_checker():
+def launch_texture_checker(profile=None):
     """启动集成版贴图检查工具"""
+    if profile is None:
+        profile = StartupProfile(False)
+
+    from PyQt5.QtCore import QTimer
+    from PyQt5.QtWidgets import QApplication
+    profile.mark("导入Qt")
+
     app = QApplication(sys.argv)
-    
-    # 确保当前工作目录设置正确
-    import os
-    # 获取脚本所在目录
+    profile.mark("创建QApplication")
+
+    # 获取脚本所在目录，将工作目录设置为脚本所在目录
     current_dir = os.path.dirname(os.path.abspath(__file__))
-    # 将工作目录设置为脚本所在目录
     os.chdir(current_dir)
-    
+
+    from modules import TextureChecker
+    profile.mark("导入界面模块")
+
     # 加载样式表
     try:
         TextureChecker.load_stylesheet(app)
     except Exception as e:
         print(f"加载样式表失败: {e}")
-    
+
     # 创建并显示主窗口
     window = TextureChecker.TextureChecker()
+    profile.mark("创建主窗口")
     window.show()
-    
+    profile.mark("显示主窗口")
+
+    # 事件循环开始处理第一批事件时视为启动完成
+    def on_started():
+        profile.mark("进入事件循环")
+        profile.report()
+    QTimer.singleShot(0, on_started)
+
     # 运行应用
     sys.exit(app.exec_())
 
 def launch_finder_tool():
     """启动传统的FindTextureBrightness工具"""
+    from PyQt5.QtWidgets import QApplication
+    from modules import FindTextureBrightness
     app = QApplication(sys.argv)
     win = FindTextureBrightness.BrightnessCheckerUI()
     win.show()
     sys.exit(app.exec_())
 
+def launch_cli(argv):
+    """运行命令行工具(不导入Qt)"""
+    import cli
+    sys.exit(cli.main(argv))
+
 if __name__ == "__main__":
+    # 批量扫描使用多进程，打包为可执行文件时需要
+    multiprocessing.freeze_support()
+
+    args = sys.argv[1:]
+    if args and args[0] in CLI_COMMANDS:
+        launch_cli(args)
+
+    enabled = PROFILE_ARG in args or os.environ.get(PROFILE_ENV) == "1"
+    if PROFILE_ARG in sys.argv:
+        sys.argv.remove(PROFILE_ARG)
     # 默认启动集成版工具
-    launch_texture_checker()
\ No newline at end of file
+    launch_texture_checker(StartupProfile(enabled))
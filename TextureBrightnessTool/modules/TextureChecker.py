@@ -20,52 +20,39 @@ from PyQt5.QtWidgets import (
     QComboBox,
     QMenu,
     QTabWidget,
-    QGroupBox
+    QGroupBox,
+    QProgressDialog,
+    QListView,
+    QAbstractItemView
 )
-from PyQt5.QtGui import QPixmap, QImage, QColor
-from PyQt5.QtCore import Qt, QFile, QTextStream
-import imageio.v2 as imageio
+from PyQt5.QtGui import QImage, QColor, QPainter
+from PyQt5.QtCore import Qt, QFile, QTextStream, QSize, QRect, QRectF
 import os
-import json
+from collections import namedtuple
 
 
 # 导入自定义模块
 from . import image_utils
 from . import batch_scanner
+from . import batch_worker
+from . import preview_engine
+from .preview_worker import RenderScheduler, RenderThread
+from .result_list import ScanResultModel
+from .material_config import load_material_thresholds
+from .thumbnail_cache import ThumbnailCache, default_thumbnail_dir, THUMBNAIL_SIZE, PREVIEW_SIZE
 # import batch_scanner
 
 # 声明通道按钮样式常量，由于这些需要动态切换，单独处理
 CHANNEL_BUTTON_DEFAULT_STYLE = "background-color: none; border: 1px solid gray; padding: 5px;"
 CHANNEL_BUTTON_HIGHLIGHT_STYLE = "background-color: lightblue; border: 2px solid blue; padding: 5px;"
 
+# Mask 通道名称 -> OpenCV BGRA 通道索引
+MASK_CHANNEL_INDEX = {"R": 2, "G": 1, "B": 0, "A": 3}
+
+# Mask 单个通道的字节平面(已缩放到固有色图像尺寸)和256级直方图
+MaskPlane = namedtuple("MaskPlane", ["plane", "histogram"])
+
 
-# 添加这个函数来加载材质阈值配置
-def load_material_thresholds():
-    """加载材质阈值配置"""
-    default_thresholds = {
-        "布料": 0.90,
-        "皮肤": 0.87,
-        "玉石": 0.82,
-        "金属": 0.92
-    }
-    
-    try:
-        # 尝试从配置文件加载
-        current_dir = os.path.dirname(os.path.abspath(__file__))
-        config_path = os.path.join(current_dir, "config", "material_thresholds.json")
-        if os.path.exists(config_path):
-            with open(config_path, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        else:
-            # 如果配置文件不存在，创建默认配置
-            os.makedirs(os.path.join(current_dir, "config"), exist_ok=True)
-            with open(config_path, 'w', encoding='utf-8') as f:
-                json.dump(default_thresholds, f, ensure_ascii=False, indent=4)
-            return default_thresholds
-    except Exception as e:
-        print(f"加载材质阈值配置失败：{e}")
-        return default_thresholds
-    
 def load_stylesheet(app):
     try:
         # 当前文件在 modules 目录，style 在上一级
@@ -127,10 +114,9 @@ class RegionParamItem(QFrame):
         # 第一行：颜色框和颜色值信息
         self.grid.addWidget(self.color_box, 0, 0)
         
-        # 创建一个标签来显示颜色值和范围
-        min_val = max(0.0, self.color_value - self.error_value)
-        max_val = min(1.0, self.color_value + self.error_value)
-        self.value_info_label = QLabel(f"值: {self.color_value:.2f} (范围: {min_val:.2f} ~ {max_val:.2f})")
+        # 创建一个标签来显示颜色值、范围和包含的像素数
+        self.value_info_label = QLabel()
+        self.update_value_info_label()
         self.grid.addWidget(self.value_info_label, 0, 1, 1, 4)
         
         self.grid.addWidget(self.remove_button, 0, 5)  # 放在最右侧
@@ -209,9 +195,14 @@ class RegionParamItem(QFrame):
         """更新颜色值和范围信息标签"""
         min_val = max(0.0, self.color_value - self.error_value)
         max_val = min(1.0, self.color_value + self.error_value)
-        self.value_info_label.setText(
-            f"值: {self.color_value:.2f} (范围: {min_val:.2f} ~ {max_val:.2f})"
-        )
+        text = f"值: {self.color_value:.2f} (范围: {min_val:.2f} ~ {max_val:.2f})"
+        
+        # 由Mask直方图直接得出像素数，无需等待掩码生成
+        pixel_count = self.parent_widget.region_pixel_count(self.color_value, self.error_value)
+        if pixel_count is not None:
+            count, total = pixel_count
+            text += f" 像素: {count} ({count / max(total, 1):.1%})"
+        self.value_info_label.setText(text)
     
     def on_threshold_preset_changed(self, index):
         """处理阈值预设下拉框选择变更"""
@@ -382,6 +373,80 @@ class DraggableLabel(QLabel):
         super().__init__(parent)
         self.label_type = label_type
         self.setAcceptDrops(True)
+        
+        # 预览缓冲区：与标签(设备像素)同尺寸的BGR888数组，QImage直接引用其内存，
+        # 每次更新只把图像缩放写入缓冲区，不做颜色转换也不创建新的QImage/QPixmap
+        self._raw_buffer = None
+        self._buffer = None
+        self._buffer_image = None
+        self._image_size = None  # 缓冲区中有效图像的 (宽, 高)，None表示没有图像
+
+    def _ensure_buffer(self):
+        """按标签尺寸和设备像素比创建缓冲区，尺寸不变时复用"""
+        ratio = self.devicePixelRatioF()
+        width = max(1, round(self.width() * ratio))
+        height = max(1, round(self.height() * ratio))
+        if self._buffer is None or self._buffer.shape[:2] != (height, width):
+            # 每行字节数按4字节对齐
+            stride = (width * 3 + 3) & ~3
+            self._raw_buffer = np.zeros((height, stride), dtype=np.uint8)
+            self._buffer = self._raw_buffer[:, :width * 3].reshape(height, width, 3)
+            self._buffer_image = QImage(self._raw_buffer.data, width, height, stride, QImage.Format_BGR888)
+        self._buffer_image.setDevicePixelRatio(ratio)
+        return self._buffer
+
+    def show_image(self, image):
+        """
+        保持宽高比缩放显示BGR图像
+
+        参数:
+        image: BGR/BGRA/灰度 uint8 图像
+        """
+        if image.ndim == 2:
+            image = cv2.cvtColor(image, cv2.COLOR_GRAY2BGR)
+        elif image.shape[2] == 4:
+            image = image[:, :, :3]
+        
+        buffer = self._ensure_buffer()
+        height, width = image.shape[:2]
+        scale = min(buffer.shape[1] / width, buffer.shape[0] / height)
+        fit_width = max(1, min(buffer.shape[1], round(width * scale)))
+        fit_height = max(1, min(buffer.shape[0], round(height * scale)))
+        
+        # 直接缩放写入缓冲区左上角
+        target = buffer[:fit_height, :fit_width]
+        if (fit_width, fit_height) == (width, height):
+            np.copyto(target, image)
+        else:
+            interpolation = cv2.INTER_AREA if scale < 1.0 else cv2.INTER_LINEAR
+            cv2.resize(image, (fit_width, fit_height), dst=target, interpolation=interpolation)
+        
+        self._image_size = (fit_width, fit_height)
+        self.setText("")
+        self.update()
+
+    def clear_image(self):
+        """清空显示的图像"""
+        self._image_size = None
+        self.update()
+
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if self._image_size is None:
+            return
+        
+        # 在标签中居中绘制缓冲区中的有效部分
+        ratio = self._buffer_image.devicePixelRatioF()
+        width, height = self._image_size
+        target = QRectF(
+            (self.width() - width / ratio) / 2,
+            (self.height() - height / ratio) / 2,
+            width / ratio,
+            height / ratio,
+        )
+        painter = QPainter(self)
+        painter.drawImage(target, self._buffer_image, QRectF(QRect(0, 0, width, height)))
+        painter.end()
 
     def dragEnterEvent(self, event):
         if event.mimeData().hasUrls():
@@ -422,11 +487,11 @@ class DraggableLabel(QLabel):
         """删除当前区域图片"""
         if self.label_type == "base":
             self.parent().base_image = None
-            self.setPixmap(QPixmap())  # 清空图片显示
+            self.clear_image()  # 清空图片显示
             self.setText("固有色图片已删除")
         elif self.label_type == "mask":
             self.parent().mask_image = None
-            self.setPixmap(QPixmap())  # 清空图片显示
+            self.clear_image()  # 清空图片显示
             self.setText("Mask 图片已删除")
             # 清空区域参数
             for region_id in list(self.parent().region_items.keys()):
@@ -440,6 +505,10 @@ class TextureChecker(QWidget):
         self.is_picking_color = False      # 初始化吸取模式状态
         self.region_items = {}            # 存储区域参数项
         self.region_masks = {}            # 存储区域的掩码
+        self.scaled_region_masks = {}     # 缩放到各级预览尺寸的区域掩码缓存
+        self.label_maps = {}              # 各尺寸的区域成员位图缓存
+        self.mask_planes = {}             # Mask各通道的字节平面和直方图缓存
+        self.dirty_region_masks = set()   # 参数已变化、等待重新生成掩码的区域
         self.next_region_id = 0          # 区域ID计数器
         
         # 默认标记颜色为红色
@@ -447,8 +516,29 @@ class TextureChecker(QWidget):
         
         # 创建批量扫描器
         self.batch_scanner = batch_scanner.BatchScanner()
+        # 当前运行中的后台批量任务
+        self.batch_thread = None
+        self.batch_worker = None
+        self.batch_progress = None
+        # 扫描结果的缩略图缓存(随结果文件位置创建)
+        self.thumbnail_cache = None
+        # 当前固有色图片是否为缓存的预览图(保存时才加载原图)
+        self.base_image_is_preview = False
         
         self.init_ui()
+        
+        # 亮度预览在后台线程中渲染，滑块的连续变化合并为一帧
+        # 渲染器缓存上一帧，只有个别区域参数变化时只重算这些区域的像素
+        self.preview_renderer = preview_engine.PreviewRenderer()
+        self.render_scheduler = RenderScheduler(self.make_preview_job, self.preview_renderer.render, self)
+        self.render_scheduler.rendered.connect(self.on_preview_rendered)
+
+        # 缩略图缓存未命中时在后台线程中解码原图生成预览图，只保留最新的一次请求
+        self.preview_load_generation = 0
+        self.preview_loader = RenderThread(self.create_cached_preview, self)
+        self.preview_loader.frame_ready.connect(self.on_cached_preview_ready)
+        self.preview_loader.frame_failed.connect(self.on_cached_preview_failed)
+        self.preview_loader.start()
 
     def init_ui(self):
         self.setWindowTitle("Texture Checker")
@@ -717,21 +807,26 @@ class TextureChecker(QWidget):
         output_layout.addWidget(output_browse_btn)
         path_layout.addLayout(output_layout)
         
+        # 根据文件头跳过的图片(默认全部检查)
+        self.skip_special_checkbox = QCheckBox("跳过调色板和灰度图像")
+        self.skip_special_checkbox.setToolTip("根据文件头跳过调色板图像和灰度(单通道)图像，不解码检查")
+        path_layout.addWidget(self.skip_special_checkbox)
+        
         batch_layout.addWidget(path_group)
         
         # 创建操作按钮区域
         action_layout = QHBoxLayout()
         
         # 开始扫描按钮
-        start_scan_btn = QPushButton("开始扫描")
-        start_scan_btn.clicked.connect(self.start_batch_scan)
-        action_layout.addWidget(start_scan_btn)
+        self.start_scan_btn = QPushButton("开始扫描")
+        self.start_scan_btn.clicked.connect(self.start_batch_scan)
+        action_layout.addWidget(self.start_scan_btn)
         
         # 添加批量处理按钮
-        process_btn = QPushButton("批量处理")
-        process_btn.setToolTip("批量处理超出阈值的像素")
-        process_btn.clicked.connect(self.start_batch_process)
-        action_layout.addWidget(process_btn)
+        self.process_btn = QPushButton("批量处理")
+        self.process_btn.setToolTip("批量处理超出阈值的像素")
+        self.process_btn.clicked.connect(self.start_batch_process)
+        action_layout.addWidget(self.process_btn)
         
         # 添加查看结果按钮
         view_result_btn = QPushButton("查看结果")
@@ -747,13 +842,35 @@ class TextureChecker(QWidget):
         self.result_label = QLabel("未开始扫描")
         result_layout.addWidget(self.result_label)
         
-        # 创建结果列表区域（滚动区域）
-        self.result_scroll = QScrollArea()
-        self.result_scroll.setWidgetResizable(True)
-        self.result_container = QWidget()
-        self.result_list_layout = QVBoxLayout(self.result_container)
-        self.result_scroll.setWidget(self.result_container)
-        result_layout.addWidget(self.result_scroll)
+        # 结果数量、排序方式和查看按钮
+        result_tools_layout = QHBoxLayout()
+        self.result_count_label = QLabel("")
+        self.result_count_label.setStyleSheet("font-weight: bold;")
+        result_tools_layout.addWidget(self.result_count_label)
+        result_tools_layout.addStretch()
+        
+        self.result_sort_combo = QComboBox()
+        self.result_sort_combo.addItem("原始顺序", ScanResultModel.SORT_NONE)
+        self.result_sort_combo.addItem("按明度排序", ScanResultModel.SORT_MAX_VALUE)
+        self.result_sort_combo.addItem("按路径排序", ScanResultModel.SORT_PATH)
+        self.result_sort_combo.currentIndexChanged.connect(self.on_result_sort_changed)
+        result_tools_layout.addWidget(self.result_sort_combo)
+        
+        view_btn = QPushButton("查看")
+        view_btn.setFixedWidth(50)
+        view_btn.clicked.connect(self.view_selected_result)
+        result_tools_layout.addWidget(view_btn)
+        result_layout.addLayout(result_tools_layout)
+        
+        # 创建结果列表(模型/视图，只绘制可见行)，双击查看图片
+        self.result_model = ScanResultModel(self)
+        self.result_view = QListView()
+        self.result_view.setModel(self.result_model)
+        self.result_view.setUniformItemSizes(True)
+        self.result_view.setIconSize(QSize(THUMBNAIL_SIZE, THUMBNAIL_SIZE))
+        self.result_view.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.result_view.activated.connect(self.on_result_activated)
+        result_layout.addWidget(self.result_view)
         
         batch_layout.addWidget(result_group)
 
@@ -891,58 +1008,12 @@ class TextureChecker(QWidget):
             # 从掩码字典中移除
             if region_id in self.region_masks:
                 del self.region_masks[region_id]
+            for key in [key for key in self.scaled_region_masks if key[0] == region_id]:
+                del self.scaled_region_masks[key]
             
             # 更新预览
             self.update_brightness_preview()
     
-    def update_specific_region_mask(self, region_id):
-        """更新特定区域的掩码"""
-        if not hasattr(self, "mask_image") or region_id not in self.region_items:
-            return
-                
-        region_item = self.region_items[region_id]
-        
-        # 获取当前通道的值
-        if self.current_mask_channel == "R":
-            channel = self.mask_image[:, :, 2] / 255.0  # R 通道
-        elif self.current_mask_channel == "G":
-            channel = self.mask_image[:, :, 1] / 255.0  # G 通道
-        elif self.current_mask_channel == "B":
-            channel = self.mask_image[:, :, 0] / 255.0  # B 通道
-        elif self.current_mask_channel == "A" and self.mask_image.shape[2] == 4:
-            channel = self.mask_image[:, :, 3] / 255.0  # A 通道
-        else:
-            return
-
-        # 检查是否有基础图像作为参考尺寸
-        target_shape = None
-        if hasattr(self, "base_image") and self.base_image is not None:
-            target_shape = self.base_image.shape[:2]
-        elif hasattr(self, "temp_hsv_image"):
-            target_shape = self.temp_hsv_image.shape[:2]
-            
-        # 获取误差值
-        error_value = region_item.error_value
-        
-        # 根据吸取的范围生成布尔掩码
-        color_value = region_item.color_value
-        min_val, max_val = color_value - error_value, color_value + error_value
-        region_mask = (channel >= max(0.0, min_val)) & (channel <= min(1.0, max_val))
-        
-        # 如果尺寸不匹配，进行缩放处理
-        if target_shape is not None and region_mask.shape != target_shape:
-            region_mask = cv2.resize(
-                region_mask.astype(np.uint8), 
-                (target_shape[1], target_shape[0]),
-                interpolation=cv2.INTER_NEAREST
-            ).astype(bool)
-        
-        # 保存区域掩码
-        self.region_masks[region_id] = region_mask
-        
-        # 更新预览
-        self.update_brightness_preview()
-    
     def on_brightness_check_changed(self):
         if hasattr(self, "temp_hsv_image"):
             self.update_brightness_preview()
@@ -953,86 +1024,118 @@ class TextureChecker(QWidget):
         return rgb_image[:, :, [2, 1, 0]]
 
     def update_specific_region_mask(self, region_id):
-        """更新特定区域的掩码"""
-        if not hasattr(self, "mask_image") or region_id not in self.region_items:
+        """标记区域掩码需要更新，掩码在下一帧渲染前统一生成，连续拖动误差滑块时只生成一次"""
+        self.dirty_region_masks.add(region_id)
+        self.update_brightness_preview()
+
+    def flush_region_masks(self):
+        """生成所有待更新的区域掩码"""
+        dirty = self.dirty_region_masks
+        self.dirty_region_masks = set()
+        for region_id in dirty:
+            self.compute_region_mask(region_id)
+
+    def compute_region_mask(self, region_id):
+        """生成特定区域的掩码"""
+        if region_id not in self.region_items:
             return
-                
-        region_item = self.region_items[region_id]
-        
-        # 获取当前通道的值
-        if self.current_mask_channel == "R":
-            channel = self.mask_image[:, :, 2] / 255.0  # R 通道
-        elif self.current_mask_channel == "G":
-            channel = self.mask_image[:, :, 1] / 255.0  # G 通道
-        elif self.current_mask_channel == "B":
-            channel = self.mask_image[:, :, 0] / 255.0  # B 通道
-        elif self.current_mask_channel == "A" and self.mask_image.shape[2] == 4:
-            channel = self.mask_image[:, :, 3] / 255.0  # A 通道
-        else:
+        mask_plane = self.get_mask_plane(self.current_mask_channel)
+        if mask_plane is None:
             return
+        
+        # 按吸取的范围查表生成布尔掩码(0/1字节直接视为bool)，不做浮点转换
+        region_item = self.region_items[region_id]
+        selected = preview_engine.value_range_table(region_item.color_value, region_item.error_value)
+        self.region_masks[region_id] = cv2.LUT(mask_plane.plane, selected.view(np.uint8)).view(bool)
+
+    def get_mask_plane(self, channel):
+        """
+        获取Mask指定通道缩放到固有色图像尺寸后的字节平面及其直方图，每张Mask每个通道只计算一次
 
-        # 获取误差值
-        error_value = region_item.error_value
+        返回:
+        MaskPlane，没有Mask或通道不存在时返回None
+        """
+        mask_image = getattr(self, "mask_image", None)
+        index = MASK_CHANNEL_INDEX.get(channel)
+        if mask_image is None or index is None or mask_image.ndim != 3 or index >= mask_image.shape[2]:
+            return None
         
-        # 根据吸取的范围生成布尔掩码
-        color_value = region_item.color_value
-        min_val, max_val = color_value - error_value, color_value + error_value
-        region_mask = (channel >= max(0.0, min_val)) & (channel <= min(1.0, max_val))
+        # 以固有色图像为参考尺寸
+        if getattr(self, "base_image", None) is not None:
+            target_shape = self.base_image.shape[:2]
+        else:
+            target_shape = mask_image.shape[:2]
         
-        # 保存区域掩码
-        self.region_masks[region_id] = region_mask
+        cached = self.mask_planes.get(channel)
+        if cached is not None and cached.plane.shape == target_shape:
+            return cached
         
-        # 更新预览
-        self.update_brightness_preview()
+        plane = mask_image[:, :, index]
+        if plane.shape != target_shape:
+            plane = cv2.resize(plane, (target_shape[1], target_shape[0]), interpolation=cv2.INTER_NEAREST)
+        else:
+            plane = np.ascontiguousarray(plane)
+        histogram = np.bincount(plane.ravel(), minlength=256)
+        self.mask_planes[channel] = MaskPlane(plane, histogram)
+        return self.mask_planes[channel]
+
+    def region_pixel_count(self, color_value, error_value):
+        """由当前通道的直方图计算区域包含的像素数，没有Mask时返回None"""
+        mask_plane = self.get_mask_plane(self.current_mask_channel)
+        if mask_plane is None:
+            return None
+        selected = preview_engine.value_range_table(color_value, error_value)
+        return int(mask_plane.histogram[selected].sum()), mask_plane.plane.size
 
-    def apply_brightness_adjustments(self, v_channel):
+    def region_label_map(self, shape):
         """
-        对明度通道应用所有区域的亮度调整
-
-        参数:
-        v_channel: 归一化的明度通道 (0-1范围)
+        当前所有区域的成员位图和参数快照，位图按尺寸缓存，区域掩码变化后重新生成
 
         返回:
-        调整后的明度通道 (0-1范围)
+        (成员位图或None, RegionParams 元组)，顺序与 region_items 一致，靠前的区域优先调整
         """
-        # 如果有区域参数
-        if self.region_items:
-            # 创建一个全为 False 的掩码，用于记录已处理的像素
-            processed_mask = np.zeros_like(v_channel, dtype=bool)
-            
-            # 分别处理每个区域
-            for region_id, region_item in self.region_items.items():
-                if region_id in self.region_masks:
-                    region_mask = self.region_masks[region_id]
-                    
-                    # 确保区域掩码与当前通道尺寸一致
-                    if region_mask.shape != v_channel.shape:
-                        # 如果尺寸不匹配，调整掩码尺寸
-                        region_mask = cv2.resize(
-                            region_mask.astype(np.uint8), 
-                            (v_channel.shape[1], v_channel.shape[0]),
-                            interpolation=cv2.INTER_NEAREST
-                        ).astype(bool)
-                        # 更新掩码缓存
-                        self.region_masks[region_id] = region_mask
-                    
-                    # 只处理尚未处理的像素
-                    current_mask = region_mask & (~processed_mask)
-                    
-                    # 应用该区域的参数
-                    brightness_factor = region_item.brightness_factor
-                    clamp_min = region_item.clamp_min
-                    clamp_max = region_item.clamp_max
-                    
-                    # 调整明度通道
-                    v_channel[current_mask] *= brightness_factor
-                    v_channel[current_mask] = np.clip(v_channel[current_mask], clamp_min, clamp_max)
-                    
-                    # 更新已处理掩码
-                    processed_mask |= current_mask
-
-        return v_channel
+        region_ids = [region_id for region_id in self.region_items if region_id in self.region_masks]
+        if not region_ids:
+            return None, ()
+        
+        params = tuple(
+            preview_engine.RegionParams(
+                self.region_items[region_id].brightness_factor,
+                self.region_items[region_id].clamp_min,
+                self.region_items[region_id].clamp_max,
+                self.region_items[region_id].threshold_value,
+            )
+            for region_id in region_ids
+        )
         
+        source_masks = [self.region_masks[region_id] for region_id in region_ids]
+        cached = self.label_maps.get(shape)
+        if (cached is not None and len(cached[0]) == len(source_masks)
+                and all(a is b for a, b in zip(cached[0], source_masks))):
+            return cached[1], params
+        
+        labels = preview_engine.build_label_map([self.get_region_mask(region_id, shape) for region_id in region_ids])
+        self.label_maps[shape] = (source_masks, labels)
+        return labels, params
+        
+    def get_region_mask(self, region_id, shape):
+        """获取缩放到指定尺寸的区域掩码，按尺寸缓存，区域掩码更新后自动重新缩放"""
+        region_mask = self.region_masks[region_id]
+        if region_mask.shape == shape:
+            return region_mask
+        
+        key = (region_id, shape)
+        cached = self.scaled_region_masks.get(key)
+        if cached is not None and cached[0] is region_mask:
+            return cached[1]
+        
+        scaled_mask = cv2.resize(
+            region_mask.astype(np.uint8), 
+            (shape[1], shape[0]),
+            interpolation=cv2.INTER_NEAREST
+        ).astype(bool)
+        self.scaled_region_masks[key] = (region_mask, scaled_mask)
+        return scaled_mask
         
     def create_full_image_region(self):
         """创建一个覆盖全图的区域项"""
@@ -1074,108 +1177,59 @@ class TextureChecker(QWidget):
                 break
                 
     def update_brightness_preview(self):
-        """更新亮度预览，根据当前UI设置决定显示方式"""
+        """请求更新亮度预览，短时间内的多次请求合并为一次后台渲染"""
+        if not hasattr(self, "temp_hsv_image"):
+            return
+        self.render_scheduler.schedule()
+
+    def make_preview_job(self):
+        """在界面线程中生成渲染参数快照，供后台线程调用 PreviewRenderer.render"""
+        if not hasattr(self, "temp_hsv_image"):
+            return None
+        self.flush_region_masks()
+        
+        # 选择与预览标签显示尺寸相当的代理图像，原图只在保存时处理
+        label = self.base_image_label
+        target_size = max(label.width(), label.height()) * label.devicePixelRatioF()
+        level = preview_engine.select_level(self.preview_levels, target_size)
+        
+        highlight_bgr = (self.highlight_color.blue(), self.highlight_color.green(), self.highlight_color.red())
+        return (
+            level,
+            *self.region_label_map(level.hsv.shape[:2]),
+            self.view_brightness_checkbox.isChecked(),
+            self.check_brightness_checkbox.isChecked(),
+            highlight_bgr,
+        )
+
+    def on_preview_rendered(self, preview_image):
+        """后台渲染完成，显示预览"""
         if not hasattr(self, "temp_hsv_image"):
             return
-        
-        # 获取当前的HSV图像的副本
-        hsv_preview = self.temp_hsv_image.copy()
-        
-        # 获取明度通道并归一化到0-1范围
-        v_channel = hsv_preview[:, :, 2] / 255.0
-        
-        # 应用亮度调整
-        v_channel = self.apply_brightness_adjustments(v_channel)
-        
-        # 转回伽马空间
-        v_channel_gamma = image_utils.linear_to_gamma(v_channel)
-        
-        # 检查是否有区域超过明度阈值
-        exceeded_mask = np.zeros_like(v_channel, dtype=bool)
-        
-        for region_id, region_item in self.region_items.items():
-            if region_id in self.region_masks:
-                # 获取该区域的明度阈值
-                threshold = region_item.threshold_value
-                
-                # 该区域内明度超过阈值的部分
-                current_exceeded = (v_channel > threshold) & self.region_masks[region_id]
-                
-                # 更新总的超出阈值掩码
-                exceeded_mask |= current_exceeded
-        
-        # 处理HSV根据当前的UI设置
-        if self.view_brightness_checkbox.isChecked():
-            # 查看明度模式 - 显示灰度明度图像
-            preview_image = np.zeros((hsv_preview.shape[0], hsv_preview.shape[1], 3), dtype=np.uint8)
-            
-            # 将明度值复制到所有颜色通道上形成灰度图
-            v_channel_display = (v_channel_gamma * 255).astype(np.uint8)
-            preview_image[:, :, 0] = v_channel_display
-            preview_image[:, :, 1] = v_channel_display
-            preview_image[:, :, 2] = v_channel_display
-            
-            # 如果同时勾选了检查明度，在灰度图上标记超过阈值的部分
-            if self.check_brightness_checkbox.isChecked() and np.any(exceeded_mask):
-                # 获取用户选择的高亮颜色
-                b_color = self.highlight_color.blue()
-                g_color = self.highlight_color.green()
-                r_color = self.highlight_color.red()
-                
-                # 将超出阈值的区域标记为用户选择的颜色
-                preview_image[exceeded_mask, 0] = b_color  # B通道
-                preview_image[exceeded_mask, 1] = g_color  # G通道
-                preview_image[exceeded_mask, 2] = r_color  # R通道
-        else:
-            # 普通模式 - 显示处理后的彩色图像
-            hsv_preview[:, :, 2] = (v_channel * 255).astype(np.uint8)
-            preview_image = self.hsv_to_bgr(hsv_preview)
-            
-            # 转换为伽马空间
-            preview_image = (image_utils.linear_to_gamma(preview_image / 255.0) * 255).astype(np.uint8)
-            
-            # 如果勾选了检查明度，在彩色图上标记超过阈值的部分
-            if self.check_brightness_checkbox.isChecked() and np.any(exceeded_mask):
-                # 获取用户选择的高亮颜色
-                b_color = self.highlight_color.blue()
-                g_color = self.highlight_color.green()
-                r_color = self.highlight_color.red()
-                
-                # 将超出阈值的区域标记为用户选择的颜色
-                preview_image[exceeded_mask, 0] = b_color  # B通道
-                preview_image[exceeded_mask, 1] = g_color  # G通道
-                preview_image[exceeded_mask, 2] = r_color  # R通道
-        
-        # 更新预览
         self.update_preview(preview_image, self.base_image_label)
 
     def get_processed_image(self):
         """获取处理后的图像，应用所有亮度调整并转换回伽马空间"""
         if not hasattr(self, "temp_hsv_image"):
             return None
+        
+        # 预览图只用于交互调整，保存前换成原图
+        if not self.ensure_full_image():
+            return None
+        self.flush_region_masks()
             
         # 获取当前的HSV图像的副本
         hsv_processed = self.temp_hsv_image.copy()
         
-        # 获取明度通道并归一化到0-1范围
-        v_channel = hsv_processed[:, :, 2] / 255.0
-        
-        # 应用亮度调整
-        v_channel = self.apply_brightness_adjustments(v_channel)
-        
-        # 更新HSV图像的V通道
-        hsv_processed[:, :, 2] = (v_channel * 255).astype(np.uint8)
+        # 按区域成员位图对明度通道应用亮度调整
+        labels, params = self.region_label_map(hsv_processed.shape[:2])
+        hsv_processed[:, :, 2] = preview_engine.adjust_value_bytes(hsv_processed[:, :, 2], labels, params)
         
         # 将HSV转换回BGR
         processed_bgr = self.hsv_to_bgr(hsv_processed)
         
-        # 转换为伽马空间 (线性空间 -> 伽马空间)
-        # 首先将BGR图像归一化到0-1
-        processed_bgr_norm = processed_bgr / 255.0
-        # 应用线性到伽马的转换
-        gamma_corrected_image = image_utils.linear_to_gamma(processed_bgr_norm)
-        # 转回0-255范围并转为uint8类型
-        gamma_corrected_image = (gamma_corrected_image * 255).astype(np.uint8)
+        # 转换为伽马空间 (线性空间 -> 伽马空间)，查找表与逐像素浮点计算结果一致
+        gamma_corrected_image = image_utils.LINEAR_TO_GAMMA_LUT[processed_bgr]
         
         return gamma_corrected_image
 
@@ -1328,7 +1382,10 @@ class TextureChecker(QWidget):
             self.threshold_input.blockSignals(False)
     
     def start_batch_scan(self):
-        """开始批量扫描图片"""
+        """开始批量扫描图片(在后台线程中执行)"""
+        if self.batch_thread is not None:
+            return
+        
         folder = self.folder_path_edit.text().strip()
         if not folder or not os.path.isdir(folder):
             QMessageBox.warning(self, "提示", "请选择有效的文件夹路径！")
@@ -1345,19 +1402,30 @@ class TextureChecker(QWidget):
         if not output_path:
             output_path = os.path.join(os.getcwd(), "exceed_brightness.txt")
         
-        # 开始扫描
-        out_txt, count = self.batch_scanner.scan_folder(folder, threshold, output_path, self)
+        scanner = self.batch_scanner
+        self.apply_skip_options()
         
-        # 显示扫描结果
-        self.result_label.setText(f"扫描完成: 共找到 {count} 个超出阈值的图片")
+        def task(on_progress, on_result, is_canceled):
+            return scanner.run_scan(folder, threshold, output_path, on_progress, on_result, is_canceled)
         
-        # 直接在UI中显示结果，不弹窗
-        if count > 0:
-            # 自动加载并显示结果
-            self.display_scan_results(out_txt)
+        # 清空旧结果，扫描过程中实时追加
+        self.begin_scan_results()
+        self.result_label.setText("正在扫描...")
+        self.run_batch_task(task, "正在扫描图片...", "扫描进度", self.on_batch_scan_finished)
+    
+    def on_batch_scan_finished(self, result):
+        """批量扫描完成"""
+        out_txt, count = result
+        
+        # 显示扫描结果：扫描中按处理完成的顺序追加，完成后按结果文件(遍历顺序)重新加载
+        self.result_label.setText(f"扫描完成: 共找到 {count} 个超出阈值的图片")
+        self.display_scan_results(out_txt)
         
     def start_batch_process(self):
-        """开始批量处理超出阈值的图片"""
+        """开始批量处理超出阈值的图片(在后台线程中执行)"""
+        if self.batch_thread is not None:
+            return
+        
         folder = self.folder_path_edit.text().strip()
         if not folder or not os.path.isdir(folder):
             QMessageBox.warning(self, "提示", "请选择有效的文件夹路径！")
@@ -1374,7 +1442,7 @@ class TextureChecker(QWidget):
             self,
             "确认批量处理",
             "即将对文件夹中超出阈值的贴图进行曲线映射处理，\n"
-            f"应用公式: (1-(x-{threshold:.2f}))*x\n\n"
+            f"线性明度超过 {threshold - 0.02:.2f} 的像素将平滑压缩到 {threshold:.2f} 以下(保持色相和饱和度)\n\n"
             "处理后的图片将替换原图，此操作不可恢复！\n\n"
             "确定要继续吗？",
             QMessageBox.Yes | QMessageBox.No,
@@ -1384,103 +1452,202 @@ class TextureChecker(QWidget):
         if reply != QMessageBox.Yes:
             return
         
-        # 开始批量处理
-        processed_count, success_count = self.batch_scanner.process_folder(folder, threshold, self)
+        output_path = self.output_path_edit.text().strip()
+        scanner = self.batch_scanner
+        self.apply_skip_options()
+        
+        def task(on_progress, on_result, is_canceled):
+            # 只遍历一次目录，处理和重新扫描共用同一份文件列表
+            file_list = scanner.collect_files(folder)
+            
+            # 开始批量处理(处理后的亮度统计写入扫描缓存)
+            counts = scanner.run_process(folder, threshold, on_progress, is_canceled, file_list,
+                                         out_txt=output_path or None)
+            # 如果有输出文件路径，重新扫描一次以更新结果(处理过的无损格式文件直接命中缓存，不再解码)
+            scan_result = None
+            if output_path and not is_canceled():
+                scan_result = scanner.run_scan(
+                    folder, threshold, output_path, on_progress, on_result, is_canceled, file_list
+                )
+            return counts, scan_result
+        
+        self.begin_scan_results()
+        self.result_label.setText("正在批量处理...")
+        self.run_batch_task(task, "正在处理图片...", "处理进度", self.on_batch_process_finished)
+    
+    def apply_skip_options(self):
+        """按界面选项设置批量扫描和处理时根据文件头跳过的图片"""
+        skip = self.skip_special_checkbox.isChecked()
+        self.batch_scanner.skip_paletted = skip
+        self.batch_scanner.skip_grayscale = skip
+    
+    def on_batch_process_finished(self, result):
+        """批量处理完成"""
+        (processed_count, success_count), _ = result
         
         # 更新结果标签
         self.result_label.setText(f"批量处理完成: 共处理 {processed_count} 张图片，成功 {success_count} 张")
-        
-        # 如果有输出文件路径，重新扫描一次以更新结果
-        output_path = self.output_path_edit.text().strip()
-        if output_path:
-            # 再次扫描以更新结果列表
-            out_txt, count = self.batch_scanner.scan_folder(folder, threshold, output_path, self)
-            if count > 0:
-                self.display_scan_results(out_txt)
-            else:
-                # 清空结果列表
-                while self.result_list_layout.count():
-                    item = self.result_list_layout.takeAt(0)
-                    if item.widget():
-                        item.widget().deleteLater()
-                # 添加一个弹性空间
-                self.result_list_layout.addStretch()
+        self.end_scan_results()
+    
+    def run_batch_task(self, task, text, title, on_finished):
+        """在后台线程中执行批量任务，通过进度对话框显示进度并支持取消"""
+        self.batch_progress = QProgressDialog(text, "取消", 0, 0, self)
+        self.batch_progress.setWindowTitle(title)
+        self.batch_progress.setWindowModality(Qt.WindowModal)
+        self.batch_progress.setMinimumDuration(0)
+        self.batch_progress.setAutoClose(False)
+        self.batch_progress.setAutoReset(False)
+        self.batch_progress.canceled.connect(self.cancel_batch_task)
+        self.batch_progress.show()
+        
+        self.start_scan_btn.setEnabled(False)
+        self.process_btn.setEnabled(False)
+        
+        self.batch_thread, self.batch_worker = batch_worker.start_worker(task, self)
+        self.batch_worker.progress.connect(self.on_batch_progress)
+        self.batch_worker.result_found.connect(self.add_scan_result_item)
+        self.batch_worker.finished.connect(self.on_batch_task_done)
+        self.batch_worker.finished.connect(on_finished)
+        self.batch_worker.failed.connect(self.on_batch_task_done)
+        self.batch_worker.failed.connect(self.on_batch_task_failed)
+        # 线程真正结束后才释放引用，关闭窗口时仍能等待尚未退出的线程
+        self.batch_thread.finished.connect(self.on_batch_thread_finished)
+    
+    def on_batch_progress(self, done, total):
+        """更新批量任务进度"""
+        if self.batch_progress is not None:
+            self.batch_progress.setMaximum(total)
+            self.batch_progress.setValue(done)
+    
+    def cancel_batch_task(self):
+        """取消正在运行的批量任务"""
+        if self.batch_worker is not None:
+            self.batch_worker.cancel()
+            self.result_label.setText("正在取消...")
+    
+    def on_batch_task_done(self, *args):
+        """批量任务结束(完成或失败)后关闭进度对话框，此时后台线程可能还未退出"""
+        if self.batch_progress is not None:
+            self.batch_progress.close()
+            self.batch_progress.deleteLater()
+            self.batch_progress = None
+    
+    def on_batch_thread_finished(self):
+        """后台线程退出后释放引用并恢复界面状态"""
+        self.batch_thread = None
+        self.batch_worker = None
+        self.start_scan_btn.setEnabled(True)
+        self.process_btn.setEnabled(True)
+    
+    def on_batch_task_failed(self, message):
+        """批量任务出错"""
+        self.result_label.setText("批量任务失败")
+        QMessageBox.warning(self, "警告", f"批量任务失败: {message}")
+    
+    def clear_scan_results(self):
+        """清空结果列表"""
+        self.result_model.clear()
+        self.result_count_label.setText("")
+    
+    def begin_scan_results(self):
+        """清空结果列表，准备在扫描过程中逐条追加结果"""
+        self.clear_scan_results()
+        self.update_thumbnail_cache()
+        self.update_result_count()
+    
+    def end_scan_results(self):
+        """结果追加结束，按当前排序方式重新排序"""
+        sort_mode = self.result_sort_combo.currentData()
+        if sort_mode != ScanResultModel.SORT_NONE:
+            self.result_model.sort_results(sort_mode)
+        self.update_result_count()
+    
+    def update_result_count(self):
+        """更新结果数量标签，没有结果时显示提示信息"""
+        count = self.result_model.total_count()
+        if count == 0:
+            self.result_count_label.setText("没有找到超出阈值的图片")
+        else:
+            self.result_count_label.setText(f"找到 {count} 个超出阈值的图片:")
+    
+    def add_scan_result_item(self, path, max_v=-1.0):
+        """向结果列表追加一项"""
+        self.result_model.append_result(path, max_v if max_v >= 0 else None)
+        self.update_result_count()
     
     def display_scan_results(self, result_file):
-        """显示扫描结果"""
-        # 清空旧结果
-        while self.result_list_layout.count():
-            item = self.result_list_layout.takeAt(0)
-            if item.widget():
-                item.widget().deleteLater()
-        
-        # 设置布局间距为0，使列表更紧凑
-        self.result_list_layout.setSpacing(0)
-        
-        # 读取结果文件
+        """显示扫描结果(只建立索引，列表滚动时才读取可见行)"""
         try:
-            with open(result_file, "r", encoding="utf-8") as f:
-                lines = f.readlines()
-            
-            # 如果没有结果，显示提示信息
-            if not lines:
-                no_result_label = QLabel("没有找到超出阈值的图片")
-                no_result_label.setAlignment(Qt.AlignCenter)
-                self.result_list_layout.addWidget(no_result_label)
-            else:
-                # 添加结果数量标签
-                count_label = QLabel(f"找到 {len(lines)} 个超出阈值的图片:")
-                count_label.setStyleSheet("font-weight: bold;")
-                self.result_list_layout.addWidget(count_label)
-                
-                # 添加结果项
-                for line in lines:
-                    path = line.strip()
-                    if path:
-                        item_widget = QWidget()
-                        item_layout = QHBoxLayout(item_widget)
-                        # 减小项目的内边距，使内容更紧凑
-                        item_layout.setContentsMargins(1, 1, 1, 1)
-                        # 设置水平间距更小
-                        item_layout.setSpacing(4)
-                        
-                        # 显示文件名，并设置完整路径为工具提示
-                        path_label = QLabel(os.path.basename(path))
-                        path_label.setToolTip(path)
-                        # 如果文件名太长，显示省略号
-                        path_label.setMaximumWidth(300)
-                        path_label.setMinimumWidth(200)
-                        path_label.setTextInteractionFlags(Qt.TextSelectableByMouse)
-                        item_layout.addWidget(path_label)
-                        
-                        # 添加弹性空间
-                        item_layout.addStretch()
-                        
-                        # 查看按钮
-                        view_btn = QPushButton("查看")
-                        view_btn.setFixedWidth(50)
-                        view_btn.setFixedHeight(22)  # 减小按钮高度
-                        view_btn.clicked.connect(lambda checked, p=path: self.load_result_image(p))
-                        
-                        btn_font = view_btn.font()
-                        btn_font.setPointSize(8)  # 设置较小的字体大小
-                        view_btn.setFont(btn_font) 
-                        item_layout.addWidget(view_btn)
-                        
-                        # 减小项目widget的高度，使列表更紧凑
-                        item_widget.setFixedHeight(24)
-                        self.result_list_layout.addWidget(item_widget)
-            
-            # 添加一个弹性空间
-            self.result_list_layout.addStretch()
-            
+            self.update_thumbnail_cache()
+            self.result_model.load_file(result_file)
+            self.end_scan_results()
         except Exception as e:
             QMessageBox.warning(self, "警告", f"读取结果文件失败: {str(e)}")
     
+    def update_thumbnail_cache(self):
+        """按当前结果文件位置创建缩略图缓存，目录变化时重新创建"""
+        output_path = self.output_path_edit.text().strip()
+        if not output_path:
+            return
+        cache_dir = default_thumbnail_dir(output_path)
+        if self.thumbnail_cache is not None and self.thumbnail_cache.cache_dir == cache_dir:
+            return
+        try:
+            self.thumbnail_cache = ThumbnailCache(cache_dir)
+        except OSError as e:
+            print(f"创建缩略图缓存失败：{e}")
+            self.thumbnail_cache = None
+        self.result_model.set_thumbnail_cache(self.thumbnail_cache)
+    
+    def on_result_sort_changed(self, index):
+        """结果排序方式变更"""
+        self.result_model.sort_results(self.result_sort_combo.itemData(index))
+    
+    def on_result_activated(self, index):
+        """双击结果项时查看图片"""
+        path = self.result_model.data(index, ScanResultModel.PathRole)
+        if path:
+            self.load_result_image(path)
+    
+    def view_selected_result(self):
+        """查看当前选中的结果图片"""
+        index = self.result_view.currentIndex()
+        if index.isValid():
+            self.on_result_activated(index)
+    
     def load_result_image(self, path):
         """加载结果图片进行查看"""
         self.tabs.setCurrentIndex(0)  # 切换到单张分析标签页
-        self.load_base_image(path)
+        if self.thumbnail_cache is None:
+            self.load_base_image(path)
+            return
+        # 优先使用缓存的预览图，不解码原图；原图在保存时才加载
+        cached = self.thumbnail_cache.get_preview(path, PREVIEW_SIZE)
+        if cached is not None:
+            self.load_base_image(path, *cached)
+            return
+        # 没有缓存时在后台线程中解码原图并生成预览图，界面线程不等待
+        self.preview_load_generation += 1
+        self.preview_loader.submit(self.preview_load_generation, (self.thumbnail_cache, path))
+
+    @staticmethod
+    def create_cached_preview(cache, path):
+        """在后台线程中生成预览图，返回 (图片路径, (预览图, 最大明度平面)或None)"""
+        return path, cache.get_or_create_preview(path, PREVIEW_SIZE)
+
+    def on_cached_preview_ready(self, generation, result):
+        """后台生成预览图完成，期间又请求了其他图片时丢弃"""
+        if generation != self.preview_load_generation:
+            return
+        path, preview = result
+        if preview is None:
+            QMessageBox.warning(self, "警告", f"无法打开图像文件: {path}")
+            return
+        self.load_base_image(path, *preview)
+
+    def on_cached_preview_failed(self, generation, message):
+        if generation == self.preview_load_generation:
+            QMessageBox.warning(self, "警告", f"生成预览图时发生错误: {message}")
     
     def view_scan_result(self):
         """查看扫描结果文件"""
@@ -1502,46 +1669,32 @@ class TextureChecker(QWidget):
             QMessageBox.warning(self, "提示", "结果文件不存在！")
     
     
-    def load_base_image(self, file_path):
-        """加载固有色图片"""
+    def load_base_image(self, file_path, preview=None, preview_v_max=None):
+        """
+        加载固有色图片
+
+        参数:
+        file_path: 图片路径
+        preview: 缓存的预览图，提供时先用它显示和调整，保存时再加载原图
+        preview_v_max: 预览图对应的最大明度平面，用于检查明度
+        """
+        # 后台尚未生成完的预览图不再显示
+        self.preview_load_generation += 1
         try:
             # 读取图像
-            self.base_image = image_utils.load_image(file_path)
-            if self.base_image is None:
+            image = preview if preview is not None else image_utils.load_image(file_path)
+            if image is None:
                 QMessageBox.warning(self, "警告", f"无法打开图像文件: {file_path}")
                 return
-            
-            # 转换为线性空间
-            self.temp_linear_image = image_utils.gamma_to_linear(self.base_image / 255.0)
-            rgb_linear = self.temp_linear_image[:, :, [2, 1, 0]]  # BGR -> RGB
-            
-            # 转换为HSV
-            # self.temp_hsv_image = cv2.cvtColor(rgb_linear, cv2.COLOR_BGR2HSV)
-            self.temp_hsv_image = cv2.cvtColor((rgb_linear * 255).astype(np.uint8), cv2.COLOR_RGB2HSV)
+            self.set_base_image(image, preview_v_max if preview is not None else None)
+            self.base_image_is_preview = preview is not None
             
             # 保存路径
             self.base_image_path = file_path
             
-            # 调整图像显示
-            max_size = 380
-            height, width = self.base_image.shape[:2]
-            scale = max_size / max(height, width)
-            
-            # 计算缩放后的尺寸
-            display_width = int(width * scale)
-            display_height = int(height * scale)
-            
-            # 缩放图像
-            display_img = cv2.resize(self.base_image, (display_width, display_height))
-            
-            # 转换为QPixmap
-            qimg = QImage(display_img.data, display_width, display_height, 
-                        display_img.strides[0], QImage.Format_BGR888)
-            pixmap = QPixmap.fromImage(qimg)
-            
-            # 清空提示文本
-            self.base_image_label.clear()
-            self.base_image_label.setPixmap(pixmap)
+            # 先显示原图，亮度预览渲染完成后替换
+            self.base_image_label.show_image(self.base_image)
+            self.base_image_label.setToolTip("预览图，保存时加载原图" if self.base_image_is_preview else "")
             
             # 更新明度预览
             self.update_brightness_preview()
@@ -1554,11 +1707,49 @@ class TextureChecker(QWidget):
         except Exception as e:
             QMessageBox.warning(self, "警告", f"加载图像时发生错误: {str(e)}")
 
+    def set_base_image(self, image, v_max=None):
+        """
+        设置固有色图像并转换到线性空间的HSV
+
+        参数:
+        image: 固有色图像(原图或缓存的预览图)
+        v_max: image为预览图时，每个像素覆盖的原图区域内的最大明度
+        """
+        self.base_image = image
+        
+        # 转换为线性空间的HSV
+        self.temp_hsv_image = preview_engine.to_linear_hsv(self.base_image)
+        
+        # 旧图像尺寸的区域掩码缓存不再使用，区域掩码按新尺寸重新生成
+        self.scaled_region_masks.clear()
+        self.label_maps.clear()
+        self.dirty_region_masks.update(self.region_masks.keys())
+        
+        # 交互预览使用的代理图像
+        label_size = max(self.base_image_label.width(), self.base_image_label.height())
+        self.preview_levels = preview_engine.build_pyramid(self.base_image, self.temp_hsv_image, label_size,
+                                                           v_max=v_max)
+
+    def ensure_full_image(self):
+        """当前为预览图时加载原图，区域掩码在调整时自动缩放到原图尺寸"""
+        if not self.base_image_is_preview:
+            return True
+        image = image_utils.load_image(self.base_image_path)
+        if image is None:
+            QMessageBox.warning(self, "警告", f"无法打开图像文件: {self.base_image_path}")
+            return False
+        self.set_base_image(image)
+        self.base_image_is_preview = False
+        self.base_image_label.setToolTip("")
+        return True
+
     def load_mask_image(self, file_path):
         """加载Mask图片"""
         try:
             # 读取图像
             self.mask_image = image_utils.load_image(file_path)
+            # 各通道的字节平面和直方图按新Mask重新计算
+            self.mask_planes.clear()
             
             if self.mask_image is None:
                 QMessageBox.warning(self, "警告", f"无法打开图像文件: {file_path}")
@@ -1567,31 +1758,6 @@ class TextureChecker(QWidget):
             # 保存路径
             self.mask_image_path = file_path
             
-            # 调整图像显示
-            max_size = 380
-            height, width = self.mask_image.shape[:2]
-            scale = max_size / max(height, width)
-            
-            # 计算缩放后的尺寸
-            display_width = int(width * scale)
-            display_height = int(height * scale)
-            
-            # 缩放图像
-            display_img = cv2.resize(self.mask_image, (display_width, display_height))
-            
-            # 转换为QPixmap
-            if self.mask_image.shape[2] == 4:
-                qimg = QImage(display_img.data, display_width, display_height, 
-                            display_img.strides[0], QImage.Format_ARGB32)
-            else:
-                qimg = QImage(display_img.data, display_width, display_height, 
-                            display_img.strides[0], QImage.Format_BGR888)
-            pixmap = QPixmap.fromImage(qimg)
-            
-            # 清空提示文本
-            self.mask_image_label.clear()
-            self.mask_image_label.setPixmap(pixmap)
-            
             # 显示RGB通道
             self.change_mask_channel("RGB")
             
@@ -1602,28 +1768,25 @@ class TextureChecker(QWidget):
             QMessageBox.warning(self, "警告", f"加载图像时发生错误: {str(e)}")
 
     def update_preview(self, image, label):
-        height, width, channel = image.shape
-
-        # 将BGR转换为RGB以便Qt正确显示
-        converted = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-        bytes_per_line = 3 * width
-        q_image = QImage(
-            converted.data, width, height, bytes_per_line, QImage.Format_RGB888
-        )
-
-        pixmap = QPixmap.fromImage(q_image)
-        # 缩放图片以适应QLabel的大小，保持宽高比
-        scaled_pixmap = pixmap.scaled(
-            label.size(), Qt.KeepAspectRatio, Qt.SmoothTransformation
-        )
-        label.setPixmap(scaled_pixmap)
-        
+        """在预览标签中保持宽高比显示BGR图像(写入标签的预览缓冲区)"""
+        label.show_image(image)
 
     def dragEnterEvent(self, event):
         if event.mimeData().hasUrls():
             event.accept()
         else:
             event.ignore()
+    
+    def closeEvent(self, event):
+        """关闭窗口时停止后台批量任务、缩略图加载、预览图生成和预览渲染线程"""
+        self.result_model.stop_thumbnail_loader()
+        self.preview_loader.stop()
+        self.render_scheduler.stop()
+        if self.batch_thread is not None:
+            self.batch_worker.cancel()
+            self.batch_thread.quit()
+            self.batch_thread.wait()
+        super().closeEvent(event)
             
     def save_image_as(self):
         if not hasattr(self, "temp_hsv_image"):
@@ -1636,6 +1799,8 @@ class TextureChecker(QWidget):
         if file_path:
             # 获取处理后的图像
             processed_image = self.get_processed_image()
+            if processed_image is None:
+                return
             
             # 获取文件扩展名
             _, ext = os.path.splitext(file_path)
@@ -1701,6 +1866,8 @@ class TextureChecker(QWidget):
         if reply == QMessageBox.Yes:
             # 获取处理后的图像
             processed_image = self.get_processed_image()
+            if processed_image is None:
+                return
             
             # 获取原图的文件扩展名
             _, ext = os.path.splitext(self.base_image_path)
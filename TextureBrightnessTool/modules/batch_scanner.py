@@ -1,127 +1,443 @@
 import os
-from PyQt5.QtWidgets import QProgressDialog, QApplication
+from contextlib import closing
 from . import image_utils
+from . import image_probe
+from . import scan_engine
+from . import process_engine
+from .file_index import FileIndex
+from .scan_cache import ScanCache, default_cache_path, entry_from_stats, file_hash
+from .process_journal import ProcessJournal, default_journal_path, STATUS_CLEAN, STATUS_PROCESSED
+
+# 结果文件每行格式：文件路径[\t明度最大值]
+RESULT_SEPARATOR = "\t"
+
+# 无损格式：保存后重新解码与内存中的图像一致，处理时算出的统计可直接写入扫描缓存
+LOSSLESS_EXTS = (".png", ".bmp", ".tga")
+
+# 批量处理时读取阶段得到的文件状态
+PROCESS_RESUMED = "resumed"  # 处理日志中已完成
+PROCESS_CLEAN = "clean"      # 未超出阈值
+PROCESS_EXCEEDS = "exceeds"  # 超出阈值，需要处理
+
+
+def format_result_line(path, max_v=None):
+    """生成结果文件中的一行(不含换行符)"""
+    if max_v is None:
+        return path
+    return f"{path}{RESULT_SEPARATOR}{max_v:.4f}"
+
+
+def parse_result_line(line):
+    """
+    解析结果文件中的一行，兼容只有路径的旧格式
+    
+    返回:
+    (文件路径, 明度最大值或None)
+    """
+    path, _, value = line.rstrip("\r\n").partition(RESULT_SEPARATOR)
+    try:
+        return path.strip(), float(value)
+    except ValueError:
+        return path.strip(), None
+
+
+def report_item(path, entry, threshold):
+    """
+    由缓存记录生成一条超标报告
+    
+    返回:
+    包含 path、max_v、over_count、over_fraction、bbox 的字典
+    (bbox 仅在扫描阈值与 threshold 相同时有效，否则为None)
+    """
+    over_count = image_utils.over_count_from_histogram(entry.histogram, threshold)
+    return {
+        "path": path,
+        "max_v": entry.max_v / 255.0,
+        "over_count": over_count,
+        "over_fraction": over_count / entry.pixel_count if entry.pixel_count else 0.0,
+        "bbox": entry.bbox if entry.threshold == threshold else None,
+    }
 
 class BatchScanner:
     """批量扫描图像文件并检查亮度的模块"""
     
-    def __init__(self):
+    def __init__(self, workers=None):
         self.supported_exts = [".png", ".jpg", ".jpeg", ".bmp", ".tga"]
+        # 并行扫描的工作进程数，None表示使用全部CPU核心
+        self.workers = workers
+        # 是否使用增量缓存(缓存文件位于结果文件旁边)
+        self.use_cache = True
+        # 批量处理是否记录日志，中断后重新运行时跳过已完成的文件
+        self.use_journal = True
+        # 扫描和处理共用的目录索引
+        self.file_index = FileIndex()
+        # 根据文件头跳过的文件：调色板图像、灰度(单通道)图像、最长边小于 min_size 的图像(0表示不限制)
+        # 默认检查所有文件，跳过需要由调用方明确开启
+        self.skip_paletted = False
+        self.skip_grayscale = False
+        self.min_size = 0
+        # 批量处理保存图像时的编码选项(image_utils.EncodeOptions)，None表示使用默认选项
+        self.encode_options = None
         
+    def collect_files(self, folder):
+        """收集文件夹中需要检查亮度的图像文件(使用目录索引，未变化的目录不会重新列出)"""
+        return self.file_index.find_files(folder, self.is_candidate)
+    
+    def skip_reason(self, info):
+        """
+        根据文件头判断是否跳过该文件
+        
+        返回:
+        跳过的原因，不跳过时返回None
+        """
+        if info is None:
+            return None
+        if self.skip_paletted and info.paletted:
+            return "调色板图像"
+        if self.skip_grayscale and info.channels <= 2:
+            return "灰度图像"
+        if max(info.width, info.height) < self.min_size:
+            return f"尺寸过小 {info.width}x{info.height}"
+        return None
+    
+    def filter_files(self, file_list):
+        """
+        读取文件头，去掉不需要检查的文件(不解码像素)
+        
+        返回:
+        (保留的文件列表, 对应的ImageInfo或None列表)，保持原有顺序
+        """
+        infos = image_probe.probe_many(file_list)
+        kept, kept_infos = [], []
+        for path, info in zip(file_list, infos):
+            reason = self.skip_reason(info)
+            if reason is not None:
+                print(f"跳过: {path}，原因: {reason}")
+                continue
+            kept.append(path)
+            kept_infos.append(info)
+        if len(kept) < len(file_list):
+            print(f"根据文件头跳过 {len(file_list) - len(kept)} 个文件")
+        return kept, kept_infos
+    
+    def is_candidate(self, name):
+        """判断文件名是否为需要检查亮度的图像文件"""
+        ext = os.path.splitext(name)[1].lower()
+        return ext in self.supported_exts and image_utils.should_include(name)
+    
     def scan_folder(self, folder, threshold=0.92, out_txt=None, parent=None):
-        """扫描文件夹中的图像文件，检查亮度是否超过阈值"""
-        # 收集符合条件的文件列表
-        file_list = []
-        for root, _, files in os.walk(folder):
-            for name in files:
-                ext = os.path.splitext(name)[1].lower()
-                if ext in self.supported_exts and image_utils.should_include(name):
-                    file_list.append(os.path.join(root, name))
+        """扫描文件夹中的图像文件，检查亮度是否超过阈值(显示模态进度对话框)"""
+        progress = self._create_progress_dialog("正在扫描图片...", "扫描进度", parent)
+        try:
+            return self.run_scan(
+                folder, threshold, out_txt,
+                on_progress=lambda done, total: self._update_progress_dialog(progress, done, total),
+                is_canceled=progress.wasCanceled,
+            )
+        finally:
+            progress.close()
+    
+    def run_scan(self, folder, threshold=0.92, out_txt=None, on_progress=None, on_result=None, is_canceled=None,
+                 file_list=None, on_error=None):
+        """
+        扫描文件夹中的图像文件，检查亮度是否超过阈值(不依赖界面，可在后台线程中调用)
         
-        total = len(file_list)
-        result = []
+        参数:
+        folder: 要扫描的文件夹路径
+        threshold: 亮度阈值
+        out_txt: 结果输出文件，默认为当前目录下的 exceed_brightness.txt
+        on_progress: 进度回调 on_progress(已完成数, 总数)
+        on_result: 发现超出阈值图片时的回调 on_result(文件路径, CacheEntry或None)，按处理完成的顺序调用
+        is_canceled: 返回True时停止扫描
+        file_list: 已收集好的文件列表，为None时遍历folder收集
+        on_error: 文件无法读取时的回调 on_error(文件路径, 错误信息)
         
-        # 创建进度对话框
-        progress = QProgressDialog("正在扫描图片...", "取消", 0, total, parent)
-        progress.setWindowTitle("扫描进度")
-        progress.setMinimumDuration(0)
-        progress.setValue(0)
-        progress.setAutoClose(True)
-        progress.setAutoReset(True)
+        返回:
+        (结果文件路径, 超出阈值的图片数量)
+        """
+        # 收集符合条件的文件列表
+        if file_list is None:
+            file_list = self.collect_files(folder)
+        file_list, infos = self.filter_files(file_list)
         
-        # 处理每个文件
-        for idx, path in enumerate(file_list):
-            progress.setValue(idx)
-            QApplication.processEvents()
-            if progress.wasCanceled():
-                print("用户取消了操作。")
-                break
-            
-            try:
-                img = image_utils.load_image(path)
-                if image_utils.check_brightness(img, threshold):
-                    print(f"超出阈值: {path}")
-                    result.append(path)
-            except Exception as e:
-                print(f"处理失败: {path}，原因: {e}")
+        # 结果文件保持遍历顺序；大文件先分配给工作进程，避免最后剩下几个大文件拖长总时间
+        walk_order = {path: idx for idx, path in enumerate(file_list)}
+        sizes = [image_probe.pixel_count(info) for info in infos]
+        file_list = [file_list[idx] for idx in sorted(range(len(file_list)), key=lambda idx: -sizes[idx])]
         
-        progress.setValue(total)
+        total = len(file_list)
+        result = []
         
-        # 输出结果到文件
         if out_txt is None:
             out_txt = os.path.join(os.getcwd(), "exceed_brightness.txt")
         
+        if on_progress:
+            on_progress(0, total)
+        
+        # 增量缓存：只解码新增或发生变化的文件
+        cache = ScanCache(default_cache_path(out_txt)) if self.use_cache else None
+        try:
+            # 在进程池中并行处理，结果按文件顺序返回
+            with closing(scan_engine.iter_scan(file_list, threshold, self.workers, cache)) as results:
+                for idx, (path, exceeded, error, entry) in enumerate(results):
+                    if is_canceled and is_canceled():
+                        print("用户取消了操作。")
+                        break
+                    
+                    if error is not None:
+                        print(f"处理失败: {path}，原因: {error}")
+                        if on_error:
+                            on_error(path, error)
+                    elif exceeded:
+                        print(f"超出阈值: {path}")
+                        max_v = entry.max_v / 255.0 if entry is not None else None
+                        result.append((walk_order[path], format_result_line(path, max_v)))
+                        if on_result:
+                            on_result(path, entry)
+                    
+                    if on_progress:
+                        on_progress(idx + 1, total)
+        finally:
+            if cache is not None:
+                cache.close()
+        
+        # 输出结果到文件(按遍历顺序)
+        result.sort()
         with open(out_txt, "w", encoding="utf-8") as f:
-            for line in result:
+            for _, line in result:
                 f.write(line + "\n")
                 
         print(f"检查完成，超出阈值的图片已写入: {out_txt}")
         return out_txt, len(result)
+    
+    def load_cached_stats(self, folder, out_txt=None):
+        """
+        读取文件夹中各图像已保存的亮度统计，不读取像素
+        
+        返回:
+        {文件路径: CacheEntry}，只包含已扫描过且可解码的文件
+        """
+        if out_txt is None:
+            out_txt = os.path.join(os.getcwd(), "exceed_brightness.txt")
+        with ScanCache(default_cache_path(out_txt)) as cache:
+            entries = cache.lookup_many(self.collect_files(folder))
+        return {path: entry for path, entry in entries.items() if entry.max_v is not None}
+    
+    def threshold_sweep(self, folder, thresholds, out_txt=None):
+        """
+        根据已保存的直方图统计多个阈值下的超标情况
+        
+        返回:
+        {阈值: (超出阈值的图片数, 超出阈值的像素总数)}
+        """
+        entries = self.load_cached_stats(folder, out_txt)
+        sweep = {}
+        for threshold in thresholds:
+            counts = [image_utils.over_count_from_histogram(e.histogram, threshold) for e in entries.values()]
+            sweep[threshold] = (sum(1 for c in counts if c > 0), sum(counts))
+        return sweep
+    
+    def triage_report(self, folder, threshold=0.92, out_txt=None):
+        """
+        根据已保存的统计生成问题贴图列表，按超出像素占比从高到低排序
+        
+        返回:
+        字典列表，包含 path、max_v、over_count、over_fraction、bbox
+        (bbox 仅在扫描阈值与 threshold 相同时有效，否则为None)
+        """
+        report = []
+        for path, entry in self.load_cached_stats(folder, out_txt).items():
+            item = report_item(path, entry, threshold)
+            if item["over_count"] > 0:
+                report.append(item)
+        report.sort(key=lambda item: item["over_fraction"], reverse=True)
+        return report
         
     def process_folder(self, folder, threshold=0.92, parent=None):
         """
-        批量处理文件夹中亮度超出阈值的图像文件
-        使用曲线映射公式 (1-(x-阈值))*x 处理超出阈值的像素
+        批量处理文件夹中亮度超出阈值的图像文件(显示模态进度对话框)
+        参数和返回值见 run_process
+        """
+        progress = self._create_progress_dialog("正在处理图片...", "处理进度", parent)
+        try:
+            return self.run_process(
+                folder, threshold,
+                on_progress=lambda done, total: self._update_progress_dialog(progress, done, total),
+                is_canceled=progress.wasCanceled,
+            )
+        finally:
+            progress.close()
+    
+    def run_process(self, folder, threshold=0.92, on_progress=None, is_canceled=None, file_list=None,
+                    on_processed=None, on_error=None, journal_path=None, out_txt=None):
+        """
+        批量处理文件夹中亮度超出阈值的图像文件(不依赖界面，可在后台线程中调用)
+        用 image_utils.process_brightness_curve 处理超出阈值的图像：线性明度超过 阈值-0.02 的像素
+        平滑压缩到阈值以下(曲线指数1.5)，RGB按明度等比缩放以保持色相和饱和度，其余像素不变
+        读取、计算(workers个进程)和保存分三段流水线同时进行，回调按文件处理完成的顺序在调用线程中执行
         
         参数:
         folder: 要处理的文件夹路径
         threshold: 亮度阈值
-        parent: 父窗口，用于创建进度对话框
+        on_progress: 进度回调 on_progress(已完成数, 总数)
+        is_canceled: 返回True时停止处理
+        file_list: 已收集好的文件列表，为None时遍历folder收集
+        on_processed: 处理完一张超出阈值的图片后的回调 on_processed(文件路径, 是否保存成功, 处理后是否仍超出阈值)
+        on_error: 文件处理失败时的回调 on_error(文件路径, 错误信息)
+        journal_path: 处理日志文件，默认为当前目录下的 brightness_journal.jsonl；
+                      日志中已完成(内容未再变化)的文件直接跳过，不再解码和检查
+        out_txt: 扫描结果文件，默认为当前目录下的 exceed_brightness.txt；
+                 使用旁边的扫描缓存判断文件是否超出阈值(未超出的文件不解码)，
+                 并写入处理后的亮度统计，之后重新扫描时无需再解码处理过的无损格式文件
         
         返回:
         处理的文件数量和成功处理的文件数量的元组
         """
         # 收集符合条件的文件列表
-        file_list = []
-        for root, _, files in os.walk(folder):
-            for name in files:
-                ext = os.path.splitext(name)[1].lower()
-                if ext in self.supported_exts and image_utils.should_include(name):
-                    file_list.append(os.path.join(root, name))
+        if file_list is None:
+            file_list = self.collect_files(folder)
+        file_list, _ = self.filter_files(file_list)
         
         total = len(file_list)
         processed_count = 0
         success_count = 0
+        resumed_count = 0
         
-        # 创建进度对话框
-        progress = QProgressDialog("正在处理图片...", "取消", 0, total, parent)
-        progress.setWindowTitle("处理进度")
-        progress.setMinimumDuration(0)
-        progress.setValue(0)
-        progress.setAutoClose(True)
-        progress.setAutoReset(True)
+        if on_progress:
+            on_progress(0, total)
         
-        # 处理每个文件
-        for idx, path in enumerate(file_list):
-            progress.setValue(idx)
-            QApplication.processEvents()
-            if progress.wasCanceled():
-                print("用户取消了操作。")
-                break
+        journal = None
+        if self.use_journal:
+            journal = ProcessJournal(journal_path or default_journal_path())
+        
+        if out_txt is None:
+            out_txt = os.path.join(os.getcwd(), "exceed_brightness.txt")
+        cache = ScanCache(default_cache_path(out_txt)) if self.use_cache else None
+        cached = cache.lookup_many(file_list) if cache is not None else {}
+        pending = []
+        
+        def load(path):
+            # 读取线程：判断文件是否需要处理，需要时解码
+            before = None
+            if journal is not None:
+                before = file_hash(path)
+                if journal.lookup(path, threshold, before) is not None:
+                    return None, (PROCESS_RESUMED, before)
             
-            try:
-                # 加载图像
+            # 缓存中有未变化文件的统计时，直接判断是否超出阈值
+            exceeded = None
+            entry = cached.get(path)
+            if entry is not None and entry.max_v is not None:
+                stat = os.stat(path)
+                if entry.size == stat.st_size and (
+                        entry.mtime_ns == stat.st_mtime_ns or entry.content_hash == before):
+                    exceeded = entry.max_v / 255.0 > threshold
+            
+            img = None
+            if exceeded is None:
+                # 加载图像并检查是否需要处理
                 img = image_utils.load_image(path)
-                
-                # 检查是否需要处理
-                if image_utils.check_brightness(img, threshold):
-                    processed_count += 1
-                    
-                    # 应用曲线映射处理
-                    processed_img = image_utils.process_brightness_curve(img,threshold-0.02, threshold,1.5)
+                exceeded = image_utils.check_brightness(img, threshold, image_utils.DEFAULT_TILE_ROWS)
+            if not exceeded:
+                return None, (PROCESS_CLEAN, before)
+            if img is None:
+                img = image_utils.load_image(path)
+            return img, (PROCESS_EXCEEDS, before)
+        
+        def save(path, processed_img, stats, info):
+            # 写入线程：保存处理后的图像(曲线映射已在工作进程中完成，同时得到处理后的统计，无需再次检查像素)
+            _, before = info
+            lossless = os.path.splitext(path)[1].lower() in LOSSLESS_EXTS
+            still_exceeds = stats["max_v"] / 255.0 > threshold
+            
+            # 替换原图之前写入日志：中断后可由文件内容判断是否已替换
+            after = []
+            
+            def before_replace(temp_path):
+                nonlocal still_exceeds
+                if not lossless:
+                    # 有损格式重新编码后像素会变化，按实际写出的文件判断是否仍超出阈值
+                    saved_img = image_utils.load_image(temp_path)
+                    if saved_img is None:
+                        raise OSError("无法读取保存后的图像")
+                    still_exceeds = image_utils.check_brightness(saved_img, threshold, image_utils.DEFAULT_TILE_ROWS)
+                if journal is not None:
+                    after.append(file_hash(temp_path))
+                    journal.append(path, threshold, before, after[0], STATUS_PROCESSED, still_exceeds)
+            
+            # 保存处理后的图像（先写临时文件再替换原图）
+            saved = image_utils.save_image(path, processed_img, before_replace, self.encode_options)
+            entry = None
+            # 有损格式重新编码后像素会变化，只缓存无损格式的统计
+            if saved and cache is not None and lossless:
+                stat = os.stat(path)
+                content_hash = after[0] if after else file_hash(path)
+                entry = entry_from_stats(stat.st_mtime_ns, stat.st_size, content_hash, threshold, stats)
+            return saved, still_exceeds, entry
+        
+        try:
+            results = process_engine.iter_process(file_list, threshold, load, save, self.workers, is_canceled)
+            with closing(results):
+                for idx, (path, info, stats, saved_result, error) in enumerate(results):
+                    status = info[0] if info is not None else None
+                    if status == PROCESS_EXCEEDS:
+                        processed_count += 1
                     
-                    # 保存处理后的图像（替换原图）
-                    if image_utils.save_image(path, processed_img):
-                        success_count += 1
-                        print(f"处理并保存: {path}")
+                    if error is not None:
+                        print(f"处理失败: {path}，原因: {error}")
+                        if on_error:
+                            on_error(path, error)
+                    elif status == PROCESS_RESUMED:
+                        resumed_count += 1
+                    elif status == PROCESS_CLEAN:
+                        if journal is not None:
+                            journal.append(path, threshold, info[1], info[1], STATUS_CLEAN)
+                    else:
+                        saved, still_exceeds, entry = saved_result
+                        if still_exceeds:
+                            print(f"警告: 处理后的图片 {path} 仍然超出阈值!")
+                        if saved:
+                            success_count += 1
+                            print(f"处理并保存: {path}")
+                        if entry is not None:
+                            pending.append((path, entry))
+                        if on_processed:
+                            on_processed(path, saved, still_exceeds)
                     
-                    # 验证处理后的图像是否仍超出阈值
-                    if image_utils.check_brightness(processed_img, threshold):
-                        print(f"警告: 处理后的图片 {path} 仍然超出阈值!")
-            except Exception as e:
-                print(f"处理失败: {path}，原因: {e}")
+                    if on_progress:
+                        on_progress(idx + 1, total)
+            if is_canceled and is_canceled():
+                print("用户取消了操作。")
+        finally:
+            if journal is not None:
+                journal.close()
+            if cache is not None:
+                if pending:
+                    cache.store_many(pending)
+                cache.close()
         
-        progress.setValue(total)
+        if resumed_count:
+            print(f"根据处理日志跳过 {resumed_count} 个已完成的文件")
         print(f"处理完成，共处理 {processed_count} 张图片，成功 {success_count} 张")
         
-        return processed_count, success_count
\ No newline at end of file
+        return processed_count, success_count
+    
+    @staticmethod
+    def _create_progress_dialog(text, title, parent):
+        """创建模态进度对话框"""
+        from PyQt5.QtWidgets import QProgressDialog
+        progress = QProgressDialog(text, "取消", 0, 0, parent)
+        progress.setWindowTitle(title)
+        progress.setMinimumDuration(0)
+        progress.setValue(0)
+        progress.setAutoClose(True)
+        progress.setAutoReset(True)
+        return progress
+    
+    @staticmethod
+    def _update_progress_dialog(progress, done, total):
+        """在当前线程中更新进度对话框并处理界面事件"""
+        from PyQt5.QtWidgets import QApplication
+        progress.setMaximum(total)
+        progress.setValue(done)
+        QApplication.processEvents()
@@ -0,0 +1,79 @@
+"""
+批量扫描/处理的后台线程封装
+在QThread中调用 BatchScanner，通过信号向界面报告进度和结果，界面线程不再执行扫描
+"""
+import threading
+import time
+
+from PyQt5.QtCore import QObject, QThread, pyqtSignal
+
+# 进度信号的最小发送间隔(秒)，避免大量小文件时刷新过于频繁
+PROGRESS_INTERVAL = 0.1
+
+
+class BatchWorker(QObject):
+    """在后台线程中执行批量扫描或批量处理"""
+
+    # 进度(已完成数, 总数)
+    progress = pyqtSignal(int, int)
+    # 发现超出阈值的图片(文件路径, 明度最大值，未知时为-1)
+    result_found = pyqtSignal(str, float)
+    # 任务结束，参数为任务函数的返回值
+    finished = pyqtSignal(object)
+    # 任务出错，参数为错误信息
+    failed = pyqtSignal(str)
+
+    def __init__(self, task, parent=None):
+        """
+        参数:
+        task: 任务函数 task(on_progress, on_result, is_canceled)，在后台线程中执行
+        """
+        super().__init__(parent)
+        self.task = task
+        self._cancel_event = threading.Event()
+        self._last_progress_time = 0.0
+
+    def cancel(self):
+        """请求取消任务(线程安全)"""
+        self._cancel_event.set()
+
+    def is_canceled(self):
+        return self._cancel_event.is_set()
+
+    def run(self):
+        try:
+            result = self.task(self._on_progress, self._on_result, self.is_canceled)
+        except Exception as e:
+            self.failed.emit(str(e))
+            return
+        self.finished.emit(result)
+
+    def _on_progress(self, done, total):
+        # 节流：只有间隔足够或已完成时才发送进度
+        now = time.monotonic()
+        if done >= total or now - self._last_progress_time >= PROGRESS_INTERVAL:
+            self._last_progress_time = now
+            self.progress.emit(done, total)
+
+    def _on_result(self, path, entry=None):
+        max_v = entry.max_v / 255.0 if entry is not None and entry.max_v is not None else -1.0
+        self.result_found.emit(path, max_v)
+
+
+def start_worker(task, parent=None):
+    """
+    创建后台线程并启动任务
+
+    返回:
+    (QThread, BatchWorker)，调用方需持有这两个对象直到 finished/failed 信号发出
+    """
+    thread = QThread(parent)
+    worker = BatchWorker(task)
+    worker.moveToThread(thread)
+    thread.started.connect(worker.run)
+    worker.finished.connect(thread.quit)
+    worker.failed.connect(thread.quit)
+    thread.finished.connect(worker.deleteLater)
+    thread.finished.connect(thread.deleteLater)
+    thread.start()
+    return thread, worker
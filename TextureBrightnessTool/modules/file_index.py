@@ -0,0 +1,67 @@
+"""
+基于 os.scandir 的目录索引
+按目录修改时间缓存每个目录的文件名和子目录，重复遍历同一目录树时只需检查目录的修改时间，
+扫描和批量处理可以共用同一份索引，避免多次完整遍历网络共享目录。
+"""
+import os
+
+
+class FileIndex:
+    """缓存目录内容的文件索引"""
+
+    def __init__(self):
+        # 目录路径 -> (目录修改时间, 文件名列表, 子目录名列表)
+        self._dirs = {}
+
+    def clear(self):
+        """清空缓存"""
+        self._dirs.clear()
+
+    def _list_dir(self, path):
+        """列出目录内容，目录修改时间未变化时直接使用缓存"""
+        mtime_ns = os.stat(path).st_mtime_ns
+        cached = self._dirs.get(path)
+        if cached is not None and cached[0] == mtime_ns:
+            return cached[1], cached[2]
+
+        files, subdirs = [], []
+        with os.scandir(path) as entries:
+            for entry in entries:
+                try:
+                    # 与 os.walk 保持一致：不进入符号链接指向的目录
+                    if entry.is_dir():
+                        if not entry.is_symlink():
+                            subdirs.append(entry.name)
+                    else:
+                        files.append(entry.name)
+                except OSError:
+                    continue
+
+        self._dirs[path] = (mtime_ns, files, subdirs)
+        return files, subdirs
+
+    def iter_files(self, folder):
+        """按 os.walk 的顺序(自顶向下)遍历文件夹中的所有文件路径"""
+        try:
+            files, subdirs = self._list_dir(folder)
+        except OSError:
+            # 目录无法访问时跳过(与 os.walk 默认行为一致)
+            self._dirs.pop(folder, None)
+            return
+        for name in files:
+            yield os.path.join(folder, name)
+        for name in subdirs:
+            yield from self.iter_files(os.path.join(folder, name))
+
+    def find_files(self, folder, predicate):
+        """
+        查找文件夹中满足条件的文件
+
+        参数:
+        folder: 根目录
+        predicate: 判断函数 predicate(文件名) -> bool
+
+        返回:
+        文件路径列表
+        """
+        return [path for path in self.iter_files(folder) if predicate(os.path.basename(path))]
@@ -0,0 +1,156 @@
+"""
+图像文件头探测
+只读取 PNG、TGA、JPG、BMP 的文件头，得到尺寸、位深和通道数，不解码像素。
+批量扫描据此跳过不需要检查的文件(调色板图像、灰度遮罩、过小的mip等)，并把大文件优先分配给工作进程。
+"""
+import struct
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from . import tga_io
+
+# 探测结果
+# format: "png"/"tga"/"jpg"/"bmp"
+# bit_depth: 每个通道(调色板图像为每个索引)的位数
+# channels: 文件中的通道数(含Alpha)，调色板图像为调色板颜色的通道数
+# paletted: 是否为调色板(颜色表)图像
+ImageInfo = namedtuple("ImageInfo", ["format", "width", "height", "bit_depth", "channels", "paletted"])
+
+# 并行读取文件头的线程数(主要是IO等待)
+PROBE_THREADS = 8
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+# PNG颜色类型 -> 通道数
+PNG_CHANNELS = {0: 1, 2: 3, 3: 3, 4: 2, 6: 4}
+PNG_COLOR_PALETTE = 3
+
+# JPEG中没有长度字段的标记(RSTn、SOI、TEM)
+JPEG_STANDALONE_MARKERS = set(range(0xD0, 0xD8)) | {0xD8, 0x01}
+# 帧头标记SOFn(不包括 DHT、JPG扩展、DAC)
+JPEG_SOF_MARKERS = set(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+JPEG_EOI = 0xD9
+JPEG_SOS = 0xDA
+
+BMP_CORE_HEADER_SIZE = 12
+
+
+def _probe_png(f):
+    header = f.read(33)
+    if len(header) < 33 or header[12:16] != b"IHDR":
+        return None
+    width, height, bit_depth, color_type = struct.unpack(">IIBB", header[16:26])
+    if color_type not in PNG_CHANNELS:
+        return None
+    return ImageInfo("png", width, height, bit_depth, PNG_CHANNELS[color_type], color_type == PNG_COLOR_PALETTE)
+
+
+def _probe_jpg(f):
+    f.seek(2)
+    while True:
+        byte = f.read(1)
+        if not byte:
+            return None
+        if byte != b"\xff":
+            continue
+        # 标记前可以有任意个填充字节0xFF
+        marker = f.read(1)
+        while marker == b"\xff":
+            marker = f.read(1)
+        if not marker:
+            return None
+        marker = marker[0]
+        if marker in JPEG_STANDALONE_MARKERS:
+            continue
+        if marker in (JPEG_EOI, JPEG_SOS):
+            return None
+
+        length = f.read(2)
+        if len(length) < 2:
+            return None
+        length = struct.unpack(">H", length)[0]
+        if marker in JPEG_SOF_MARKERS:
+            segment = f.read(6)
+            if len(segment) < 6:
+                return None
+            precision, height, width, components = struct.unpack(">BHHB", segment)
+            return ImageInfo("jpg", width, height, precision, components, False)
+        f.seek(length - 2, 1)
+
+
+def _probe_bmp(f):
+    f.seek(14)
+    header = f.read(16)
+    if len(header) < 4:
+        return None
+    header_size = struct.unpack("<I", header[:4])[0]
+    if header_size == BMP_CORE_HEADER_SIZE:
+        if len(header) < 12:
+            return None
+        width, height, _planes, bits = struct.unpack("<HHHH", header[4:12])
+    else:
+        if len(header) < 16:
+            return None
+        width, height, _planes, bits = struct.unpack("<iiHH", header[4:16])
+    width, height = abs(width), abs(height)
+    if bits <= 8:
+        return ImageInfo("bmp", width, height, bits, 3, True)
+    return ImageInfo("bmp", width, height, 8, 4 if bits == 32 else 3, False)
+
+
+def _probe_tga(f):
+    try:
+        header = tga_io.parse_header(f.read(tga_io.HEADER_SIZE))
+    except ValueError:
+        return None
+    kind = header.image_type & 7
+    if kind == tga_io.TYPE_COLORMAP:
+        channels = 4 if header.colormap_depth == 32 else 3
+        return ImageInfo("tga", header.width, header.height, header.depth, channels, True)
+    if kind == tga_io.TYPE_GRAY:
+        return ImageInfo("tga", header.width, header.height, 8, 2 if header.depth == 16 else 1, False)
+    if kind == tga_io.TYPE_TRUECOLOR:
+        return ImageInfo("tga", header.width, header.height, 8, 4 if header.depth == 32 else 3, False)
+    return None
+
+
+def probe_image(path):
+    """
+    读取图像文件头
+
+    返回:
+    ImageInfo，格式不支持或文件头无法识别时返回None(应按普通文件完整解码)
+    """
+    try:
+        with open(path, "rb") as f:
+            signature = f.read(8)
+            f.seek(0)
+            if signature == PNG_SIGNATURE:
+                return _probe_png(f)
+            if signature[:2] == b"\xff\xd8":
+                return _probe_jpg(f)
+            if signature[:2] == b"BM":
+                return _probe_bmp(f)
+            # TGA没有文件标识，只能按扩展名判断
+            if path.lower().endswith(".tga"):
+                return _probe_tga(f)
+    except (OSError, struct.error):
+        return None
+    return None
+
+
+def probe_many(paths, threads=PROBE_THREADS):
+    """
+    并行读取多个文件的文件头
+
+    返回:
+    与paths顺序一致的 ImageInfo 或 None 列表
+    """
+    if len(paths) < 2:
+        return [probe_image(path) for path in paths]
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        return list(executor.map(probe_image, paths, chunksize=64))
+
+
+def pixel_count(info):
+    """文件头中的像素数，无法探测时为0"""
+    return info.width * info.height if info is not None else 0
@@ -1,7 +1,45 @@
 import os
+import shutil
+import threading
+from collections import namedtuple
+from functools import lru_cache
+
 import cv2
 import numpy as np
-import imageio.v2 as imageio
+
+from . import tga_io
+
+# 批量扫描时流式检查使用的默认分块行数
+DEFAULT_TILE_ROWS = 256
+
+# 保存图像时的编码选项
+# png_compression: PNG的zlib压缩级别(0-9)，越大文件越小、编码越慢
+# png_strategy: PNG的zlib压缩策略，PNG_STRATEGIES 中的名称
+# png_filter: PNG的行过滤方式，PNG_FILTERS 中的名称，None表示使用编码器默认值
+# tga_rle: TGA是否使用RLE压缩
+EncodeOptions = namedtuple("EncodeOptions", ["png_compression", "png_strategy", "png_filter", "tga_rle"])
+
+# 默认选项：与之前经imageio(Pillow)保存时相同的zlib级别和策略，TGA不压缩
+DEFAULT_ENCODE_OPTIONS = EncodeOptions(6, "default", None, False)
+
+PNG_STRATEGIES = {
+    "default": cv2.IMWRITE_PNG_STRATEGY_DEFAULT,
+    "filtered": cv2.IMWRITE_PNG_STRATEGY_FILTERED,
+    "huffman": cv2.IMWRITE_PNG_STRATEGY_HUFFMAN_ONLY,
+    "rle": cv2.IMWRITE_PNG_STRATEGY_RLE,
+    "fixed": cv2.IMWRITE_PNG_STRATEGY_FIXED,
+}
+
+# 行过滤方式 -> OpenCV常量名(OpenCV 4.11起支持，更早的版本忽略该选项)
+PNG_FILTERS = {
+    "none": "IMWRITE_PNG_FILTER_NONE",
+    "sub": "IMWRITE_PNG_FILTER_SUB",
+    "up": "IMWRITE_PNG_FILTER_UP",
+    "avg": "IMWRITE_PNG_FILTER_AVG",
+    "paeth": "IMWRITE_PNG_FILTER_PAETH",
+    "fast": "IMWRITE_PNG_FAST_FILTERS",
+    "all": "IMWRITE_PNG_ALL_FILTERS",
+}
 
 def gamma_to_linear(gamma_value):
     """将伽马空间的值转换到线性空间"""
@@ -11,10 +49,22 @@ def linear_to_gamma(linear_value):
     """将线性空间的值转换到伽马空间"""
     return np.power(linear_value, 1 / 2.2)
 
-def load_image(file_path):
-    """加载图像文件，支持常见格式和TGA格式"""
+def load_image(file_path, use_mmap=False):
+    """
+    加载图像文件，支持常见格式和TGA格式
+
+    参数:
+    file_path: 文件路径
+    use_mmap: 只读取统计信息时使用，TGA直接内存映射，返回的数组可能不连续或只读
+    """
     ext = os.path.splitext(file_path)[1].lower()
     if ext == ".tga":
+        try:
+            return tga_io.read_tga(file_path, use_mmap)
+        except tga_io.TgaUnsupportedError:
+            pass
+        # 其他TGA格式交给imageio，imageio导入较慢，只在需要时导入
+        import imageio.v2 as imageio
         img = imageio.imread(file_path)
         if img.shape[-1] == 4:  # 带Alpha通道
             img = cv2.cvtColor(img, cv2.COLOR_RGBA2BGRA)
@@ -24,43 +74,144 @@ def load_image(file_path):
         img = cv2.imread(file_path, cv2.IMREAD_UNCHANGED)
     return img
 
-def save_image(file_path, img):
-    """保存图像文件，自动处理格式问题"""
+def png_params(options):
+    """由编码选项生成 cv2.imwrite 的PNG参数(压缩级别会重置策略，必须在策略之前)"""
+    params = [cv2.IMWRITE_PNG_COMPRESSION, options.png_compression,
+              cv2.IMWRITE_PNG_STRATEGY, PNG_STRATEGIES[options.png_strategy]]
+    if options.png_filter is not None and hasattr(cv2, "IMWRITE_PNG_FILTER"):
+        params += [cv2.IMWRITE_PNG_FILTER, getattr(cv2, PNG_FILTERS[options.png_filter])]
+    return params
+
+def write_image(file_path, img, options=None):
+    """
+    按扩展名编码并直接写入图像文件，失败时抛出异常
+    PNG由OpenCV、TGA由tga_io直接编码BGR(A)数组，不生成交换通道后的中间图像
+
+    参数:
+    options: EncodeOptions，为None时使用 DEFAULT_ENCODE_OPTIONS
+    """
+    if options is None:
+        options = DEFAULT_ENCODE_OPTIONS
+    # 获取扩展名
+    _, ext = os.path.splitext(file_path)
+    ext = ext.lower()
+    
+    if ext == ".tga":
+        tga_io.write_tga(file_path, img, options.tga_rle)
+        return
+    
+    # PNG和其他格式使用OpenCV保存(OpenCV本身按BGR(A)顺序编码，保留Alpha通道)
+    params = png_params(options) if ext == ".png" else []
+    if not cv2.imwrite(file_path, img, params):
+        raise OSError("OpenCV无法写入该文件")
+
+def temp_image_path(file_path):
+    """保存时使用的临时文件路径(同目录、同扩展名，文件名不以 _d 结尾，不会被扫描收集)"""
+    root, ext = os.path.splitext(file_path)
+    # 包含进程和线程编号，多个线程同时保存也不会冲突
+    return f"{root}.tmp{os.getpid()}_{threading.get_ident()}{ext}"
+
+def save_image(file_path, img, before_replace=None, options=None):
+    """
+    保存图像文件，自动处理格式问题
+    先完整写入同目录下的临时文件并落盘，再重命名替换目标文件，进程中途被终止也不会留下写了一半的文件
+    编码和写入时释放GIL，可在后台线程(如批量处理的写入线程)中调用，多个线程可同时保存不同的文件
+
+    参数:
+    file_path: 目标文件路径
+    img: 要保存的图像
+    before_replace: 临时文件写完、替换目标文件之前的回调 before_replace(临时文件路径)，如写入处理日志
+    options: 编码选项 EncodeOptions，为None时使用 DEFAULT_ENCODE_OPTIONS
+
+    返回:
+    是否保存成功
+    """
+    temp_path = temp_image_path(file_path)
     try:
-        # 获取扩展名
-        _, ext = os.path.splitext(file_path)
-        ext = ext.lower()
-        
-        # TGA或PNG格式(需要处理Alpha通道)
-        if ext in ['.tga', '.png']:
-            # 检查图像是否有Alpha通道
-            has_alpha = img.shape[2] == 4 if len(img.shape) == 3 and img.shape[2] <= 4 else False
-            
-            if has_alpha:
-                # BGR转RGB，保留Alpha
-                img_rgba = np.zeros_like(img)
-                img_rgba[:, :, 0] = img[:, :, 2]  # R = B
-                img_rgba[:, :, 1] = img[:, :, 1]  # G = G
-                img_rgba[:, :, 2] = img[:, :, 0]  # B = R
-                img_rgba[:, :, 3] = img[:, :, 3]  # A = A
-                imageio.imwrite(file_path, img_rgba)
-            else:
-                # BGR转RGB, 无Alpha
-                img_rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-                imageio.imwrite(file_path, img_rgb)
-        else:
-            # 其他格式使用OpenCV保存
-            cv2.imwrite(file_path, img)
+        write_image(temp_path, img, options)
+        with open(temp_path, "rb+") as f:
+            os.fsync(f.fileno())
+        # 保留原文件的权限
+        if os.path.exists(file_path):
+            shutil.copymode(file_path, temp_path)
+        if before_replace is not None:
+            before_replace(temp_path)
+        os.replace(temp_path, file_path)
         return True
     except Exception as e:
         print(f"保存图像失败: {file_path}, 错误: {e}")
         return False
+    finally:
+        # 失败或被中断时删除临时文件(替换成功后临时文件已不存在)
+        if os.path.exists(temp_path):
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
 
-def check_brightness(img, threshold=0.92):
-    """检查图像的亮度是否超过阈值"""
-    if img is None:
-        return False
-    
+def _build_gamma_to_linear_lut():
+    """构建 伽马字节 -> 线性字节 的查找表，与逐像素浮点计算结果逐位一致"""
+    return (gamma_to_linear(np.arange(256) / 255.0) * 255).astype(np.uint8)
+
+# 伽马空间字节值 -> 线性空间字节值 (256项)
+# 该映射单调不减，因此 HSV 的明度 V = max(LUT[R], LUT[G], LUT[B]) = LUT[max(R, G, B)]
+GAMMA_TO_LINEAR_LUT = _build_gamma_to_linear_lut()
+
+# 线性空间字节值 -> 伽马空间字节值 (256项)
+LINEAR_TO_GAMMA_LUT = (linear_to_gamma(np.arange(256) / 255.0) * 255).astype(np.uint8)
+
+
+@lru_cache(maxsize=64)
+def brightness_cutoff(threshold):
+    """
+    计算亮度阈值对应的原始(伽马空间)字节下限
+    当且仅当像素三通道最大值 >= 该值时，其线性明度 V/255 > threshold
+
+    返回:
+    0-256之间的整数，256表示任何像素都不会超过阈值
+    """
+    over = (GAMMA_TO_LINEAR_LUT / 255.0) > threshold
+    indices = np.flatnonzero(over)
+    return int(indices[0]) if indices.size else 256
+
+
+@lru_cache(maxsize=64)
+def value_cutoff(threshold):
+    """
+    计算亮度阈值对应的明度字节下限：V/255 > threshold 当且仅当 V >= 该值
+
+    返回:
+    0-256之间的整数，256表示任何明度都不会超过阈值
+    """
+    over = (np.arange(256) / 255.0) > threshold
+    indices = np.flatnonzero(over)
+    return int(indices[0]) if indices.size else 256
+
+
+def max_channel(img):
+    """逐像素求BGR三通道最大值(整数运算)，灰度图直接返回自身"""
+    if img.ndim == 2:
+        return img
+    return np.maximum(np.maximum(img[:, :, 0], img[:, :, 1]), img[:, :, 2])
+
+
+def max_color_byte(img):
+    """返回uint8图像BGR通道中的最大字节值，逐通道归约，不产生临时数组"""
+    if img.ndim == 2:
+        return int(img.max())
+    return max(int(img[:, :, c].max()) for c in range(min(img.shape[2], 3)))
+
+
+def linear_value_bytes(img):
+    """
+    计算uint8图像在线性空间下的HSV明度通道(uint8)
+    等价于 gamma_to_linear -> RGB2HSV 后取V通道，但不产生浮点中间结果
+    """
+    return GAMMA_TO_LINEAR_LUT[max_channel(img)]
+
+
+def _value_channel_float(img):
+    """浮点参考实现，计算线性空间HSV明度通道(uint8)，用于非uint8图像(如16位PNG)"""
     # 处理灰度图像
     if img.ndim == 2:
         img = cv2.cvtColor(img, cv2.COLOR_GRAY2BGR)
@@ -75,11 +226,120 @@ def check_brightness(img, threshold=0.92):
     # BGR转RGB再转HSV
     rgb_linear = linear_img[:, :, [2, 1, 0]]
     hsv = cv2.cvtColor((rgb_linear * 255).astype(np.uint8), cv2.COLOR_RGB2HSV)
-    
+    return hsv[:, :, 2]
+
+def _check_brightness_float(img, threshold):
+    """浮点参考实现的亮度检查"""
     # 检查明度通道
-    v = hsv[:, :, 2] / 255.0
+    v = _value_channel_float(img) / 255.0
     return np.any(v > threshold)
 
+def iter_row_tiles(img, tile_rows):
+    """按行分块遍历图像，返回的每一块都是原图的视图(不复制数据)"""
+    height = img.shape[0]
+    for start in range(0, height, tile_rows):
+        yield img[start:start + tile_rows]
+
+def check_brightness(img, threshold=0.92, tile_rows=None):
+    """
+    检查图像的亮度是否超过阈值
+
+    参数:
+    img: 输入图像
+    threshold: 亮度阈值
+    tile_rows: 分块行数，为None时整图检查；
+               指定后按行分块流式检查，遇到第一块超出阈值即返回，
+               中间结果的内存峰值只与一块的大小相关
+    """
+    if img is None:
+        return False
+
+    if tile_rows:
+        return any(check_brightness(tile, threshold) for tile in iter_row_tiles(img, tile_rows))
+
+    if img.dtype != np.uint8:
+        return bool(_check_brightness_float(img, threshold))
+
+    # 查找表单调，任一像素 V 超过阈值 等价于 全图RGB通道最大值 >= 对应的字节下限
+    cutoff = brightness_cutoff(threshold)
+    if cutoff > 255:
+        return False
+    return max_color_byte(img) >= cutoff
+
+def brightness_stats(img, threshold=0.92, tile_rows=None):
+    """
+    一次遍历计算图像的亮度统计信息
+
+    参数:
+    img: 输入图像
+    threshold: 用于统计超出像素和包围盒的亮度阈值
+    tile_rows: 分块行数，为None时整图计算
+
+    返回:
+    字典，图像为空时返回None:
+        max_v: 线性空间HSV明度最大值(0-255)
+        pixel_count: 像素总数
+        over_count: 明度超过阈值的像素数
+        over_fraction: 超出像素占比
+        histogram: 明度直方图(256个区间，int64数组)
+        bbox: 超出像素的包围盒 (x0, y0, x1, y1)，含端点；无超出像素时为None
+    """
+    if img is None or img.size == 0:
+        return None
+
+    tiles = iter_row_tiles(img, tile_rows or img.shape[0])
+    if img.dtype == np.uint8:
+        return _stats_from_planes((max_channel(tile) for tile in tiles), threshold, raw=True)
+    return _stats_from_planes((_value_channel_float(tile) for tile in tiles), threshold, raw=False)
+
+def _stats_from_planes(planes, threshold, raw):
+    """
+    由按行分块的逐像素平面累计亮度统计信息，结果格式见 brightness_stats
+
+    参数:
+    planes: 二维uint8平面的可迭代对象，按从上到下的顺序
+    raw: 为True时平面为原始(伽马空间)三通道最大值，否则为线性空间明度
+    """
+    histogram = np.zeros(256, dtype=np.int64)
+    cutoff = brightness_cutoff(threshold) if raw else value_cutoff(threshold)
+    x0 = y0 = None
+    x1 = y1 = -1
+    row_offset = 0
+    for plane in planes:
+        if raw:
+            # 先统计原始通道最大值的直方图，再经查找表合并到明度区间，避免逐像素查表
+            raw_hist = np.bincount(plane.ravel(), minlength=256)
+            tile_hist = np.bincount(GAMMA_TO_LINEAR_LUT, weights=raw_hist, minlength=256).astype(np.int64)
+        else:
+            tile_hist = np.bincount(plane.ravel(), minlength=256)
+        histogram += tile_hist
+
+        # 只在本块存在超出像素时计算包围盒
+        if tile_hist[value_cutoff(threshold):].any():
+            over = plane >= cutoff
+            rows = np.flatnonzero(over.any(axis=1))
+            cols = np.flatnonzero(over.any(axis=0))
+            y0 = row_offset + int(rows[0]) if y0 is None else y0
+            y1 = row_offset + int(rows[-1])
+            x0 = int(cols[0]) if x0 is None else min(x0, int(cols[0]))
+            x1 = max(x1, int(cols[-1]))
+        row_offset += plane.shape[0]
+
+    pixel_count = int(histogram.sum())
+    over_count = over_count_from_histogram(histogram, threshold)
+    return {
+        "max_v": int(np.flatnonzero(histogram)[-1]),
+        "pixel_count": pixel_count,
+        "over_count": over_count,
+        "over_fraction": over_count / pixel_count,
+        "histogram": histogram,
+        "bbox": (x0, y0, x1, y1) if over_count else None,
+    }
+
+def over_count_from_histogram(histogram, threshold):
+    """根据明度直方图计算任意阈值下的超出像素数，无需重新读取像素"""
+    return int(np.asarray(histogram)[value_cutoff(threshold):].sum())
+
 def should_include(filename):
     """判断文件是否应该被包含在亮度检查中"""
     name, _ = os.path.splitext(os.path.basename(filename))
@@ -91,22 +351,106 @@ def hsv_to_bgr(hsv_image):
     return rgb_image[:, :, [2, 1, 0]]
 
 
-def process_brightness_curve(img, threshold_start=0.90, threshold_map=0.92, power=2.0):
+@lru_cache(maxsize=16)
+def brightness_curve_lut(threshold_start, threshold_map, power):
+    """
+    构建明度字节的平滑曲线映射表(256项)，与逐像素浮点计算结果一致
+    小于等于threshold_start的明度不变，大于threshold_start的明度平滑压缩到threshold_map以下
+    """
+    v = np.arange(256) / 255.0
+    # np.where会同时计算两个分支，阈值以下分支中的负数开方结果不会被使用
+    with np.errstate(invalid="ignore"):
+        y = np.where(
+            v <= threshold_start,
+            v,
+            threshold_start + (threshold_map - threshold_start) * ((v - threshold_start) / (1 - threshold_start)) ** (1/power)
+        )
+    y = np.clip(y, 0, threshold_map)
+    return (y * 255).astype(np.uint8)
+
+
+@lru_cache(maxsize=16)
+def _brightness_remap_table(threshold_start, threshold_map, power):
+    """
+    构建融合映射表 table[m, c]：
+    m 为像素原始三通道最大值，c 为某一通道的原始值，结果为曲线映射后该通道的伽马空间值。
+    计算过程：伽马转线性 -> 按 新明度/原明度 等比缩放(四舍五入) -> 线性转伽马
+    """
+    value = GAMMA_TO_LINEAR_LUT.astype(np.int64)[:, None]
+    new_value = brightness_curve_lut(threshold_start, threshold_map, power)[value]
+    linear = GAMMA_TO_LINEAR_LUT.astype(np.int64)[None, :]
+    scaled = (linear * new_value + value // 2) // np.maximum(value, 1)
+    return LINEAR_TO_GAMMA_LUT[np.clip(scaled, 0, 255)]
+
+
+def process_brightness_curve(img, threshold_start=0.90, threshold_map=0.92, power=2.0, inplace=False,
+                             stats_threshold=None):
     """
     对图像中超出阈值的像素进行平滑曲线映射处理
     小于等于threshold_start的像素不变，大于threshold_start的像素平滑压缩到threshold_map以下
 
+    uint8图像使用预计算的查找表融合计算：只处理明度超过threshold_start的像素，
+    在线性空间中按 新明度/原明度 等比缩放RGB(即保持色相和饱和度)，其余像素逐字节保持不变
+
     参数:
     img: 输入图像，BGR或BGRA格式
     threshold_start: 开始映射的亮度阈值
     threshold_map: 映射后的最大亮度值
     power: 控制曲线平滑度
+    inplace: 为True时直接修改输入图像(图像需可写且内存连续)，避免复制整张图
+    stats_threshold: 指定时同时返回处理后图像在该阈值下的亮度统计(格式见 brightness_stats)；
+                     uint8图像直接由映射过程中的通道最大值得出，不再重新遍历三个通道
     返回:
-    处理后的图像，与输入图像格式相同
+    处理后的图像，与输入图像格式相同(灰度图返回BGR格式)；
+    指定 stats_threshold 时返回 (处理后的图像, 亮度统计)
     """
     if img is None:
-        return None
+        return None if stats_threshold is None else (None, None)
+
+    if img.dtype != np.uint8:
+        processed = _process_brightness_curve_float(img, threshold_start, threshold_map, power)
+        if stats_threshold is None:
+            return processed
+        return processed, brightness_stats(processed, stats_threshold)
+
+    if img.ndim == 2:
+        processed = cv2.cvtColor(img, cv2.COLOR_GRAY2BGR)
+    elif inplace and img.flags.writeable and img.flags.c_contiguous:
+        processed = img
+    else:
+        processed = img.copy()
+
+    def result(max_plane):
+        if stats_threshold is None:
+            return processed
+        if max_plane is None:
+            return processed, brightness_stats(processed, stats_threshold)
+        return processed, _stats_from_planes([max_plane], stats_threshold, raw=True)
+
+    # 原始通道最大值 >= cutoff 等价于 线性明度 > threshold_start
+    cutoff = brightness_cutoff(threshold_start)
+    if cutoff > 255:
+        return result(None)
+    max_plane = max_channel(processed)
+    flat_max = max_plane.ravel()
+    indices = np.flatnonzero(flat_max >= cutoff)
+    if indices.size == 0:
+        return result(max_plane)
+
+    # 以 (像素通道最大值, 通道原始值) 查二维表，一次得到映射后的伽马空间通道值
+    pixels = processed.reshape(-1, processed.shape[2])
+    table = _brightness_remap_table(threshold_start, threshold_map, power)
+    keys = flat_max[indices].astype(np.intp)[:, None] * 256 + np.take(pixels, indices, axis=0)[:, :3]
+    remapped = table.ravel()[keys]
+    pixels[indices, :3] = remapped
+    if stats_threshold is not None:
+        # 映射后的通道最大值写回(新分配的)最大值平面，即为处理后图像的最大值平面
+        flat_max[indices] = remapped.max(axis=1)
+    return result(max_plane)
+
 
+def _process_brightness_curve_float(img, threshold_start, threshold_map, power):
+    """浮点参考实现，用于非uint8图像"""
     # 保存原始图像格式信息
     has_alpha = img.shape[2] == 4 if len(img.shape) == 3 else False
     original_dtype = img.dtype
@@ -0,0 +1,48 @@
+"""
+材质阈值配置
+不依赖Qt，界面和命令行工具共用
+"""
+import os
+import json
+
+# 默认配置文件位置
+MATERIAL_CONFIG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "config", "material_thresholds.json")
+
+# 配置文件不存在时使用并写入的默认阈值
+DEFAULT_MATERIAL_THRESHOLDS = {
+    "布料": 0.90,
+    "皮肤": 0.87,
+    "玉石": 0.82,
+    "金属": 0.92
+}
+
+
+def load_material_thresholds(config_path=None):
+    """
+    加载材质阈值配置
+
+    参数:
+    config_path: 配置文件路径，为None时使用默认配置文件(不存在时自动创建)；
+                 明确指定的文件不存在或格式错误时抛出 OSError / ValueError，不回退到默认阈值
+
+    返回:
+    {材质名称: 阈值}
+    """
+    if config_path is not None:
+        with open(config_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    try:
+        # 尝试从配置文件加载
+        if os.path.exists(MATERIAL_CONFIG_PATH):
+            with open(MATERIAL_CONFIG_PATH, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        else:
+            # 如果配置文件不存在，创建默认配置
+            os.makedirs(os.path.dirname(MATERIAL_CONFIG_PATH), exist_ok=True)
+            with open(MATERIAL_CONFIG_PATH, 'w', encoding='utf-8') as f:
+                json.dump(DEFAULT_MATERIAL_THRESHOLDS, f, ensure_ascii=False, indent=4)
+            return dict(DEFAULT_MATERIAL_THRESHOLDS)
+    except Exception as e:
+        print(f"加载材质阈值配置失败：{e}")
+        return dict(DEFAULT_MATERIAL_THRESHOLDS)
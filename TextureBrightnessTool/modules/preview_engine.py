@@ -0,0 +1,340 @@
+"""
+单张分析页面的预览计算
+拖动滑块时只在与预览标签尺寸相当的代理图像上计算，原图分辨率的结果只在保存时计算。
+本模块只包含不依赖Qt的纯函数，可以在后台线程中调用。
+"""
+from collections import namedtuple
+from functools import lru_cache
+
+import cv2
+import numpy as np
+
+from . import image_utils
+
+# 代理图像相对预览标签尺寸的倍数(1倍用于普通屏幕，2倍用于高分屏)
+PROXY_SCALES = (1, 2)
+
+# 一级代理图像
+# hsv: 线性空间的HSV图像(uint8)
+# v_max: 每个代理像素覆盖的原图区域内的最大明度，用于检查明度，避免缩小后亮点被平均掉；原图级别为None
+#        (原图为缓存的预览图时为缓存的最大明度平面)
+PreviewLevel = namedtuple("PreviewLevel", ["hsv", "v_max"])
+
+# 一个区域的调整参数快照(可哈希，用于缓存查找表)
+RegionParams = namedtuple("RegionParams", ["brightness_factor", "clamp_min", "clamp_max", "threshold"])
+
+# 成员位图(uint8)最多支持的区域数量，与界面上的区域数量上限一致
+MAX_LABEL_REGIONS = 8
+
+# 按 位图 * 256 + 明度字节 索引的扁平查找表
+# value_bytes: 调整后的线性明度字节; gray_bytes: 调整后明度的伽马空间灰度字节; exceeded: 调整后明度是否超过阈值
+RegionTables = namedtuple("RegionTables", ["value_bytes", "gray_bytes", "exceeded"])
+
+
+def to_linear_hsv(bgr_image):
+    """
+    将伽马空间的BGR图像转换为线性空间的HSV图像(uint8)
+
+    参数:
+    bgr_image: load_image 读取的图像(可带alpha通道)
+    """
+    if bgr_image.ndim == 2:
+        bgr_image = cv2.cvtColor(bgr_image, cv2.COLOR_GRAY2BGR)
+    rgb_image = bgr_image[:, :, [2, 1, 0]]  # BGR -> RGB
+    if bgr_image.dtype == np.uint8:
+        # 查找表与逐像素浮点计算结果一致
+        rgb_linear = image_utils.GAMMA_TO_LINEAR_LUT[rgb_image]
+    else:
+        rgb_linear = (image_utils.gamma_to_linear(rgb_image / 255.0) * 255).astype(np.uint8)
+    return cv2.cvtColor(rgb_linear, cv2.COLOR_RGB2HSV)
+
+
+def value_plane(bgr_image):
+    """原图线性空间HSV的明度通道(uint8)，与 to_linear_hsv 结果的V通道一致"""
+    if bgr_image.dtype == np.uint8:
+        return image_utils.linear_value_bytes(bgr_image)
+    return to_linear_hsv(bgr_image)[:, :, 2]
+
+
+def max_pool(plane, dsize):
+    """
+    将单通道图像缩小到dsize(宽, 高)，每个输出像素取其覆盖区域内的最大值
+
+    先用矩形核向右下方膨胀，再按最近邻采样每个区域的左上角
+    """
+    height, width = plane.shape[:2]
+    kernel_w = -(-width // dsize[0])
+    kernel_h = -(-height // dsize[1])
+    kernel = np.ones((kernel_h, kernel_w), dtype=np.uint8)
+    dilated = cv2.dilate(plane, kernel, anchor=(0, 0), borderType=cv2.BORDER_REPLICATE)
+    return cv2.resize(dilated, dsize, interpolation=cv2.INTER_NEAREST)
+
+
+def build_pyramid(bgr_image, hsv_image, label_size, scales=PROXY_SCALES, v_max=None):
+    """
+    构建预览用的代理图像金字塔
+
+    参数:
+    bgr_image: 原图(伽马空间)
+    hsv_image: 原图对应的线性空间HSV图像
+    label_size: 预览标签的边长
+    scales: 代理图像相对标签尺寸的倍数
+    v_max: bgr_image本身是缩小后的预览图时，每个像素覆盖的原图区域内的最大明度(与预览图尺寸一致)；
+           为None时以hsv_image的明度通道为准
+
+    返回:
+    PreviewLevel 列表，从小到大排列；原图不大于某一级时以原图代替该级并结束
+    """
+    height, width = hsv_image.shape[:2]
+    levels = []
+    for scale in sorted(scales):
+        size = label_size * scale
+        if max(height, width) <= size:
+            # 原图不比这一级大，直接使用原图
+            levels.append(PreviewLevel(hsv_image, v_max))
+            break
+        ratio = size / max(height, width)
+        dsize = (max(1, int(width * ratio)), max(1, int(height * ratio)))
+        small = cv2.resize(bgr_image, dsize, interpolation=cv2.INTER_AREA)
+        source_v = hsv_image[:, :, 2] if v_max is None else v_max
+        levels.append(PreviewLevel(to_linear_hsv(small), max_pool(source_v, dsize)))
+    return levels
+
+
+def select_level(levels, target_size):
+    """选择边长不小于target_size的最小一级代理图像，都不够大时返回最大一级"""
+    for level in levels:
+        if max(level.hsv.shape[:2]) >= target_size:
+            return level
+    return levels[-1]
+
+
+@lru_cache(maxsize=256)
+def value_range_table(color_value, error_value):
+    """
+    Mask字节 -> 是否在 color_value ± error_value 范围内 的查找表(256项)
+    与把字节除以255.0后做浮点比较的结果一致，用 表[字节平面] 即可得到区域掩码
+    """
+    value = np.arange(256) / 255.0
+    selected = (value >= max(0.0, color_value - error_value)) & (value <= min(1.0, color_value + error_value))
+    selected.flags.writeable = False
+    return selected
+
+
+def build_label_map(masks):
+    """
+    将各区域的布尔掩码合并为一张成员位图，像素属于第i个区域时第i位为1
+
+    参数:
+    masks: 与区域参数顺序一致的布尔掩码列表，尺寸相同
+
+    返回:
+    uint8位图
+    """
+    if len(masks) > MAX_LABEL_REGIONS:
+        raise ValueError(f"区域数量不能超过 {MAX_LABEL_REGIONS} 个")
+    labels = np.zeros(masks[0].shape, dtype=np.uint8)
+    for i, mask in enumerate(masks):
+        np.bitwise_or(labels, np.uint8(1 << i), out=labels, where=mask)
+    return labels
+
+
+@lru_cache(maxsize=64)
+def region_tables(params):
+    """
+    按区域参数构建 (成员位图, 明度字节) -> 结果 的查找表
+
+    每个像素只由第一个包含它的区域(位图最低位)调整明度；
+    只要任一包含它的区域的阈值被超过即视为超出，即阈值取所有包含它的区域的最小值。
+
+    参数:
+    params: RegionParams 元组
+
+    返回:
+    RegionTables
+    """
+    count = 1 << len(params)
+    factor = np.ones(count)
+    clamp_min = np.full(count, -np.inf)
+    clamp_max = np.full(count, np.inf)
+    threshold = np.full(count, np.inf)
+    for combo in range(1, count):
+        owner = params[(combo & -combo).bit_length() - 1]
+        factor[combo] = owner.brightness_factor
+        clamp_min[combo] = owner.clamp_min
+        clamp_max[combo] = owner.clamp_max
+        threshold[combo] = min(p.threshold for i, p in enumerate(params) if combo >> i & 1)
+
+    value = np.arange(256) / 255.0
+    adjusted = np.clip(value[None, :] * factor[:, None], clamp_min[:, None], clamp_max[:, None])
+    return RegionTables(
+        (adjusted * 255).astype(np.uint8).ravel(),
+        (image_utils.linear_to_gamma(adjusted) * 255).astype(np.uint8).ravel(),
+        (adjusted > threshold[:, None]).ravel(),
+    )
+
+
+def _table_keys(labels, value_bytes):
+    """查找表的扁平索引 位图 * 256 + 明度字节"""
+    keys = labels.astype(np.intp) << 8
+    keys |= value_bytes
+    return keys
+
+
+def adjust_value_bytes(value_bytes, labels, params):
+    """
+    对线性空间的明度字节应用所有区域的亮度调整
+
+    参数:
+    value_bytes: HSV的明度通道(uint8)
+    labels: build_label_map 生成的成员位图
+    params: RegionParams 元组，顺序与位图一致
+
+    返回:
+    调整后的明度字节(uint8)
+    """
+    if not params:
+        return value_bytes.copy()
+    return region_tables(tuple(params)).value_bytes[_table_keys(labels, value_bytes)]
+
+
+def _shade(hsv, labels, value_bytes, check_bytes, tables, view_brightness, check_brightness, highlight_bgr):
+    """按查找表计算一组像素的预览颜色，hsv为 (高, 宽, 3) 的图像(计算部分像素时宽为1)"""
+    keys = _table_keys(labels, value_bytes)
+
+    if view_brightness:
+        # 查看明度模式 - 将伽马空间的明度复制到所有通道形成灰度图
+        gray = tables.gray_bytes[keys]
+        preview_image = cv2.merge([gray, gray, gray])
+    else:
+        # 普通模式 - 显示处理后的彩色图像并转换为伽马空间
+        hsv_preview = hsv.copy()
+        hsv_preview[:, :, 2] = tables.value_bytes[keys]
+        preview_image = image_utils.LINEAR_TO_GAMMA_LUT[image_utils.hsv_to_bgr(hsv_preview)]
+
+    # 检查明度使用每个代理像素覆盖区域内的最大明度，缩小后的亮点不会被漏掉
+    if check_brightness:
+        if check_bytes is not value_bytes:
+            keys = _table_keys(labels, check_bytes)
+        exceeded_mask = tables.exceeded[keys]
+        if np.any(exceeded_mask):
+            preview_image[exceeded_mask] = highlight_bgr
+    return preview_image
+
+
+def render_preview(level, labels, params, view_brightness, check_brightness, highlight_bgr):
+    """
+    渲染一帧亮度预览
+
+    参数:
+    level: PreviewLevel 代理图像
+    labels: 与代理图像尺寸一致的成员位图，没有区域时为None
+    params: RegionParams 元组，顺序与位图一致
+    view_brightness: 是否显示明度灰度图
+    check_brightness: 是否标记超过区域阈值的像素
+    highlight_bgr: 标记颜色 (B, G, R)
+
+    返回:
+    伽马空间的BGR预览图像(uint8)
+    """
+    if not params:
+        labels = np.zeros(level.hsv.shape[:2], dtype=np.uint8)
+    value_bytes = level.hsv[:, :, 2]
+    check_bytes = value_bytes if level.v_max is None else level.v_max
+    return _shade(
+        level.hsv, labels, value_bytes, check_bytes, region_tables(tuple(params)),
+        view_brightness, check_brightness and bool(params), highlight_bgr,
+    )
+
+
+class PreviewRenderer:
+    """
+    带缓存的预览渲染器，只能在一个线程中使用
+
+    渲染器持有一块帧缓冲区：与上一帧相比只有个别区域的参数变化时，只重新计算包含这些区域的像素行并直接写入缓冲区；
+    交给调用方时才复制一份，缓冲区没有变化时直接返回上次交出的帧。
+    每个区域的包围盒和所在行的索引按成员位图缓存。
+    以整行为单位计算是因为 cv2.cvtColor 对宽度不同的输入可能走不同的SIMD路径，
+    逐像素抽取计算会与整帧结果有±1的差异，而整行计算与整帧结果逐位一致。
+    """
+
+    # 需要重算的行超过该比例时直接整帧渲染
+    PARTIAL_MAX_FRACTION = 0.5
+
+    def __init__(self):
+        self._last_job = None
+        # 渲染器自己的帧缓冲区，增量渲染时原地改写
+        self._buffer = None
+        # 最近一次交给调用方的帧(调用方可能仍在使用，不再修改)
+        self._frame = None
+        self._labels = None
+        # 区域序号 -> (包含该区域像素的行索引, 包围盒(x0, y0, x1, y1)或None)
+        self._region_rows = {}
+
+    def region_rows(self, labels, index):
+        """返回成员位图中第index个区域的 (所在行的索引, 包围盒)"""
+        if labels is not self._labels:
+            self._labels = labels
+            self._region_rows = {}
+        cached = self._region_rows.get(index)
+        if cached is None:
+            member = (labels & np.uint8(1 << index)) != 0
+            rows = np.flatnonzero(member.any(axis=1))
+            bbox = None
+            if rows.size:
+                cols = np.flatnonzero(member.any(axis=0))
+                bbox = (int(cols[0]), int(rows[0]), int(cols[-1]), int(rows[-1]))
+            cached = (rows, bbox)
+            self._region_rows[index] = cached
+        return cached
+
+    def render(self, level, labels, params, view_brightness, check_brightness, highlight_bgr):
+        """
+        渲染一帧亮度预览，参数与 render_preview 相同
+
+        返回:
+        伽马空间的BGR预览图像(uint8)，渲染器之后不会再修改它，调用方可以长期持有(不能修改)
+        """
+        job = (level, labels, tuple(params), view_brightness, check_brightness, tuple(highlight_bgr))
+        updated = self._render_partial(job)
+        if updated is None:
+            self._buffer = render_preview(*job)
+            updated = True
+        self._last_job = job
+        if updated or self._frame is None:
+            self._frame = self._buffer.copy()
+        return self._frame
+
+    def _render_partial(self, job):
+        """
+        只有区域参数变化时把变化区域所在的行增量渲染到缓冲区
+
+        返回:
+        无法增量渲染时返回None，否则返回缓冲区内容是否有变化
+        """
+        last = self._last_job
+        if last is None or not job[2]:
+            return None
+        level, labels, params = job[:3]
+        if level is not last[0] or labels is not last[1] or job[3:] != last[3:] or len(params) != len(last[2]):
+            return None
+
+        changed = [i for i, (new, old) in enumerate(zip(params, last[2])) if new != old]
+        if not changed:
+            return False
+
+        # 参数变化的区域所在的行(成员位图中对应位为1的像素所在行)
+        rows = self.region_rows(labels, changed[0])[0]
+        for index in changed[1:]:
+            rows = np.union1d(rows, self.region_rows(labels, index)[0])
+        if rows.size > labels.shape[0] * self.PARTIAL_MAX_FRACTION:
+            return None
+        if rows.size == 0:
+            return False
+
+        value_bytes = level.hsv[rows, :, 2]
+        check_bytes = value_bytes if level.v_max is None else level.v_max[rows]
+        self._buffer[rows] = _shade(
+            level.hsv[rows], labels[rows], value_bytes, check_bytes, region_tables(params), *job[3:],
+        )
+        return True
@@ -0,0 +1,111 @@
+"""
+亮度预览的后台渲染调度
+滑块变化只登记一次重绘请求，短暂延迟后把多次变化合并为一帧，在后台线程中渲染；
+渲染期间的新请求只保留最新的一个，过期的帧直接丢弃，界面线程不执行NumPy计算。
+"""
+import threading
+
+from PyQt5.QtCore import QObject, QThread, QTimer, pyqtSignal
+
+# 合并参数变化的延迟(毫秒)
+DEBOUNCE_MS = 15
+
+
+class RenderThread(QThread):
+    """只渲染最新任务的后台线程"""
+
+    # 渲染完成(帧序号, 渲染结果)
+    frame_ready = pyqtSignal(int, object)
+    # 渲染出错(帧序号, 错误信息)
+    frame_failed = pyqtSignal(int, str)
+
+    def __init__(self, render_func, parent=None):
+        super().__init__(parent)
+        self.render_func = render_func
+        self._condition = threading.Condition()
+        self._pending = None
+        self._stopped = False
+
+    def submit(self, generation, job):
+        """提交任务，尚未开始的旧任务会被替换"""
+        with self._condition:
+            self._pending = (generation, job)
+            self._condition.notify()
+
+    def stop(self):
+        """停止线程并等待结束"""
+        with self._condition:
+            self._stopped = True
+            self._condition.notify()
+        self.wait()
+
+    def run(self):
+        while True:
+            with self._condition:
+                while self._pending is None and not self._stopped:
+                    self._condition.wait()
+                if self._stopped:
+                    return
+                generation, job = self._pending
+                self._pending = None
+            try:
+                result = self.render_func(*job)
+            except Exception as e:
+                self.frame_failed.emit(generation, str(e))
+                continue
+            self.frame_ready.emit(generation, result)
+
+
+class RenderScheduler(QObject):
+    """合并重绘请求并在后台线程中渲染"""
+
+    # 新的一帧渲染完成，参数为渲染结果
+    rendered = pyqtSignal(object)
+
+    def __init__(self, make_job, render_func, parent=None):
+        """
+        参数:
+        make_job: 在界面线程中调用，返回渲染参数元组(参数快照)，返回None表示无需渲染
+        render_func: 在后台线程中调用 render_func(*job)，不能访问界面控件
+        """
+        super().__init__(parent)
+        self.make_job = make_job
+        self._generation = 0
+        self._shown_generation = 0
+
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(DEBOUNCE_MS)
+        self._timer.timeout.connect(self._submit)
+
+        self._thread = RenderThread(render_func, self)
+        self._thread.frame_ready.connect(self._on_frame_ready)
+        self._thread.frame_failed.connect(self._on_frame_failed)
+        self._thread.start()
+
+    def schedule(self):
+        """登记一次重绘请求，短时间内的多次请求只渲染一次"""
+        if not self._timer.isActive():
+            self._timer.start()
+
+    def _submit(self):
+        job = self.make_job()
+        if job is None:
+            return
+        self._generation += 1
+        self._thread.submit(self._generation, job)
+
+    def _on_frame_ready(self, generation, result):
+        # 比已显示的帧更旧的结果直接丢弃
+        if generation <= self._shown_generation:
+            return
+        self._shown_generation = generation
+        self.rendered.emit(result)
+
+    def _on_frame_failed(self, generation, message):
+        print(f"渲染预览失败：{message}")
+
+    def stop(self):
+        """停止调度和后台线程(关闭窗口时调用)"""
+        self._timer.stop()
+        self._thread.stop()
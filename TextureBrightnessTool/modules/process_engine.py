@@ -0,0 +1,125 @@
+"""
+批量处理的流水线执行引擎
+不依赖Qt：读取线程预先加载和检查图片 -> 进程池做曲线映射 -> 写入线程编码保存，三段同时进行，
+磁盘等待和计算互相重叠；同时在流水线中的图片数有上限，内存占用不随文件数增长。
+"""
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+from . import image_utils
+from .scan_engine import _MP_CONTEXT, _init_worker, default_workers
+
+# 读取(解码)和写入(编码保存)的线程数，主要是IO等待
+READ_THREADS = 2
+WRITE_THREADS = 2
+
+# 流水线各阶段
+_STAGE_READ = 0
+_STAGE_COMPUTE = 1
+_STAGE_WRITE = 2
+
+
+def process_image(task):
+    """
+    在工作进程中对单张图片做曲线映射
+
+    参数:
+    task: (图像, 亮度阈值)
+
+    返回:
+    (处理后的图像, 处理后的亮度统计)
+    """
+    img, threshold = task
+    return image_utils.process_brightness_curve(img, threshold-0.02, threshold, 1.5, inplace=True,
+                                                stats_threshold=threshold)
+
+
+def default_max_in_flight(workers, read_threads=READ_THREADS, write_threads=WRITE_THREADS):
+    """默认的在途图片数上限：每个阶段都能占满，另给每个工作进程留一张排队的图片"""
+    return 2 * workers + read_threads + write_threads
+
+
+def iter_process(paths, threshold, load, save, workers=None, is_canceled=None, max_in_flight=None,
+                 read_threads=READ_THREADS, write_threads=WRITE_THREADS):
+    """
+    以三段流水线处理文件列表，按完成顺序逐个产出 (文件路径, 读取信息, 处理后的统计, 保存结果, 错误信息或None)
+
+    参数:
+    paths: 文件路径列表
+    threshold: 亮度阈值
+    load: 在读取线程中调用 load(文件路径)，返回 (图像, 读取信息)；图像为None表示不需要处理，
+          此时直接产出该文件，处理后的统计和保存结果为None
+    save: 在写入线程中调用 save(文件路径, 处理后的图像, 处理后的统计, 读取信息)，返回保存结果
+    workers: 计算用的工作进程数，None表示使用全部CPU核心，1表示在单独的线程中计算
+    is_canceled: 返回True时不再读取新文件，已提交保存的文件仍会完成并产出
+    max_in_flight: 同时在流水线中(已开始读取、尚未保存完)的文件数上限，默认见 default_max_in_flight
+
+    任一阶段抛出的异常作为该文件的错误信息产出(读取失败时读取信息为None)，不影响其他文件
+    """
+    workers = workers or default_workers()
+    if max_in_flight is None:
+        max_in_flight = default_max_in_flight(workers, read_threads, write_threads)
+
+    read_pool = write_pool = compute_pool = None
+    # future -> (阶段, 文件路径, 读取信息, 处理后的统计)
+    running = {}
+    next_index = 0
+    canceled = False
+    try:
+        read_pool = ThreadPoolExecutor(read_threads)
+        write_pool = ThreadPoolExecutor(write_threads)
+        if workers > 1 and len(paths) > 1:
+            compute_pool = ProcessPoolExecutor(min(workers, len(paths)), mp_context=_MP_CONTEXT,
+                                               initializer=_init_worker)
+        else:
+            compute_pool = ThreadPoolExecutor(1)
+
+        while True:
+            # 反压：在途文件数未达上限时才读取新文件
+            if not canceled and is_canceled and is_canceled():
+                canceled = True
+            while not canceled and next_index < len(paths) and len(running) < max_in_flight:
+                path = paths[next_index]
+                next_index += 1
+                try:
+                    running[read_pool.submit(load, path)] = (_STAGE_READ, path, None, None)
+                except Exception as e:
+                    yield path, None, None, None, str(e)
+            if not running:
+                break
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                stage, path, info, stats = running.pop(future)
+                try:
+                    value = future.result()
+                except Exception as e:
+                    # 包括工作进程意外退出(BrokenProcessPool)，只记为该文件失败
+                    yield path, info, None, None, str(e)
+                    continue
+
+                # 提交下一阶段失败(如进程池已损坏)时同样只记为该文件失败
+                try:
+                    if stage == _STAGE_READ:
+                        img, info = value
+                        if img is None:
+                            yield path, info, None, None, None
+                        elif not canceled:
+                            running[compute_pool.submit(process_image, (img, threshold))] = (
+                                _STAGE_COMPUTE, path, info, None)
+                    elif stage == _STAGE_COMPUTE:
+                        processed_img, stats = value
+                        if not canceled:
+                            running[write_pool.submit(save, path, processed_img, stats, info)] = (
+                                _STAGE_WRITE, path, info, stats)
+                    else:
+                        yield path, info, stats, value, None
+                except Exception as e:
+                    yield path, info, None, None, str(e)
+    finally:
+        # 取消或出错时丢弃尚未开始的读取和计算，正在写入的文件写完(保存本身是原子的)再返回
+        if read_pool is not None:
+            read_pool.shutdown(wait=True, cancel_futures=True)
+        if compute_pool is not None:
+            compute_pool.shutdown(wait=True, cancel_futures=True)
+        if write_pool is not None:
+            write_pool.shutdown(wait=True)
@@ -0,0 +1,109 @@
+"""
+批量处理日志
+每检查/处理完一个文件追加一行JSON(JSON Lines)，记录处理前后的文件内容哈希。
+处理过的文件在替换原图之前写入记录并落盘，因此：
+当前内容哈希等于记录中的"处理后"哈希 -> 已完成，中断后重新运行时直接跳过，不再解码和检查；
+当前内容哈希等于"处理前"哈希 -> 替换前被中断，重新处理。
+"""
+import os
+import json
+import threading
+
+from .scan_cache import cache_key
+
+# 日志文件默认名称
+JOURNAL_FILE_NAME = "brightness_journal.jsonl"
+
+# 记录状态
+STATUS_CLEAN = "clean"          # 未超出阈值，无需处理
+STATUS_PROCESSED = "processed"  # 已处理并保存
+
+
+def default_journal_path():
+    """默认日志文件路径(当前目录，与默认扫描结果文件相同)"""
+    return os.path.join(os.getcwd(), JOURNAL_FILE_NAME)
+
+
+class ProcessJournal:
+    """追加写入的批量处理日志，lookup 和 append 可在多个线程中调用(批量处理的写入线程在替换原图前追加记录)"""
+
+    def __init__(self, path):
+        self.path = path
+        # 文件键 -> 该文件最后一条记录
+        self._records = {}
+        self._lock = threading.Lock()
+        self._load()
+        self._file = open(path, "a", encoding="utf-8")
+        # 上次中断时最后一行可能没有写完，补一个换行，避免新记录接在残缺的行后面
+        if self._file.tell() > 0 and not self._ends_with_newline():
+            self._file.write("\n")
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # 中断时写了一半的行
+                        continue
+                    self._records[cache_key(record["path"])] = record
+        except FileNotFoundError:
+            pass
+
+    def _ends_with_newline(self):
+        with open(self.path, "rb") as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) == b"\n"
+
+    def lookup(self, path, threshold, content_hash):
+        """
+        查找文件在该阈值下已完成的记录
+
+        参数:
+        content_hash: 文件当前内容的哈希(scan_cache.file_hash)
+
+        返回:
+        日志记录字典，文件未完成或已被修改时返回None
+        """
+        record = self._records.get(cache_key(path))
+        if record is None or record["threshold"] != threshold or record["after"] != content_hash:
+            return None
+        return record
+
+    def append(self, path, threshold, before, after, status, still_exceeds=False):
+        """
+        追加一条记录
+
+        参数:
+        before, after: 处理前后的文件内容哈希(未处理的文件两者相同)
+        status: STATUS_CLEAN 或 STATUS_PROCESSED
+        still_exceeds: 处理后是否仍超出阈值
+        """
+        record = {
+            "path": path,
+            "threshold": threshold,
+            "before": before,
+            "after": after,
+            "status": status,
+            "still_exceeds": still_exceeds,
+        }
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+            # 处理记录必须在替换原图之前落盘；未处理的记录丢失时只会重新检查一次，不必每条都同步
+            if status == STATUS_PROCESSED:
+                os.fsync(self._file.fileno())
+            self._records[cache_key(path)] = record
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,255 @@
+"""
+扫描结果列表的模型
+结果文件只在首次加载时建立行偏移索引，每行内容在视图需要显示时才读取和解析，
+配合 QListView 只绘制可见行，数万条结果也不会创建大量控件。
+缩略图只为视图实际显示的行请求，由后台线程从磁盘缓存读取或生成。
+"""
+import os
+import queue
+from array import array
+from collections import OrderedDict
+
+from PyQt5.QtCore import Qt, QAbstractListModel, QModelIndex, QThread, pyqtSignal
+from PyQt5.QtGui import QImage, QPixmap, QIcon
+
+from .batch_scanner import parse_result_line
+from .thumbnail_cache import THUMBNAIL_SIZE
+
+
+class ThumbnailLoader(QThread):
+    """后台读取/生成缩略图的线程，后请求的先处理(最近滚动到的行优先)"""
+
+    # 缩略图已就绪(文件路径, QImage)
+    loaded = pyqtSignal(str, QImage)
+
+    def __init__(self, cache, parent=None):
+        super().__init__(parent)
+        self.cache = cache
+        self._queue = queue.LifoQueue()
+
+    def request(self, path):
+        self._queue.put(path)
+
+    def stop(self):
+        """停止线程并等待结束"""
+        self._queue.put(None)
+        self.wait()
+
+    def run(self):
+        while True:
+            path = self._queue.get()
+            if path is None:
+                return
+            img = self.cache.get_or_create(path, THUMBNAIL_SIZE)
+            if img is None:
+                continue
+            height, width = img.shape[:2]
+            qimg = QImage(img.data, width, height, img.strides[0], QImage.Format_BGR888).copy()
+            self.loaded.emit(path, qimg)
+
+
+class ScanResultModel(QAbstractListModel):
+    """惰性读取扫描结果文件的列表模型，也支持扫描过程中逐条追加"""
+
+    # 自定义数据角色
+    PathRole = Qt.UserRole
+    MaxValueRole = Qt.UserRole + 1
+
+    # 排序方式
+    SORT_NONE = 0
+    SORT_MAX_VALUE = 1
+    SORT_PATH = 2
+
+    # 每次向视图提供的行数
+    FETCH_BATCH = 500
+    # 已解析行的缓存上限
+    ROW_CACHE_SIZE = 4096
+    # 内存中保留的缩略图数量上限
+    ICON_CACHE_SIZE = 512
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._file = None
+        # 结果文件中每一行的起始偏移
+        self._offsets = array("q")
+        # 扫描过程中追加的结果 [(路径, 明度最大值或None)]
+        self._appended = []
+        # 排序后的行号映射，为None时保持原始顺序
+        self._order = None
+        self._sort_mode = self.SORT_NONE
+        self._row_cache = {}
+        # 当前已提供给视图的行数
+        self._visible = 0
+        # 缩略图: 文件路径 -> QIcon，以及已请求但尚未就绪的 文件路径 -> 行号
+        self._icons = OrderedDict()
+        self._icon_requests = {}
+        self._thumbnail_loader = None
+
+    def set_thumbnail_cache(self, cache):
+        """设置缩略图缓存并启动后台加载线程，cache为None时不显示缩略图"""
+        self.stop_thumbnail_loader()
+        self._icons.clear()
+        if cache is not None:
+            self._thumbnail_loader = ThumbnailLoader(cache, self)
+            self._thumbnail_loader.loaded.connect(self._on_thumbnail_loaded)
+            self._thumbnail_loader.start()
+
+    def stop_thumbnail_loader(self):
+        """停止缩略图加载线程(关闭窗口时调用)"""
+        if self._thumbnail_loader is not None:
+            self._thumbnail_loader.stop()
+            self._thumbnail_loader = None
+        self._icon_requests.clear()
+
+    def _thumbnail(self, row, path):
+        icon = self._icons.get(path)
+        if icon is not None:
+            self._icons.move_to_end(path)
+            return icon
+        if self._thumbnail_loader is not None and path not in self._icon_requests:
+            self._icon_requests[path] = row
+            self._thumbnail_loader.request(path)
+        return None
+
+    def _on_thumbnail_loaded(self, path, qimg):
+        row = self._icon_requests.pop(path, None)
+        self._icons[path] = QIcon(QPixmap.fromImage(qimg))
+        if len(self._icons) > self.ICON_CACHE_SIZE:
+            self._icons.popitem(last=False)
+        # 排序或重新加载后行号可能已变化，此时等视图下次绘制时再取
+        if row is not None and row < self._visible and self.result_at(row)[0] == path:
+            index = self.index(row)
+            self.dataChanged.emit(index, index, [Qt.DecorationRole])
+
+    def total_count(self):
+        """结果总数(包括尚未提供给视图的行)"""
+        return len(self._offsets) + len(self._appended)
+
+    def clear(self):
+        """清空结果"""
+        self.beginResetModel()
+        self._close_file()
+        self._offsets = array("q")
+        self._appended = []
+        self._order = None
+        self._row_cache = {}
+        self._visible = 0
+        self.endResetModel()
+
+    def load_file(self, result_file):
+        """加载结果文件，只建立行偏移索引"""
+        self.beginResetModel()
+        self._close_file()
+        self._offsets = array("q")
+        self._appended = []
+        self._order = None
+        self._row_cache = {}
+
+        self._file = open(result_file, "rb")
+        offset = 0
+        for line in self._file:
+            if line.strip():
+                self._offsets.append(offset)
+            offset += len(line)
+
+        self._visible = min(self.FETCH_BATCH, self.total_count())
+        self.endResetModel()
+        if self._sort_mode != self.SORT_NONE:
+            self.sort_results(self._sort_mode)
+
+    def append_result(self, path, max_v=None):
+        """追加一条结果(扫描过程中使用)"""
+        if self._visible < self.total_count():
+            # 还有未提供给视图的行，新结果随后通过fetchMore提供
+            self._appended.append((path, max_v))
+            if self._order is not None:
+                self._order.append(self.total_count() - 1)
+            return
+
+        row = self._visible
+        self.beginInsertRows(QModelIndex(), row, row)
+        self._appended.append((path, max_v))
+        if self._order is not None:
+            self._order.append(self.total_count() - 1)
+        self._visible += 1
+        self.endInsertRows()
+
+    def sort_results(self, mode):
+        """按指定方式排序，需要读取全部行的内容"""
+        self._sort_mode = mode
+        total = self.total_count()
+        self.beginResetModel()
+        if mode == self.SORT_NONE:
+            self._order = None
+        else:
+            rows = [self._read_row(i) for i in range(total)]
+            if mode == self.SORT_MAX_VALUE:
+                order = sorted(range(total), key=lambda i: -1.0 if rows[i][1] is None else rows[i][1], reverse=True)
+            else:
+                order = sorted(range(total), key=lambda i: rows[i][0].lower())
+            self._order = array("q", order)
+        self._visible = min(max(self._visible, self.FETCH_BATCH), total)
+        self.endResetModel()
+
+    def result_at(self, row):
+        """返回视图中第row行的 (文件路径, 明度最大值或None)"""
+        if self._order is not None:
+            row = self._order[row]
+        return self._read_row(row)
+
+    def _read_row(self, row):
+        cached = self._row_cache.get(row)
+        if cached is not None:
+            return cached
+
+        if row < len(self._offsets):
+            self._file.seek(self._offsets[row])
+            result = parse_result_line(self._file.readline().decode("utf-8", errors="replace"))
+        else:
+            result = self._appended[row - len(self._offsets)]
+
+        if len(self._row_cache) >= self.ROW_CACHE_SIZE:
+            self._row_cache.clear()
+        self._row_cache[row] = result
+        return result
+
+    def _close_file(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return self._visible
+
+    def canFetchMore(self, parent):
+        if parent.isValid():
+            return False
+        return self._visible < self.total_count()
+
+    def fetchMore(self, parent):
+        if parent.isValid():
+            return
+        count = min(self.FETCH_BATCH, self.total_count() - self._visible)
+        if count <= 0:
+            return
+        self.beginInsertRows(QModelIndex(), self._visible, self._visible + count - 1)
+        self._visible += count
+        self.endInsertRows()
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or index.row() >= self._visible:
+            return None
+
+        path, max_v = self.result_at(index.row())
+        if role == Qt.DisplayRole:
+            name = os.path.basename(path)
+            return name if max_v is None else f"{name}    明度 {max_v:.3f}"
+        if role == Qt.ToolTipRole or role == self.PathRole:
+            return path
+        if role == Qt.DecorationRole:
+            return self._thumbnail(index.row(), path)
+        if role == self.MaxValueRole:
+            return max_v
+        return None
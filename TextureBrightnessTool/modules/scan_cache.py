@@ -0,0 +1,169 @@
+"""
+批量扫描的持久化增量缓存
+以 路径 + 修改时间 + 文件大小 判断文件是否变化，并记录内容哈希和亮度统计信息。
+明度最大值和直方图与阈值无关，换用新阈值扫描或做阈值对比时可以直接由缓存得出结果，无需重新解码。
+"""
+import os
+import zlib
+import sqlite3
+import hashlib
+from collections import namedtuple
+
+import numpy as np
+
+# 缓存文件默认名称，放在扫描结果文件旁边
+CACHE_FILE_NAME = "brightness_cache.db"
+
+# 表结构或明度算法变化时递增，旧缓存会被清空重建
+SCHEMA_VERSION = 2
+
+# 一条缓存记录，亮度字段含义见 image_utils.brightness_stats，无法解码的文件亮度字段为None
+# threshold 为计算 over_count 和 bbox 时使用的阈值；其他阈值下的超出像素数可由 histogram 得出
+CacheEntry = namedtuple(
+    "CacheEntry",
+    ["mtime_ns", "size", "content_hash", "max_v", "threshold", "pixel_count", "over_count", "bbox", "histogram"],
+)
+
+_COLUMNS = "mtime_ns, size, content_hash, max_v, threshold, pixel_count, over_count, bbox, histogram"
+
+# 批量查询时每条SQL语句的最大参数个数(低于SQLite旧版本的999个上限)
+LOOKUP_CHUNK_SIZE = 500
+
+
+def entry_from_stats(mtime_ns, size, content_hash, threshold, stats):
+    """由 image_utils.brightness_stats 的结果构建缓存记录"""
+    if stats is None:
+        return CacheEntry(mtime_ns, size, content_hash, None, threshold, None, None, None, None)
+    return CacheEntry(
+        mtime_ns, size, content_hash,
+        stats["max_v"], threshold, stats["pixel_count"], stats["over_count"],
+        stats["bbox"], stats["histogram"],
+    )
+
+
+def _pack_bbox(bbox):
+    return None if bbox is None else ",".join(str(v) for v in bbox)
+
+
+def _unpack_bbox(text):
+    return None if not text else tuple(int(v) for v in text.split(","))
+
+
+def _pack_histogram(histogram):
+    return None if histogram is None else zlib.compress(np.asarray(histogram, dtype=np.int64).tobytes())
+
+
+def _unpack_histogram(blob):
+    return None if blob is None else np.frombuffer(zlib.decompress(blob), dtype=np.int64)
+
+
+def cache_key(path):
+    """统一路径格式(绝对路径、大小写、分隔符)作为缓存键"""
+    return os.path.normcase(os.path.abspath(path))
+
+
+def file_hash(path, chunk_size=1 << 20):
+    """计算文件内容哈希"""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def default_cache_path(out_txt):
+    """扫描结果文件对应的缓存文件路径"""
+    return os.path.join(os.path.dirname(os.path.abspath(out_txt)), CACHE_FILE_NAME)
+
+
+class ScanCache:
+    """基于SQLite的扫描结果缓存，只能在创建它的线程中使用"""
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+
+        version = self.conn.execute("PRAGMA user_version").fetchone()[0]
+        if version != SCHEMA_VERSION:
+            self.conn.execute("DROP TABLE IF EXISTS scan_results")
+            self.conn.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS scan_results ("
+            " path TEXT PRIMARY KEY,"
+            " mtime_ns INTEGER NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " content_hash TEXT NOT NULL,"
+            " max_v INTEGER,"
+            " threshold REAL,"
+            " pixel_count INTEGER,"
+            " over_count INTEGER,"
+            " bbox TEXT,"
+            " histogram BLOB"
+            ")"
+        )
+        self.conn.commit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        """提交并关闭数据库连接"""
+        if self.conn is not None:
+            self.conn.commit()
+            self.conn.close()
+            self.conn = None
+
+    def lookup_many(self, paths):
+        """
+        批量查询缓存
+
+        返回:
+        {文件路径: CacheEntry}，只包含有缓存记录的文件
+        """
+        keys = {cache_key(path): path for path in paths}
+        found = {}
+        # 只按主键查询需要的路径，耗时与缓存总条目数无关
+        key_list = list(keys)
+        for start in range(0, len(key_list), LOOKUP_CHUNK_SIZE):
+            chunk = key_list[start:start + LOOKUP_CHUNK_SIZE]
+            placeholders = ", ".join("?" * len(chunk))
+            cursor = self.conn.execute(
+                f"SELECT path, {_COLUMNS} FROM scan_results WHERE path IN ({placeholders})", chunk
+            )
+            for row in cursor:
+                found[keys[row[0]]] = self._entry_from_row(row[1:])
+        return found
+
+    def store_many(self, items):
+        """
+        批量写入缓存
+
+        参数:
+        items: (文件路径, CacheEntry) 的可迭代对象
+        """
+        self.conn.executemany(
+            f"INSERT OR REPLACE INTO scan_results (path, {_COLUMNS})"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            [
+                (
+                    cache_key(path), entry.mtime_ns, entry.size, entry.content_hash,
+                    entry.max_v, entry.threshold, entry.pixel_count, entry.over_count,
+                    _pack_bbox(entry.bbox), _pack_histogram(entry.histogram),
+                )
+                for path, entry in items
+            ],
+        )
+        self.conn.commit()
+
+    @staticmethod
+    def _entry_from_row(row):
+        mtime_ns, size, content_hash, max_v, threshold, pixel_count, over_count, bbox, histogram = row
+        return CacheEntry(
+            mtime_ns, size, content_hash, max_v, threshold, pixel_count, over_count,
+            _unpack_bbox(bbox), _unpack_histogram(histogram),
+        )
@@ -0,0 +1,132 @@
+"""
+批量扫描的多进程执行引擎
+不依赖Qt：解码和亮度检查在进程池中完成，结果按提交顺序流式返回
+"""
+import os
+import multiprocessing
+
+import cv2
+
+from . import image_utils
+from .scan_cache import entry_from_stats, file_hash
+
+# 增量缓存每累计多少条新结果写入一次数据库
+CACHE_FLUSH_SIZE = 500
+
+# 统一使用spawn方式创建工作进程：扫描可能由界面的后台线程发起，fork带线程的进程并不安全
+_MP_CONTEXT = multiprocessing.get_context("spawn")
+
+
+def default_workers():
+    """默认工作进程数量(CPU核心数)"""
+    return max(1, os.cpu_count() or 1)
+
+
+def _init_worker():
+    """工作进程初始化：限制OpenCV内部线程数，避免与进程池争抢CPU"""
+    cv2.setNumThreads(1)
+
+
+def scan_file(task):
+    """
+    在工作进程中加载并检查单个文件
+
+    参数:
+    task: (文件路径, 亮度阈值)
+
+    返回:
+    (文件路径, 是否超出阈值, 错误信息或None)
+    """
+    path, threshold = task
+    try:
+        img = image_utils.load_image(path, use_mmap=True)
+        exceeded = image_utils.check_brightness(img, threshold, image_utils.DEFAULT_TILE_ROWS)
+        return path, exceeded, None
+    except Exception as e:
+        return path, False, str(e)
+
+
+def measure_file(task):
+    """
+    在工作进程中计算单个文件的缓存记录(亮度统计信息)，文件未变化时直接复用旧记录
+
+    参数:
+    task: (文件路径, 亮度阈值, 旧的CacheEntry或None)
+
+    返回:
+    (文件路径, CacheEntry或None, 错误信息或None, 记录是否需要写回缓存)
+    """
+    path, threshold, cached = task
+    try:
+        stat = os.stat(path)
+        if cached is not None and cached.size == stat.st_size:
+            if cached.mtime_ns == stat.st_mtime_ns:
+                return path, cached, None, False
+            # 仅修改时间变化(如版本库同步)，内容哈希相同则无需解码
+            content_hash = file_hash(path)
+            if content_hash == cached.content_hash:
+                return path, cached._replace(mtime_ns=stat.st_mtime_ns), None, True
+        else:
+            content_hash = file_hash(path)
+
+        img = image_utils.load_image(path, use_mmap=True)
+        stats = image_utils.brightness_stats(img, threshold, image_utils.DEFAULT_TILE_ROWS)
+        return path, entry_from_stats(stat.st_mtime_ns, stat.st_size, content_hash, threshold, stats), None, True
+    except Exception as e:
+        return path, None, str(e), False
+
+
+def _iter_pool(func, tasks, count, workers):
+    """在进程池(或当前进程)中按顺序执行任务"""
+    workers = workers or default_workers()
+    if workers <= 1 or count < 2:
+        for task in tasks:
+            yield func(task)
+        return
+
+    workers = min(workers, count)
+    # 分块减少进程间通信次数，同时保证进度更新足够频繁
+    chunksize = max(1, min(32, count // (workers * 16)))
+    pool = _MP_CONTEXT.Pool(workers, initializer=_init_worker)
+    try:
+        for result in pool.imap(func, tasks, chunksize):
+            yield result
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+def iter_scan(paths, threshold, workers=None, cache=None):
+    """
+    并行扫描文件列表，按输入顺序逐个产出 (文件路径, 是否超出阈值, 错误信息或None, CacheEntry或None)
+
+    参数:
+    paths: 文件路径列表
+    threshold: 亮度阈值
+    workers: 工作进程数，None表示使用全部CPU核心，1表示在当前进程中执行
+    cache: ScanCache对象，提供时只解码新增或变化的文件，并产出每个文件的亮度统计记录
+
+    调用方中途停止迭代(如用户取消)时，关闭生成器即可终止进程池
+    """
+    if cache is None:
+        tasks = ((path, threshold) for path in paths)
+        for path, exceeded, error in _iter_pool(scan_file, tasks, len(paths), workers):
+            yield path, exceeded, error, None
+        return
+
+    cached = cache.lookup_many(paths)
+    tasks = ((path, threshold, cached.get(path)) for path in paths)
+    pending = []
+    try:
+        for path, entry, error, changed in _iter_pool(measure_file, tasks, len(paths), workers):
+            if changed:
+                pending.append((path, entry))
+                if len(pending) >= CACHE_FLUSH_SIZE:
+                    cache.store_many(pending)
+                    pending = []
+            exceeded = entry is not None and entry.max_v is not None and entry.max_v / 255.0 > threshold
+            yield path, exceeded, error, entry
+    finally:
+        # 取消时也保存已经算出的结果
+        if pending:
+            cache.store_many(pending)
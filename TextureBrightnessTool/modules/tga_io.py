@@ -0,0 +1,221 @@
+"""
+TGA 图像读写
+TGA 文件本身按 B、G、R(、A) 顺序存储像素，直接解码到 BGR(A) 的 NumPy 数组，
+不经过 imageio 插件和额外的通道转换；未压缩的文件可以直接内存映射，RLE数据由Pillow的解码器展开。
+支持 颜色表/真彩色/灰度 的未压缩和RLE压缩格式(类型 1/2/3/9/10/11)，
+其他情况(如16位色)抛出 TgaUnsupportedError，由调用方改用 imageio 读取。
+写入时同样直接写出BGR(A)数组，不交换通道。
+"""
+import mmap
+import struct
+from collections import namedtuple
+
+import numpy as np
+
+# 文件头: ID长度、颜色表类型、图像类型、颜色表首项/项数/位深、原点x/y、宽、高、像素位深、图像描述
+HEADER_FORMAT = "<BBBHHBHHHHBB"
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+
+# 图像类型(低3位)，第4位表示RLE压缩
+TYPE_COLORMAP = 1
+TYPE_TRUECOLOR = 2
+TYPE_GRAY = 3
+TYPE_RLE_FLAG = 8
+
+# 图像描述字节中的像素排列方向
+DESCRIPTOR_RIGHT_TO_LEFT = 0x10
+DESCRIPTOR_TOP_TO_BOTTOM = 0x20
+
+# RLE解码时使用的Pillow模式(按每像素字节数)
+RLE_MODES = {1: "L", 3: "RGB", 4: "RGBA"}
+# RLE编码时，BGR(A)数组按各模式读入Pillow使用的原始格式
+RLE_ENCODE_RAWMODES = {"L": "L", "RGB": "BGR", "RGBA": "BGRA"}
+
+# TGA 2.0 文件尾和扩展区中Alpha类型字段的位置
+FOOTER_SIZE = 26
+FOOTER_SIGNATURE = b"TRUEVISION-XFILE.\x00"
+EXTENSION_ATTRIBUTES_OFFSET = 494
+
+TgaHeader = namedtuple(
+    "TgaHeader",
+    ["id_length", "colormap_type", "image_type", "colormap_first", "colormap_length", "colormap_depth",
+     "width", "height", "depth", "descriptor"],
+)
+
+
+class TgaUnsupportedError(ValueError):
+    """本模块不支持的TGA格式"""
+
+
+def parse_header(data):
+    """解析18字节的TGA文件头"""
+    if len(data) < HEADER_SIZE:
+        raise ValueError("TGA 文件头不完整")
+    (id_length, colormap_type, image_type, colormap_first, colormap_length, colormap_depth,
+     _x_origin, _y_origin, width, height, depth, descriptor) = struct.unpack(HEADER_FORMAT, data[:HEADER_SIZE])
+    return TgaHeader(id_length, colormap_type, image_type, colormap_first, colormap_length, colormap_depth,
+                     width, height, depth, descriptor)
+
+
+def _pixel_bytes(header):
+    """
+    检查格式是否支持，返回每个像素在文件中的字节数
+    真彩色 24/32 位、灰度 8 位、颜色表 8 位索引(表项 24/32 位)
+    """
+    kind = header.image_type & 7
+    if header.width <= 0 or header.height <= 0:
+        raise ValueError("TGA 图像尺寸无效")
+    if kind == TYPE_TRUECOLOR and header.depth in (24, 32):
+        return header.depth // 8
+    if kind == TYPE_GRAY and header.depth == 8:
+        return 1
+    if kind == TYPE_COLORMAP and header.colormap_type == 1 and header.depth == 8 \
+            and header.colormap_depth in (24, 32):
+        return 1
+    raise TgaUnsupportedError(f"不支持的TGA格式: 类型 {header.image_type}, {header.depth} 位")
+
+
+def decode_rle(data, width, height, pixel_bytes, top_to_bottom, copy=True):
+    """
+    解码RLE像素数据
+    包边界只能顺序解析，用Python逐包处理比C实现慢数倍，因此借用Pillow(imageio的依赖)的RLE解码器；
+    按文件中的字节顺序解码、不交换通道，得到的就是BGR(A)
+
+    参数:
+    data: 从像素数据起始位置开始的字节
+    width, height: 图像尺寸
+    pixel_bytes: 每个像素的字节数
+    top_to_bottom: 文件中的行是否从上到下排列
+    copy: 为False时返回只读数组，少复制一次
+
+    返回:
+    (高, 宽, pixel_bytes) 的uint8数组，行已按从上到下排列
+    """
+    from PIL import Image
+
+    mode = RLE_MODES[pixel_bytes]
+    img = Image.frombytes(mode, (width, height), data, "tga_rle", mode, 1 if top_to_bottom else -1, pixel_bytes * 8)
+    pixels = np.array(img) if copy else np.asarray(img)
+    return pixels.reshape(height, width, pixel_bytes)
+
+
+def _alpha_unused(f):
+    """TGA 2.0 扩展区声明不含Alpha时返回True(此时与Pillow一致，Alpha按255处理)"""
+    try:
+        f.seek(-FOOTER_SIZE, 2)
+        footer = f.read(FOOTER_SIZE)
+        if not footer.endswith(FOOTER_SIGNATURE):
+            return False
+        extension_offset = int.from_bytes(footer[:4], "little")
+        if not extension_offset:
+            return False
+        f.seek(extension_offset + EXTENSION_ATTRIBUTES_OFFSET)
+        return f.read(1) == b"\x00"
+    except OSError:
+        return False
+
+
+def read_tga(file_path, use_mmap=False):
+    """
+    读取TGA文件
+
+    参数:
+    file_path: 文件路径
+    use_mmap: 只读取像素统计时使用：未压缩的真彩色和灰度文件直接内存映射(写时复制，修改数组不会改动文件)，
+              RLE文件返回只读数组，返回的数组可能不连续
+
+    返回:
+    uint8数组，真彩色为 (高, 宽, 3/4) 的BGR(A)，灰度为 (高, 宽)
+    """
+    with open(file_path, "rb") as f:
+        header = parse_header(f.read(HEADER_SIZE))
+        pixel_bytes = _pixel_bytes(header)
+        f.seek(header.id_length, 1)
+
+        palette = None
+        if header.colormap_type == 1:
+            entry_bytes = (header.colormap_depth + 7) // 8
+            colormap = f.read(header.colormap_length * entry_bytes)
+            if header.image_type & 7 == TYPE_COLORMAP:
+                if len(colormap) < header.colormap_length * entry_bytes:
+                    raise ValueError("TGA 颜色表不完整")
+                palette = np.frombuffer(colormap, dtype=np.uint8).reshape(-1, entry_bytes)
+
+        width, height = header.width, header.height
+        top_to_bottom = bool(header.descriptor & DESCRIPTOR_TOP_TO_BOTTOM)
+        mapped = use_mmap and palette is None and not header.image_type & TYPE_RLE_FLAG
+
+        if header.image_type & TYPE_RLE_FLAG:
+            # 压缩数据直接从文件映射中解码，不先读入内存
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as file_map, memoryview(file_map) as view:
+                with view[f.tell():] as data:
+                    img = decode_rle(data, width, height, pixel_bytes, top_to_bottom, copy=not use_mmap)
+            top_to_bottom = True
+        elif mapped:
+            img = np.memmap(f, dtype=np.uint8, mode="c", offset=f.tell(),
+                            shape=(height, width, pixel_bytes)).view(np.ndarray)
+        else:
+            img = np.fromfile(f, dtype=np.uint8, count=width * height * pixel_bytes)
+            if img.size < width * height * pixel_bytes:
+                raise ValueError("TGA 像素数据不完整")
+            img = img.reshape(height, width, pixel_bytes)
+
+        alpha_unused = pixel_bytes == 4 and _alpha_unused(f)
+
+    if palette is not None:
+        # 颜色表索引从 colormap_first 开始
+        indices = img[:, :, 0].astype(np.intp) - header.colormap_first
+        if indices.min() < 0 or indices.max() >= len(palette):
+            raise ValueError("TGA 颜色表索引越界")
+        img = palette[indices]
+
+    if not top_to_bottom:
+        img = img[::-1]
+    if header.descriptor & DESCRIPTOR_RIGHT_TO_LEFT:
+        img = img[:, ::-1]
+    if img.shape[2] == 1:
+        img = img[:, :, 0]
+    if not mapped:
+        img = np.ascontiguousarray(img)
+    if alpha_unused:
+        # use_mmap 时RLE解码结果是Pillow图像的只读视图，需要先复制
+        if not img.flags.writeable:
+            img = img.copy()
+        img[:, :, 3] = 255
+    # 内存映射时保留视图(可能不连续)，避免复制整个文件
+    return img
+
+
+def write_tga(file_path, img, rle=False):
+    """
+    写入TGA文件，行从下到上排列，文件头和文件尾与Pillow(imageio)写出的一致
+
+    参数:
+    file_path: 文件路径
+    img: uint8数组，(高, 宽, 3/4) 的BGR(A) 或 (高, 宽) 的灰度
+    rle: 是否使用RLE压缩；不压缩时逐行直接写出数组，不复制、不交换通道，
+         压缩时借用Pillow的RLE编码器(读入Pillow时复制一次)
+    """
+    if img.dtype != np.uint8 or not (img.ndim == 2 or (img.ndim == 3 and img.shape[2] in (3, 4))):
+        raise TgaUnsupportedError(f"不支持写入的图像格式: {img.dtype}, 形状 {img.shape}")
+    height, width = img.shape[:2]
+    pixel_bytes = 1 if img.ndim == 2 else img.shape[2]
+
+    if rle:
+        from PIL import Image
+
+        mode = RLE_MODES[pixel_bytes]
+        pil_img = Image.frombuffer(mode, (width, height), np.ascontiguousarray(img), "raw",
+                                   RLE_ENCODE_RAWMODES[mode], 0, 1)
+        pil_img.save(file_path, format="TGA", compression="tga_rle")
+        return
+
+    image_type = TYPE_GRAY if pixel_bytes == 1 else TYPE_TRUECOLOR
+    alpha_bits = 8 if pixel_bytes == 4 else 0
+    header = struct.pack(HEADER_FORMAT, 0, 0, image_type, 0, 0, 0, 0, 0, width, height, pixel_bytes * 8, alpha_bits)
+    with open(file_path, "wb") as f:
+        f.write(header)
+        for row in img[::-1]:
+            f.write(np.ascontiguousarray(row))
+        # 扩展区和开发者区偏移为0
+        f.write(bytes(8) + FOOTER_SIGNATURE)
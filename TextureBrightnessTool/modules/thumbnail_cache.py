@@ -0,0 +1,239 @@
+"""
+扫描结果的缩略图和预览图磁盘缓存
+以 路径 + 修改时间 + 文件大小 为键，首次访问时解码一次原图，同时生成列表缩略图和预览图并保存为PNG；
+每个尺寸旁另存一张最大明度平面(每个像素覆盖的原图区域内的最大线性明度)，缩小后检查明度时亮点不会被平均掉；
+再次查看同一文件时直接读取缓存的小图，不再完整解码原始贴图。
+缓存总大小超过上限时按最近访问时间淘汰最旧的文件。
+"""
+import os
+import hashlib
+import threading
+
+import cv2
+import numpy as np
+
+from . import image_utils, preview_engine
+from .scan_cache import cache_key
+
+# 缓存目录默认名称，放在扫描结果文件旁边
+THUMBNAIL_DIR_NAME = "brightness_thumbnails"
+
+# 结果列表中的缩略图尺寸
+THUMBNAIL_SIZE = 48
+# 单张分析页面的预览图尺寸(与预览标签大小一致)
+PREVIEW_SIZE = 380
+# 每次解码原图时生成的所有尺寸
+CACHED_SIZES = (THUMBNAIL_SIZE, PREVIEW_SIZE)
+
+# 最大明度平面的文件名后缀
+V_MAX_SUFFIX = "_vmax"
+
+# 缓存总大小上限(字节)
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+# 淘汰时清理到上限的比例，避免每次写入都触发淘汰
+EVICT_RATIO = 0.8
+
+
+def default_thumbnail_dir(out_txt):
+    """扫描结果文件对应的缩略图缓存目录"""
+    return os.path.join(os.path.dirname(os.path.abspath(out_txt)), THUMBNAIL_DIR_NAME)
+
+
+def make_thumbnail(img, size):
+    """
+    将图像缩小到最长边不超过size，返回3通道BGR uint8图像(不放大)
+
+    参数:
+    img: load_image 读取的图像
+    size: 最长边像素数
+    """
+    if img.ndim == 2:
+        img = cv2.cvtColor(img, cv2.COLOR_GRAY2BGR)
+    img = img[:, :, :3]
+    if img.dtype != np.uint8:
+        img = np.clip(img, 0, 255).astype(np.uint8)
+
+    height, width = img.shape[:2]
+    scale = size / max(height, width)
+    if scale >= 1.0:
+        return np.ascontiguousarray(img)
+    new_size = (max(1, int(width * scale)), max(1, int(height * scale)))
+    return cv2.resize(img, new_size, interpolation=cv2.INTER_AREA)
+
+
+class ThumbnailCache:
+    """基于磁盘文件的缩略图缓存，可以在多个线程中同时使用"""
+
+    def __init__(self, cache_dir, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+        self._total_bytes = sum(size for _, size, _ in self._list_files())
+        if self._total_bytes > self.max_bytes:
+            self._evict()
+
+    def _list_files(self):
+        """列出缓存文件 (文件路径, 字节数, 最近访问时间)"""
+        files = []
+        with os.scandir(self.cache_dir) as entries:
+            for entry in entries:
+                if entry.name.endswith(".png") and entry.is_file():
+                    stat = entry.stat()
+                    files.append((entry.path, stat.st_size, stat.st_mtime_ns))
+        return files
+
+    def _file_path(self, path, stat, size, suffix=""):
+        key = f"{cache_key(path)}|{stat.st_mtime_ns}|{stat.st_size}"
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).hexdigest()
+        return os.path.join(self.cache_dir, f"{digest}_{size}{suffix}.png")
+
+    def _read(self, file_path, flags):
+        """读取一个缓存文件，不存在或无法解码时返回None"""
+        try:
+            data = np.fromfile(file_path, dtype=np.uint8)
+        except OSError:
+            return None
+        img = cv2.imdecode(data, flags)
+        if img is None:
+            return None
+        # 更新修改时间作为最近访问时间，用于LRU淘汰
+        try:
+            os.utime(file_path)
+        except OSError:
+            pass
+        return img
+
+    def get(self, path, size=PREVIEW_SIZE):
+        """
+        读取缓存的缩略图
+
+        返回:
+        BGR uint8图像，没有缓存或原文件已变化时返回None
+        """
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return self._read(self._file_path(path, stat, size), cv2.IMREAD_COLOR)
+
+    def get_preview(self, path, size=PREVIEW_SIZE):
+        """
+        读取缓存的预览图和对应的最大明度平面
+
+        返回:
+        (BGR uint8图像, 最大明度平面)，任一文件没有缓存或原文件已变化时返回None
+        """
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        img = self._read(self._file_path(path, stat, size), cv2.IMREAD_COLOR)
+        if img is None:
+            return None
+        v_max = self._read(self._file_path(path, stat, size, V_MAX_SUFFIX), cv2.IMREAD_GRAYSCALE)
+        if v_max is None or v_max.shape != img.shape[:2]:
+            return None
+        return img, v_max
+
+    def get_or_create(self, path, size=PREVIEW_SIZE):
+        """
+        读取缓存的缩略图，没有缓存时解码原图并一次生成所有尺寸
+
+        返回:
+        BGR uint8图像，原图无法读取时返回None
+        """
+        img = self.get(path, size)
+        if img is not None:
+            return img
+        created = self.create(path, size)
+        return None if created is None else created[0]
+
+    def get_or_create_preview(self, path, size=PREVIEW_SIZE):
+        """
+        读取缓存的预览图和最大明度平面，没有缓存时解码原图并一次生成所有尺寸
+        没有缓存时会完整解码原图，应在后台线程中调用
+
+        返回:
+        (BGR uint8图像, 最大明度平面)，原图无法读取时返回None
+        """
+        cached = self.get_preview(path, size)
+        if cached is not None:
+            return cached
+        return self.create(path, size)
+
+    def create(self, path, size=PREVIEW_SIZE):
+        """
+        解码原图，生成并缓存所有尺寸的缩略图和最大明度平面
+
+        返回:
+        size尺寸的 (BGR uint8图像, 最大明度平面)，原图无法读取时返回None
+        """
+        try:
+            stat = os.stat(path)
+            source = image_utils.load_image(path)
+        except Exception as e:
+            print(f"生成缩略图失败 {path}: {e}")
+            return None
+        if source is None or source.size == 0:
+            return None
+
+        # 先生成最大尺寸，较小的尺寸由它缩小得到；最大明度平面同样逐级取最大值缩小
+        result = None
+        current = source
+        current_v = preview_engine.value_plane(source)
+        for cached_size in sorted(CACHED_SIZES, reverse=True):
+            current = make_thumbnail(current, cached_size)
+            current_v = preview_engine.max_pool(current_v, (current.shape[1], current.shape[0]))
+            self._store(self._file_path(path, stat, cached_size), current)
+            self._store(self._file_path(path, stat, cached_size, V_MAX_SUFFIX), current_v)
+            if cached_size == size:
+                result = (current, current_v)
+        if result is None:
+            img = make_thumbnail(current, size)
+            result = (img, preview_engine.max_pool(current_v, (img.shape[1], img.shape[0])))
+        return result
+
+    def _store(self, file_path, img):
+        ok, encoded = cv2.imencode(".png", img)
+        if not ok:
+            return
+        # 先写临时文件再替换，避免其他线程读到不完整的文件
+        temp_path = f"{file_path}.{threading.get_ident()}.tmp"
+        try:
+            encoded.tofile(temp_path)
+            os.replace(temp_path, file_path)
+        except OSError as e:
+            print(f"写入缩略图缓存失败 {file_path}: {e}")
+            return
+
+        with self._lock:
+            self._total_bytes += encoded.size
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        """按最近访问时间删除最旧的缓存文件，直到总大小低于上限的一定比例"""
+        files = self._list_files()
+        files.sort(key=lambda item: item[2])
+        total = sum(size for _, size, _ in files)
+        target = self.max_bytes * EVICT_RATIO
+        for file_path, size, _ in files:
+            if total <= target:
+                break
+            try:
+                os.remove(file_path)
+                total -= size
+            except OSError:
+                continue
+        self._total_bytes = total
+
+    def clear(self):
+        """删除所有缓存文件"""
+        with self._lock:
+            for file_path, _, _ in self._list_files():
+                try:
+                    os.remove(file_path)
+                except OSError:
+                    continue
+            self._total_bytes = 0
@@ -0,0 +1,83 @@
+"""
+目录索引测试：目录修改时间未变化时使用缓存，变化后重新列出
+运行: python -m unittest discover -s tests (在 TextureBrightnessTool 目录下)
+"""
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules import file_index  # noqa: E402
+
+
+def touch(path):
+    with open(path, "wb"):
+        pass
+
+
+def bump_mtime(folder):
+    """把目录修改时间向后调整1秒，避免文件系统时间精度不足时看不出变化"""
+    stat = os.stat(folder)
+    os.utime(folder, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+
+class FileIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.sub = os.path.join(self.folder, "sub")
+        os.mkdir(self.sub)
+        touch(os.path.join(self.folder, "a_d.png"))
+        touch(os.path.join(self.sub, "b_d.tga"))
+        self.index = file_index.FileIndex()
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def find(self):
+        """返回 (文件路径集合, os.scandir 调用次数)"""
+        with mock.patch.object(file_index.os, "scandir", wraps=os.scandir) as scandir:
+            files = set(self.index.find_files(self.folder, lambda name: True))
+        return files, scandir.call_count
+
+    def test_unchanged_dirs_are_not_listed_again(self):
+        first, listed = self.find()
+        self.assertEqual(first, {os.path.join(self.folder, "a_d.png"), os.path.join(self.sub, "b_d.tga")})
+        self.assertEqual(listed, 2)
+        second, listed = self.find()
+        self.assertEqual(second, first)
+        self.assertEqual(listed, 0)
+
+    def test_changed_dir_is_listed_again(self):
+        first, _ = self.find()
+        added = os.path.join(self.sub, "c_d.jpg")
+        touch(added)
+        os.remove(os.path.join(self.sub, "b_d.tga"))
+        bump_mtime(self.sub)
+        files, listed = self.find()
+        # 只重新列出变化的子目录
+        self.assertEqual(listed, 1)
+        self.assertEqual(files, {os.path.join(self.folder, "a_d.png"), added})
+
+    def test_new_and_removed_subdirs(self):
+        self.find()
+        new_dir = os.path.join(self.folder, "new")
+        os.mkdir(new_dir)
+        touch(os.path.join(new_dir, "n_d.png"))
+        shutil.rmtree(self.sub)
+        bump_mtime(self.folder)
+        files, _ = self.find()
+        self.assertEqual(files, {os.path.join(self.folder, "a_d.png"), os.path.join(new_dir, "n_d.png")})
+
+    def test_clear_forces_full_listing(self):
+        self.find()
+        self.index.clear()
+        _, listed = self.find()
+        self.assertEqual(listed, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,102 @@
+"""
+文件头探测测试：格式、尺寸、通道数、调色板的识别，以及批量扫描据此跳过文件
+运行: python -m unittest discover -s tests (在 TextureBrightnessTool 目录下)
+"""
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+import cv2
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules import image_probe, tga_io  # noqa: E402
+from modules.batch_scanner import BatchScanner  # noqa: E402
+from modules.image_probe import ImageInfo  # noqa: E402
+
+WIDTH, HEIGHT = 24, 10
+
+
+class ProbeTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.folder = tempfile.mkdtemp()
+        rng = np.random.default_rng(2)
+        color = rng.integers(0, 256, (HEIGHT, WIDTH, 3), dtype=np.uint8)
+        alpha = rng.integers(0, 256, (HEIGHT, WIDTH, 4), dtype=np.uint8)
+        gray = rng.integers(0, 256, (HEIGHT, WIDTH), dtype=np.uint8)
+        paletted = Image.fromarray(color[:, :, ::-1].copy(), "RGB").quantize(16)
+
+        cls.expected = {}
+
+        def add(name, info, write):
+            path = os.path.join(cls.folder, name)
+            write(path)
+            cls.expected[path] = info
+
+        add("rgb.png", ImageInfo("png", WIDTH, HEIGHT, 8, 3, False), lambda p: cv2.imwrite(p, color))
+        add("rgba.png", ImageInfo("png", WIDTH, HEIGHT, 8, 4, False), lambda p: cv2.imwrite(p, alpha))
+        add("gray.png", ImageInfo("png", WIDTH, HEIGHT, 8, 1, False), lambda p: cv2.imwrite(p, gray))
+        add("deep.png", ImageInfo("png", WIDTH, HEIGHT, 16, 3, False),
+            lambda p: cv2.imwrite(p, color.astype(np.uint16) * 257))
+        add("pal.png", ImageInfo("png", WIDTH, HEIGHT, 4, 3, True), lambda p: paletted.save(p, bits=4))
+        add("rgb.jpg", ImageInfo("jpg", WIDTH, HEIGHT, 8, 3, False), lambda p: cv2.imwrite(p, color))
+        add("gray.jpg", ImageInfo("jpg", WIDTH, HEIGHT, 8, 1, False), lambda p: cv2.imwrite(p, gray))
+        add("rgb.bmp", ImageInfo("bmp", WIDTH, HEIGHT, 8, 3, False), lambda p: cv2.imwrite(p, color))
+        add("rgba.bmp", ImageInfo("bmp", WIDTH, HEIGHT, 8, 4, False), lambda p: Image.fromarray(
+            alpha, "RGBA").save(p))
+        add("pal.bmp", ImageInfo("bmp", WIDTH, HEIGHT, 8, 3, True), lambda p: paletted.save(p))
+        add("rgb.tga", ImageInfo("tga", WIDTH, HEIGHT, 8, 3, False), lambda p: tga_io.write_tga(p, color))
+        add("rgba_rle.tga", ImageInfo("tga", WIDTH, HEIGHT, 8, 4, False),
+            lambda p: tga_io.write_tga(p, alpha, rle=True))
+        add("gray.tga", ImageInfo("tga", WIDTH, HEIGHT, 8, 1, False), lambda p: tga_io.write_tga(p, gray))
+        add("pal.tga", ImageInfo("tga", WIDTH, HEIGHT, 8, 3, True), lambda p: paletted.save(p))
+
+        cls.unknown = os.path.join(cls.folder, "notes.png")
+        with open(cls.unknown, "wb") as f:
+            f.write(b"not an image")
+        cls.missing = os.path.join(cls.folder, "missing.png")
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.folder)
+
+    def test_probe_image(self):
+        for path, expected in self.expected.items():
+            with self.subTest(name=os.path.basename(path)):
+                self.assertEqual(image_probe.probe_image(path), expected)
+
+    def test_unrecognized_files(self):
+        self.assertIsNone(image_probe.probe_image(self.unknown))
+        self.assertIsNone(image_probe.probe_image(self.missing))
+        self.assertEqual(image_probe.pixel_count(None), 0)
+
+    def test_probe_many_keeps_order(self):
+        paths = list(self.expected) + [self.unknown]
+        self.assertEqual(image_probe.probe_many(paths), list(self.expected.values()) + [None])
+
+    def test_skip_reasons(self):
+        scanner = BatchScanner()
+        # 默认检查所有文件
+        self.assertTrue(all(scanner.skip_reason(info) is None for info in self.expected.values()))
+
+        scanner.skip_paletted = True
+        scanner.skip_grayscale = True
+        skipped = {os.path.basename(path) for path, info in self.expected.items()
+                   if scanner.skip_reason(info) is not None}
+        self.assertEqual(skipped, {"gray.png", "pal.png", "gray.jpg", "pal.bmp", "gray.tga", "pal.tga"})
+        self.assertIsNone(scanner.skip_reason(None))
+
+        scanner = BatchScanner()
+        scanner.min_size = WIDTH + 1
+        self.assertIsNotNone(scanner.skip_reason(self.expected[os.path.join(self.folder, "rgb.png")]))
+        scanner.min_size = WIDTH
+        self.assertIsNone(scanner.skip_reason(self.expected[os.path.join(self.folder, "rgb.png")]))
+
+
+if __name__ == "__main__":
+    unittest.main()
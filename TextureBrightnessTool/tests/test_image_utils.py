@@ -0,0 +1,44 @@
+"""
+image_utils 查找表快速路径与浮点参考实现的一致性测试
+运行: python -m unittest discover -s tests (在 TextureBrightnessTool 目录下)
+"""
+import os
+import sys
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules import image_utils  # noqa: E402
+
+
+class LinearValueTest(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.images = [
+            rng.integers(0, 256, (31, 17, 3), dtype=np.uint8),
+            rng.integers(0, 256, (9, 40, 4), dtype=np.uint8),
+            rng.integers(0, 256, (12, 12), dtype=np.uint8),
+            # 所有字节值都出现一次，覆盖整个查找表
+            np.repeat(np.arange(256, dtype=np.uint8)[:, None, None], 3, axis=2),
+        ]
+
+    def test_linear_value_bytes_matches_float(self):
+        for img in self.images:
+            with self.subTest(shape=img.shape):
+                np.testing.assert_array_equal(image_utils.linear_value_bytes(img),
+                                              image_utils._value_channel_float(img))
+
+    def test_check_brightness_matches_float(self):
+        for img in self.images:
+            for threshold in (0.0, 0.5, 0.9, 0.92, 0.999, 1.0):
+                with self.subTest(shape=img.shape, threshold=threshold):
+                    self.assertEqual(image_utils.check_brightness(img, threshold),
+                                     bool(image_utils._check_brightness_float(img, threshold)))
+                    self.assertEqual(image_utils.check_brightness(img, threshold, tile_rows=4),
+                                     bool(image_utils._check_brightness_float(img, threshold)))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,56 @@
+"""
+preview_engine 增量渲染测试
+运行: python -m unittest discover -s tests (在 TextureBrightnessTool 目录下)
+"""
+import os
+import sys
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules import preview_engine  # noqa: E402
+
+
+class PreviewRendererTest(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        bgr = rng.integers(0, 256, (64, 48, 3), dtype=np.uint8)
+        hsv = preview_engine.to_linear_hsv(bgr)
+        self.level = preview_engine.PreviewLevel(hsv, None)
+        masks = [np.zeros(hsv.shape[:2], dtype=bool) for _ in range(2)]
+        masks[0][5:12, 3:20] = True
+        masks[1][30:60, :] = True
+        self.labels = preview_engine.build_label_map(masks)
+        self.params = [preview_engine.RegionParams(1.0, 0.0, 1.0, 0.9),
+                       preview_engine.RegionParams(1.0, 0.0, 1.0, 0.9)]
+
+    def render(self, renderer, params):
+        return renderer.render(self.level, self.labels, params, False, True, (0, 0, 255))
+
+    def test_incremental_matches_full_render(self):
+        renderer = preview_engine.PreviewRenderer()
+        self.render(renderer, self.params)
+        for factor in (0.5, 1.3, 2.0):
+            params = [self.params[0]._replace(brightness_factor=factor), self.params[1]]
+            with self.subTest(factor=factor):
+                expected = preview_engine.render_preview(self.level, self.labels, params, False, True, (0, 0, 255))
+                np.testing.assert_array_equal(self.render(renderer, params), expected)
+
+    def test_returned_frames_are_not_modified(self):
+        renderer = preview_engine.PreviewRenderer()
+        first = self.render(renderer, self.params)
+        snapshot = first.copy()
+        second = self.render(renderer, [self.params[0]._replace(brightness_factor=0.2), self.params[1]])
+        self.assertFalse(np.array_equal(second, snapshot))
+        np.testing.assert_array_equal(first, snapshot)
+
+    def test_unchanged_params_reuse_frame(self):
+        renderer = preview_engine.PreviewRenderer()
+        first = self.render(renderer, self.params)
+        self.assertIs(self.render(renderer, self.params), first)
+
+
+if __name__ == "__main__":
+    unittest.main()
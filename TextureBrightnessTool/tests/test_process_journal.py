@@ -0,0 +1,82 @@
+"""
+批量处理日志测试：重新运行时跳过已完成的文件，文件内容变化后重新处理
+运行: python -m unittest discover -s tests (在 TextureBrightnessTool 目录下)
+"""
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules import image_utils, process_journal  # noqa: E402
+from modules.batch_scanner import BatchScanner  # noqa: E402
+from modules.scan_cache import file_hash  # noqa: E402
+
+THRESHOLD = 0.92
+
+
+class JournalResumeTest(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.journal_path = os.path.join(self.folder, process_journal.JOURNAL_FILE_NAME)
+        self.bright = os.path.join(self.folder, "bright_d.png")
+        self.dark = os.path.join(self.folder, "dark_d.png")
+        cv2.imwrite(self.bright, np.full((8, 8, 3), 250, dtype=np.uint8))
+        cv2.imwrite(self.dark, np.full((8, 8, 3), 100, dtype=np.uint8))
+        self.scanner = BatchScanner(workers=1)
+        # 只测试日志，不让扫描缓存跳过解码
+        self.scanner.use_cache = False
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def run_process(self):
+        """处理文件夹，返回 (处理过的文件列表, 解码次数)"""
+        processed = []
+        with mock.patch.object(image_utils, "load_image", wraps=image_utils.load_image) as load:
+            self.scanner.run_process(
+                self.folder, THRESHOLD, file_list=[self.bright, self.dark],
+                on_processed=lambda path, saved, still_exceeds: processed.append(path),
+                journal_path=self.journal_path, out_txt=os.path.join(self.folder, "exceed_brightness.txt"),
+            )
+        return processed, load.call_count
+
+    def test_resume_skips_finished_files(self):
+        processed, decoded = self.run_process()
+        self.assertEqual(processed, [self.bright])
+        self.assertGreater(decoded, 0)
+        self.assertFalse(image_utils.check_brightness(image_utils.load_image(self.bright), THRESHOLD))
+
+        processed, decoded = self.run_process()
+        self.assertEqual(processed, [])
+        self.assertEqual(decoded, 0)
+
+    def test_changed_content_is_processed_again(self):
+        self.run_process()
+        cv2.imwrite(self.bright, np.full((8, 8, 3), 255, dtype=np.uint8))
+        processed, _ = self.run_process()
+        self.assertEqual(processed, [self.bright])
+
+    def test_interrupted_before_replace_is_processed_again(self):
+        # 日志已写入处理记录，但原图还未被替换(内容仍是处理前的哈希)
+        before = file_hash(self.bright)
+        with process_journal.ProcessJournal(self.journal_path) as journal:
+            journal.append(self.bright, THRESHOLD, before, "not-yet-replaced", process_journal.STATUS_PROCESSED)
+        processed, _ = self.run_process()
+        self.assertEqual(processed, [self.bright])
+
+    def test_other_threshold_is_not_skipped(self):
+        self.run_process()
+        with process_journal.ProcessJournal(self.journal_path) as journal:
+            self.assertIsNotNone(journal.lookup(self.bright, THRESHOLD, file_hash(self.bright)))
+            self.assertIsNone(journal.lookup(self.bright, THRESHOLD - 0.1, file_hash(self.bright)))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,100 @@
+"""
+增量扫描缓存测试：命中时不解码，文件修改时间或大小变化后重新计算
+运行: python -m unittest discover -s tests (在 TextureBrightnessTool 目录下)
+"""
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules import image_utils, scan_cache, scan_engine  # noqa: E402
+
+
+class ScanCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.cache = scan_cache.ScanCache(os.path.join(self.folder, scan_cache.CACHE_FILE_NAME))
+        self.bright = os.path.join(self.folder, "bright_d.png")
+        self.dark = os.path.join(self.folder, "dark_d.png")
+        cv2.imwrite(self.bright, np.full((8, 8, 3), 250, dtype=np.uint8))
+        cv2.imwrite(self.dark, np.full((8, 8, 3), 100, dtype=np.uint8))
+        self.paths = [self.bright, self.dark]
+
+    def tearDown(self):
+        self.cache.close()
+        shutil.rmtree(self.folder)
+
+    def scan(self, threshold=0.92):
+        """单进程扫描，返回 ({文件路径: 是否超出阈值}, 解码次数)"""
+        with mock.patch.object(image_utils, "load_image", wraps=image_utils.load_image) as load:
+            results = {path: exceeded for path, exceeded, error, _ in
+                       scan_engine.iter_scan(self.paths, threshold, workers=1, cache=self.cache)}
+        return results, load.call_count
+
+    def test_unchanged_files_hit_cache(self):
+        first, decoded = self.scan()
+        self.assertEqual(first, {self.bright: True, self.dark: False})
+        self.assertEqual(decoded, 2)
+
+        second, decoded = self.scan()
+        self.assertEqual(second, first)
+        self.assertEqual(decoded, 0)
+
+    def test_new_threshold_answered_from_cache(self):
+        self.scan(0.92)
+        results, decoded = self.scan(0.1)
+        self.assertEqual(results, {self.bright: True, self.dark: True})
+        self.assertEqual(decoded, 0)
+
+    def test_mtime_change_with_same_content_skips_decode(self):
+        self.scan()
+        stat = os.stat(self.bright)
+        os.utime(self.bright, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+        _, decoded = self.scan()
+        self.assertEqual(decoded, 0)
+        entry = self.cache.lookup_many([self.bright])[self.bright]
+        self.assertEqual(entry.mtime_ns, stat.st_mtime_ns + 10 ** 9)
+
+    def test_content_change_is_rescanned(self):
+        self.scan()
+        # 大小不变、内容变化(修改时间也随之变化)
+        stat = os.stat(self.bright)
+        cv2.imwrite(self.bright, np.full((8, 8, 3), 10, dtype=np.uint8))
+        os.utime(self.bright, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+        results, decoded = self.scan()
+        self.assertEqual(decoded, 1)
+        self.assertFalse(results[self.bright])
+
+    def test_size_change_is_rescanned(self):
+        self.scan()
+        # 大小变化、修改时间不变
+        stat = os.stat(self.dark)
+        cv2.imwrite(self.dark, np.full((16, 16, 3), 255, dtype=np.uint8))
+        self.assertNotEqual(os.stat(self.dark).st_size, stat.st_size)
+        os.utime(self.dark, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        results, decoded = self.scan()
+        self.assertEqual(decoded, 1)
+        self.assertTrue(results[self.dark])
+
+    def test_lookup_many_across_chunks(self):
+        entry = scan_cache.entry_from_stats(1, 2, "hash", 0.92, image_utils.brightness_stats(
+            np.full((4, 4, 3), 250, dtype=np.uint8), 0.92))
+        items = [(os.path.join(self.folder, f"f{i}.png"), entry._replace(mtime_ns=i)) for i in range(7)]
+        self.cache.store_many(items)
+        with mock.patch.object(scan_cache, "LOOKUP_CHUNK_SIZE", 3):
+            found = self.cache.lookup_many([path for path, _ in items] + [self.bright])
+        self.assertEqual(set(found), {path for path, _ in items})
+        for path, expected in items:
+            self.assertEqual(found[path]._replace(histogram=None), expected._replace(histogram=None))
+            np.testing.assert_array_equal(found[path].histogram, expected.histogram)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,111 @@
+"""
+tga_io 回归测试
+运行: python -m unittest discover -s tests (在 TextureBrightnessTool 目录下)
+"""
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules import tga_io  # noqa: E402
+
+
+def write_alpha_unused_tga(path, img, rle):
+    """写入TGA，并附加声明Alpha未使用(属性类型0)的TGA 2.0扩展区"""
+    tga_io.write_tga(path, img, rle)
+    with open(path, "rb") as f:
+        data = f.read()[:-tga_io.FOOTER_SIZE]
+    extension = bytearray(495)
+    extension[0:2] = (495).to_bytes(2, "little")
+    extension[tga_io.EXTENSION_ATTRIBUTES_OFFSET] = 0
+    footer = len(data).to_bytes(4, "little") + bytes(4) + tga_io.FOOTER_SIGNATURE
+    with open(path, "wb") as f:
+        f.write(data + bytes(extension) + footer)
+
+
+class AlphaUnusedTest(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        rng = np.random.default_rng(0)
+        self.img = rng.integers(0, 256, (17, 23, 4), dtype=np.uint8)
+        self.img[2:9, 3:15] = (10, 20, 30, 40)  # 让RLE产生重复包
+        self.expected = self.img.copy()
+        self.expected[:, :, 3] = 255
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def test_alpha_forced_opaque(self):
+        for rle in (False, True):
+            for use_mmap in (False, True):
+                with self.subTest(rle=rle, use_mmap=use_mmap):
+                    path = os.path.join(self.folder, f"x_{rle}_{use_mmap}.tga")
+                    write_alpha_unused_tga(path, self.img, rle)
+                    img = tga_io.read_tga(path, use_mmap=use_mmap)
+                    np.testing.assert_array_equal(img, self.expected)
+
+
+
+def sample_images():
+    """灰度、BGR、BGRA 测试图像，带重复像素以产生RLE重复包"""
+    rng = np.random.default_rng(1)
+    images = []
+    for shape in ((13, 21), (13, 21, 3), (13, 21, 4)):
+        img = rng.integers(0, 256, shape, dtype=np.uint8)
+        img[3:7, 2:16] = 77
+        images.append(img)
+    return images
+
+
+def write_with_pillow(path, img, rle, top_to_bottom):
+    """用Pillow写入TGA(独立于 write_tga 的编码器)，可指定行的排列方向"""
+    from PIL import Image
+
+    if img.ndim == 2:
+        pil_img = Image.fromarray(img, "L")
+    elif img.shape[2] == 3:
+        pil_img = Image.fromarray(np.ascontiguousarray(img[:, :, ::-1]), "RGB")
+    else:
+        pil_img = Image.fromarray(np.ascontiguousarray(img[:, :, [2, 1, 0, 3]]), "RGBA")
+    pil_img.save(path, format="TGA", compression="tga_rle" if rle else None,
+                 orientation=1 if top_to_bottom else -1)
+
+
+class RoundTripTest(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def test_write_then_read(self):
+        for img in sample_images():
+            for rle in (False, True):
+                for use_mmap in (False, True):
+                    with self.subTest(shape=img.shape, rle=rle, use_mmap=use_mmap):
+                        path = os.path.join(self.folder, "x.tga")
+                        tga_io.write_tga(path, img, rle)
+                        np.testing.assert_array_equal(tga_io.read_tga(path, use_mmap=use_mmap), img)
+
+    def test_both_orientations(self):
+        for img in sample_images():
+            for rle in (False, True):
+                for top_to_bottom in (False, True):
+                    with self.subTest(shape=img.shape, rle=rle, top_to_bottom=top_to_bottom):
+                        path = os.path.join(self.folder, "y.tga")
+                        write_with_pillow(path, img, rle, top_to_bottom)
+                        with open(path, "rb") as f:
+                            header = tga_io.parse_header(f.read(tga_io.HEADER_SIZE))
+                        self.assertEqual(bool(header.descriptor & tga_io.DESCRIPTOR_TOP_TO_BOTTOM), top_to_bottom)
+                        self.assertEqual(bool(header.image_type & tga_io.TYPE_RLE_FLAG), rle)
+                        np.testing.assert_array_equal(tga_io.read_tga(path), img)
+                        np.testing.assert_array_equal(tga_io.read_tga(path, use_mmap=True), img)
+
+
+if __name__ == "__main__":
+    unittest.main()
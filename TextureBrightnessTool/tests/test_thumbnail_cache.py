@@ -0,0 +1,64 @@
+"""
+thumbnail_cache 回归测试
+运行: python -m unittest discover -s tests (在 TextureBrightnessTool 目录下)
+"""
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules import preview_engine, thumbnail_cache  # noqa: E402
+
+
+def count_exceeded(image, v_max, threshold=0.92):
+    """按单张分析页面的方式渲染预览，返回被标记为超出阈值的像素数"""
+    levels = preview_engine.build_pyramid(image, preview_engine.to_linear_hsv(image), thumbnail_cache.PREVIEW_SIZE,
+                                          v_max=v_max)
+    level = preview_engine.select_level(levels, thumbnail_cache.PREVIEW_SIZE)
+    labels = np.ones(level.hsv.shape[:2], dtype=np.uint8)
+    params = (preview_engine.RegionParams(1.0, 0.0, 1.0, threshold),)
+    frame = preview_engine.render_preview(level, labels, params, False, True, (0, 0, 255))
+    return int(np.all(frame == (0, 0, 255), axis=2).sum())
+
+
+class PreviewHotSpotTest(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.img = np.full((1600, 1200, 3), 60, dtype=np.uint8)
+        self.img[700:703, 500:503] = 255  # 缩小后会被平均掉的小亮点
+        self.path = os.path.join(self.folder, "hot.png")
+        cv2.imwrite(self.path, self.img)
+        self.cache = thumbnail_cache.ThumbnailCache(os.path.join(self.folder, "cache"))
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def test_cached_preview_keeps_hot_spot(self):
+        expected = count_exceeded(self.img, None)
+        self.assertGreater(expected, 0)
+
+        created = self.cache.get_or_create_preview(self.path)
+        self.assertEqual(count_exceeded(*created), expected)
+
+        cached = self.cache.get_preview(self.path)
+        self.assertIsNotNone(cached)
+        np.testing.assert_array_equal(cached[1], created[1])
+        self.assertEqual(count_exceeded(*cached), expected)
+
+    def test_preview_without_v_max_is_a_miss(self):
+        self.cache.get_or_create_preview(self.path)
+        for name in os.listdir(self.cache.cache_dir):
+            if name.endswith(thumbnail_cache.V_MAX_SUFFIX + ".png"):
+                os.remove(os.path.join(self.cache.cache_dir, name))
+        self.assertIsNone(self.cache.get_preview(self.path))
+        self.assertIsNotNone(self.cache.get(self.path))
+
+
+if __name__ == "__main__":
+    unittest.main()